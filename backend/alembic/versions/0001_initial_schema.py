@@ -0,0 +1,81 @@
+"""initial schema
+
+Схема, яку раніше створював Base.metadata.create_all при старті застосунку.
+На базах, створених таким чином, таблиці вже існують — їх пропускаємо.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False, unique=True),
+            sa.Column("name", sa.String()),
+            sa.Column("password", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+    if "folders" not in existing:
+        op.create_table(
+            "folders",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("parent_id", UUID(as_uuid=True), sa.ForeignKey("folders.id", ondelete="CASCADE")),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+    if "photos" not in existing:
+        op.create_table(
+            "photos",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("filename", sa.String(), nullable=False),
+            sa.Column("s3_key", sa.String(), nullable=False),
+            sa.Column("size", sa.Integer()),
+            sa.Column("mime_type", sa.String()),
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("folder_id", UUID(as_uuid=True), sa.ForeignKey("folders.id", ondelete="CASCADE")),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+    if "shared_photos" not in existing:
+        op.create_table(
+            "shared_photos",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("photo_id", UUID(as_uuid=True), sa.ForeignKey("photos.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+    if "shared_folders" not in existing:
+        op.create_table(
+            "shared_folders",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("folder_id", UUID(as_uuid=True), sa.ForeignKey("folders.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("can_delete", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+
+def downgrade():
+    op.drop_table("shared_folders")
+    op.drop_table("shared_photos")
+    op.drop_table("photos")
+    op.drop_table("folders")
+    op.drop_table("users")
@@ -0,0 +1,44 @@
+"""materialized folder path
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("folders", sa.Column("path", sa.String(), nullable=True))
+
+    op.execute("""
+        WITH RECURSIVE tree AS (
+            SELECT id, id::text AS path
+            FROM folders
+            WHERE parent_id IS NULL
+            UNION ALL
+            SELECT f.id, tree.path || '/' || f.id::text
+            FROM folders f
+            JOIN tree ON f.parent_id = tree.id
+        )
+        UPDATE folders
+        SET path = tree.path
+        FROM tree
+        WHERE folders.id = tree.id
+    """)
+
+    op.alter_column("folders", "path", nullable=False)
+    op.create_index(
+        "ix_folders_path", "folders", ["path"],
+        postgresql_ops={"path": "text_pattern_ops"}
+    )
+
+
+def downgrade():
+    op.drop_index("ix_folders_path", table_name="folders")
+    op.drop_column("folders", "path")
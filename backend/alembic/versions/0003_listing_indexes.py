@@ -0,0 +1,56 @@
+"""indexes and unique constraints for listing and sharing queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_folders_user_parent_created", "folders", ["user_id", "parent_id", "created_at", "id"])
+    op.create_index("ix_folders_parent_created", "folders", ["parent_id", "created_at", "id"])
+
+    op.create_index("ix_photos_user_folder_created", "photos", ["user_id", "folder_id", "created_at", "id"])
+    op.create_index("ix_photos_folder_created", "photos", ["folder_id", "created_at", "id"])
+
+    # Старий код міг створити дублікати поширень — лишаємо найраніший запис
+    op.execute("""
+        DELETE FROM shared_photos a
+        USING shared_photos b
+        WHERE a.photo_id = b.photo_id
+          AND a.user_id = b.user_id
+          AND (a.created_at, a.id::text) > (b.created_at, b.id::text)
+    """)
+    op.execute("""
+        DELETE FROM shared_folders a
+        USING shared_folders b
+        WHERE a.folder_id = b.folder_id
+          AND a.user_id = b.user_id
+          AND (a.created_at, a.id::text) > (b.created_at, b.id::text)
+    """)
+
+    op.create_unique_constraint("uq_shared_photos_photo_user", "shared_photos", ["photo_id", "user_id"])
+    op.create_index("ix_shared_photos_user_photo", "shared_photos", ["user_id", "photo_id"])
+
+    op.create_unique_constraint("uq_shared_folders_folder_user", "shared_folders", ["folder_id", "user_id"])
+    op.create_index("ix_shared_folders_user_folder", "shared_folders", ["user_id", "folder_id"])
+
+
+def downgrade():
+    op.drop_index("ix_shared_folders_user_folder", table_name="shared_folders")
+    op.drop_constraint("uq_shared_folders_folder_user", "shared_folders", type_="unique")
+
+    op.drop_index("ix_shared_photos_user_photo", table_name="shared_photos")
+    op.drop_constraint("uq_shared_photos_photo_user", "shared_photos", type_="unique")
+
+    op.drop_index("ix_photos_folder_created", table_name="photos")
+    op.drop_index("ix_photos_user_folder_created", table_name="photos")
+
+    op.drop_index("ix_folders_parent_created", table_name="folders")
+    op.drop_index("ix_folders_user_parent_created", table_name="folders")
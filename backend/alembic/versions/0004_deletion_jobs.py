@@ -0,0 +1,35 @@
+"""deletion jobs for background object removal
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "deletion_jobs",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("folder_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("total_objects", sa.Integer(), nullable=False),
+        sa.Column("deleted_objects", sa.Integer(), nullable=False),
+        sa.Column("pending_keys", ARRAY(sa.String()), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("finished_at", sa.DateTime()),
+    )
+    op.create_index("ix_deletion_jobs_user_id", "deletion_jobs", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("ix_deletion_jobs_user_id", table_name="deletion_jobs")
+    op.drop_table("deletion_jobs")
@@ -0,0 +1,25 @@
+"""photo thumbnail widths
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "photos",
+        sa.Column("thumbnail_widths", ARRAY(sa.Integer()), nullable=False, server_default="{}")
+    )
+
+
+def downgrade():
+    op.drop_column("photos", "thumbnail_widths")
@@ -0,0 +1,37 @@
+"""queued photo notifications for digest emails
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "photo_notifications",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("folder_id", UUID(as_uuid=True), sa.ForeignKey("folders.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("recipient_email", sa.String(), nullable=False),
+        sa.Column("uploader_email", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("sent_at", sa.DateTime()),
+    )
+    op.create_index(
+        "ix_photo_notifications_pending", "photo_notifications",
+        ["status", "folder_id", "recipient_email", "created_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_photo_notifications_pending", table_name="photo_notifications")
+    op.drop_table("photo_notifications")
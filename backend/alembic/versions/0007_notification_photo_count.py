@@ -0,0 +1,24 @@
+"""photo count on queued notifications
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "photo_notifications",
+        sa.Column("photo_count", sa.Integer(), nullable=False, server_default="1")
+    )
+
+
+def downgrade():
+    op.drop_column("photo_notifications", "photo_count")
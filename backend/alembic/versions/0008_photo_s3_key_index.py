@@ -0,0 +1,20 @@
+"""index photos by storage key for upload finalization
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_photos_s3_key", "photos", ["s3_key"])
+
+
+def downgrade():
+    op.drop_index("ix_photos_s3_key", table_name="photos")
@@ -0,0 +1,34 @@
+"""content-addressed stored objects with reference counts
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stored_objects",
+        sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("s3_key", sa.String(), nullable=False),
+        sa.Column("size", sa.Integer()),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.add_column("photos", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_index("ix_photos_user_content_hash", "photos", ["user_id", "content_hash"])
+
+
+def downgrade():
+    op.drop_index("ix_photos_user_content_hash", table_name="photos")
+    op.drop_column("photos", "content_hash")
+    op.drop_table("stored_objects")
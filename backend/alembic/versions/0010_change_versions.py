@@ -0,0 +1,23 @@
+"""change counters for listing ETags
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("folders", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    op.drop_column("folders", "version")
+    op.drop_column("users", "version")
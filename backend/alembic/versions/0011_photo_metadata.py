@@ -0,0 +1,48 @@
+"""photo metadata from file headers and search indexes
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("photos", sa.Column("taken_at", sa.DateTime(), nullable=True))
+    op.add_column("photos", sa.Column("width", sa.Integer(), nullable=True))
+    op.add_column("photos", sa.Column("height", sa.Integer(), nullable=True))
+    op.add_column("photos", sa.Column("camera_make", sa.String(128), nullable=True))
+    op.add_column("photos", sa.Column("camera_model", sa.String(128), nullable=True))
+    op.add_column("photos", sa.Column("latitude", sa.Float(), nullable=True))
+    op.add_column("photos", sa.Column("longitude", sa.Float(), nullable=True))
+    # Наявні фото отримують false — їх поступово заповнить воркер (backfill_metadata)
+    op.add_column(
+        "photos",
+        sa.Column("metadata_extracted", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+    op.create_index("ix_photos_user_taken", "photos", ["user_id", "taken_at", "id"])
+    op.create_index("ix_photos_user_camera_taken", "photos", ["user_id", "camera_make", "camera_model", "taken_at"])
+    op.create_index(
+        "ix_photos_user_location", "photos", ["user_id", "latitude", "longitude"],
+        postgresql_where=sa.text("latitude IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_photos_metadata_pending", "photos", ["s3_key"],
+        postgresql_where=sa.text("NOT metadata_extracted"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_photos_metadata_pending", table_name="photos")
+    op.drop_index("ix_photos_user_location", table_name="photos")
+    op.drop_index("ix_photos_user_camera_taken", table_name="photos")
+    op.drop_index("ix_photos_user_taken", table_name="photos")
+    for column in ("metadata_extracted", "longitude", "latitude", "camera_model", "camera_make", "height", "width", "taken_at"):
+        op.drop_column("photos", column)
@@ -0,0 +1,53 @@
+"""storage usage counters and quotas
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("used_bytes", sa.BigInteger(), nullable=False, server_default="0"))
+    op.add_column("users", sa.Column("photo_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("users", sa.Column("quota_bytes", sa.BigInteger(), nullable=True))
+    op.add_column("folders", sa.Column("subtree_bytes", sa.BigInteger(), nullable=False, server_default="0"))
+    op.add_column("folders", sa.Column("subtree_photo_count", sa.Integer(), nullable=False, server_default="0"))
+
+    # Початкові значення для наявних фото; далі лічильники підтримує застосунок
+    op.execute("""
+        UPDATE users SET used_bytes = totals.bytes, photo_count = totals.photos
+        FROM (
+            SELECT user_id, COALESCE(SUM(size), 0) AS bytes, COUNT(*) AS photos
+            FROM photos GROUP BY user_id
+        ) AS totals
+        WHERE users.id = totals.user_id
+    """)
+    op.execute("""
+        UPDATE folders SET subtree_bytes = totals.bytes, subtree_photo_count = totals.photos
+        FROM (
+            SELECT ancestor_id, SUM(direct.bytes) AS bytes, SUM(direct.photos) AS photos
+            FROM (
+                SELECT folder_id, COALESCE(SUM(size), 0) AS bytes, COUNT(*) AS photos
+                FROM photos WHERE folder_id IS NOT NULL GROUP BY folder_id
+            ) AS direct
+            JOIN folders ON folders.id = direct.folder_id
+            CROSS JOIN LATERAL unnest(string_to_array(folders.path, '/')::uuid[]) AS ancestor_id
+            GROUP BY ancestor_id
+        ) AS totals
+        WHERE folders.id = totals.ancestor_id
+    """)
+
+
+def downgrade():
+    op.drop_column("folders", "subtree_photo_count")
+    op.drop_column("folders", "subtree_bytes")
+    op.drop_column("users", "quota_bytes")
+    op.drop_column("users", "photo_count")
+    op.drop_column("users", "used_bytes")
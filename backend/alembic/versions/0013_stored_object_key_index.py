@@ -0,0 +1,20 @@
+"""index stored objects by storage key
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_stored_objects_s3_key", "stored_objects", ["s3_key"])
+
+
+def downgrade():
+    op.drop_index("ix_stored_objects_s3_key", table_name="stored_objects")
@@ -0,0 +1,22 @@
+"""track deletion job progress time to retry stale jobs
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("deletion_jobs", sa.Column("updated_at", sa.DateTime()))
+    op.execute("UPDATE deletion_jobs SET updated_at = COALESCE(finished_at, created_at)")
+
+
+def downgrade():
+    op.drop_column("deletion_jobs", "updated_at")
@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# .env читається один раз, до імпорту будь-якого модуля застосунку
+load_dotenv()
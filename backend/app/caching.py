@@ -0,0 +1,27 @@
+from fastapi import Response
+from typing import Optional
+import hashlib
+from .pagination import PageParams
+
+ETAG_HEADER = "ETag"
+# Відповідь можна кешувати лише в браузері, і лише після перевірки через If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+def listing_etag(page: PageParams, *parts) -> str:
+    """Слабкий ETag сторінки списку: лічильники змін + параметри сторінки"""
+    raw = "|".join(str(part) for part in (*parts, page.cursor, page.limit))
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:24]}"'
+
+def not_modified(page: PageParams, etag: str) -> Optional[Response]:
+    """Ставить ETag у відповідь; якщо клієнт уже має цю версію — повертає готову 304"""
+    headers = {ETAG_HEADER: etag, "Cache-Control": CACHE_CONTROL}
+    page.response.headers.update(headers)
+
+    if_none_match = page.request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    if "*" in candidates or etag in candidates:
+        return Response(status_code=304, headers=headers)
+    return None
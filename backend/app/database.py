@@ -1,20 +1,73 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from typing import Optional
 import os
-
-load_dotenv()
+import threading
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Параметри пулу з'єднань, спільні для sync та async рушіїв
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+}
+
+def _async_database_url(url: str) -> tuple[str, dict]:
+    """postgresql://... -> postgresql+asyncpg://..., якщо драйвер не вказано явно, і connect_args.
+
+    asyncpg не приймає libpq-параметр sslmode — його значення передається як ssl.
+    """
+    parsed = make_url(url)
+    if parsed.drivername in ("postgresql", "postgres", "postgresql+psycopg2"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    connect_args = {}
+    if "sslmode" in parsed.query:
+        connect_args["ssl"] = parsed.query["sslmode"]
+        parsed = parsed.difference_update_query(["sslmode"])
+    return parsed.render_as_string(hide_password=False), connect_args
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL
+
+engine = create_engine(DATABASE_URL, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async-шлях для роутерів фото та папок; sync-рушій лишається для auth, фонових задач і міграцій.
+# Рушій створюється при першому зверненні — воркер, міграції й скрипти імпортують модуль без asyncpg
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+_async_engine: Optional[AsyncEngine] = None
+_async_engine_lock = threading.Lock()
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    with _async_engine_lock:
+        if _async_engine is None:
+            url, connect_args = _async_database_url(ASYNC_DATABASE_URL)
+            _async_engine = create_async_engine(url, connect_args=connect_args, **POOL_OPTIONS)
+            AsyncSessionLocal.configure(bind=_async_engine)
+        return _async_engine
+
+async def dispose_async_engine():
+    global _async_engine
+    with _async_engine_lock:
+        async_engine, _async_engine = _async_engine, None
+    if async_engine is not None:
+        await async_engine.dispose()
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
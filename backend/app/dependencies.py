@@ -1,23 +1,69 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import OrderedDict
+from .database import get_async_db
 from .models import User
 import os
+import threading
+import time
+
+# Читаються один раз при імпорті (.env вже завантажено в app/__init__.py)
+SECRET_KEY = os.getenv("SECRET_KEY")
+ALGORITHM = os.getenv("ALGORITHM")
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
 
 bearer = HTTPBearer()
 
-def get_current_user(
+# (user_id, token) -> (момент застаріння, від'єднаний від сесії User)
+_user_cache: "OrderedDict[tuple[str, str], tuple[float, User]]" = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+def invalidate_user(user_id):
+    """Прибирає з кешу всі записи користувача; викликати після змін User"""
+    user_id = str(user_id)
+    with _user_cache_lock:
+        for key in [key for key in _user_cache if key[0] == user_id]:
+            del _user_cache[key]
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+def _get_cached_user(key: tuple[str, str]):
+    with _user_cache_lock:
+        entry = _user_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del _user_cache[key]
+            return None
+        _user_cache.move_to_end(key)
+        return user
+
+def _cache_user(key: tuple[str, str], user: User):
+    with _user_cache_lock:
+        _user_cache[key] = (time.monotonic() + USER_CACHE_TTL, user)
+        _user_cache.move_to_end(key)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     token = credentials.credentials
     try:
         payload = jwt.decode(
             token,
-            os.getenv("SECRET_KEY"),
-            algorithms=[os.getenv("ALGORITHM")]
+            SECRET_KEY,
+            algorithms=[ALGORITHM]
         )
         user_id = payload.get("sub")
         if not user_id:
@@ -25,8 +71,17 @@ def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="Невалідний токен")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    cache_key = (user_id, token)
+    user = _get_cached_user(cache_key)
+    if user is not None:
+        return user
+
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(status_code=401, detail="Користувача не знайдено")
 
+    # Від'єднуємо від сесії запиту, щоб commit у роутерах не робив атрибути застарілими
+    db.expunge(user)
+    _cache_user(cache_key, user)
+
     return user
@@ -0,0 +1,142 @@
+from sqlalchemy import delete, exists, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Optional
+from .models import Folder, Photo, SharedFolder, User
+from .services.content_store import release_objects
+from .services.thumbnails import photo_object_keys
+
+PATH_SEPARATOR = "/"
+
+def build_folder_path(folder_id: UUID, parent: Optional[Folder]) -> str:
+    """Будує матеріалізований шлях нової папки за шляхом батька"""
+    if parent is None:
+        return str(folder_id)
+    return f"{parent.path}{PATH_SEPARATOR}{folder_id}"
+
+def folder_ancestor_ids(folder: Folder, include_self: bool = True) -> list[UUID]:
+    """Повертає id предків папки (від кореня) без жодного запиту до БД"""
+    ids = [UUID(part) for part in folder.path.split(PATH_SEPARATOR)]
+    return ids if include_self else ids[:-1]
+
+def subtree_filter(folder: Folder):
+    """Умова для вибірки папки та всіх її нащадків за префіксом шляху"""
+    return or_(
+        Folder.path == folder.path,
+        Folder.path.like(f"{folder.path}{PATH_SEPARATOR}%")
+    )
+
+async def can_view_folder(db: AsyncSession, folder: Folder, user: User) -> bool:
+    """Власник або користувач, якому поширено саму папку чи будь-якого її предка"""
+    if folder.user_id == user.id:
+        return True
+
+    return await db.scalar(
+        select(exists().where(
+            SharedFolder.user_id == user.id,
+            SharedFolder.folder_id.in_(folder_ancestor_ids(folder))
+        ))
+    )
+
+async def can_delete_folder(db: AsyncSession, folder: Folder, user: User, include_self: bool = False) -> bool:
+    """Власник або користувач з правом видалення на одному з предків папки.
+
+    include_self — право на саму папку теж рахується: так перевіряється видалення фото в ній.
+    """
+    if folder.user_id == user.id:
+        return True
+
+    ancestor_ids = folder_ancestor_ids(folder, include_self)
+    if not ancestor_ids:
+        return False
+
+    return await db.scalar(
+        select(exists().where(
+            SharedFolder.user_id == user.id,
+            SharedFolder.can_delete == True,
+            SharedFolder.folder_id.in_(ancestor_ids)
+        ))
+    )
+
+async def move_folder(db: AsyncSession, folder: Folder, new_parent: Optional[Folder]):
+    """Переносить папку й одним UPDATE переписує шляхи всього її піддерева"""
+    old_path = folder.path
+    new_path = build_folder_path(folder.id, new_parent)
+
+    await db.execute(
+        update(Folder)
+        .where(subtree_filter(folder))
+        .values(path=func.concat(new_path, func.substr(Folder.path, len(old_path) + 1)))
+        .execution_options(synchronize_session=False)
+    )
+    folder.parent_id = new_parent.id if new_parent else None
+    folder.path = new_path
+
+async def delete_subtree(db: AsyncSession, folder: Folder) -> list[str]:
+    """Видаляє папку з усім піддеревом set-based запитами без обходу в Python; повертає ключі R2 видалених фото та їх прев'ю"""
+    subtree_ids = select(Folder.id).where(subtree_filter(folder)).scalar_subquery()
+
+    deleted = (await db.execute(
+        delete(Photo)
+        .where(Photo.folder_id.in_(subtree_ids))
+        .returning(Photo.s3_key, Photo.thumbnail_widths, Photo.user_id, Photo.content_hash)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    widths_by_key = {}
+    unreferenced = []
+    released = []
+    for s3_key, thumbnail_widths, user_id, content_hash in deleted:
+        widths_by_key[s3_key] = thumbnail_widths
+        if content_hash:
+            released.append((user_id, content_hash))
+        else:
+            unreferenced.append(s3_key)
+    # Дедупліковані об'єкти видаляються, лише коли зникло останнє посилання на них
+    unreferenced.extend(await release_objects(db, released))
+
+    s3_keys = []
+    for s3_key in unreferenced:
+        s3_keys.extend(photo_object_keys(s3_key, widths_by_key.get(s3_key)))
+
+    await db.execute(
+        delete(Folder)
+        .where(subtree_filter(folder))
+        .execution_options(synchronize_session=False)
+    )
+    return s3_keys
+
+def folder_depth():
+    """Глибина папки від кореня (0 — коренева), обчислена з path у SQL"""
+    return func.array_length(func.string_to_array(Folder.path, PATH_SEPARATOR), 1) - 1
+
+async def folder_tree_rows(db: AsyncSession, root: Optional[Folder], user: User, max_depth: Optional[int] = None):
+    """Усе дерево одним запитом: папки піддерева root (або всі папки користувача) з кількістю
+    та сумарним розміром фото в кожній. Рядки впорядковані за path — батьки перед дітьми.
+    """
+    if root is None:
+        scope = Folder.user_id == user.id
+        base_depth = 0
+    else:
+        scope = subtree_filter(root)
+        base_depth = len(folder_ancestor_ids(root)) - 1
+
+    depth = (folder_depth() - base_depth).label("depth")
+    query = (
+        select(
+            Folder.id,
+            Folder.name,
+            Folder.parent_id,
+            Folder.created_at,
+            depth,
+            func.count(Photo.id).label("photo_count"),
+            func.coalesce(func.sum(Photo.size), 0).label("total_size"),
+        )
+        .outerjoin(Photo, Photo.folder_id == Folder.id)
+        .where(scope)
+        .group_by(Folder.id)
+        .order_by(Folder.path)
+    )
+    if max_depth is not None:
+        query = query.where(folder_depth() - base_depth <= max_depth)
+    return (await db.execute(query)).all()
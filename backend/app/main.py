@@ -1,13 +1,49 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from .database import Base, engine
-from .routers import auth, folders, photos
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+from .database import dispose_async_engine, engine, get_async_engine
+from .pagination import NEXT_CURSOR_HEADER
+from .caching import ETAG_HEADER
+from .metrics import MetricsMiddleware
+from .profiling import start_profiler, stop_profiler
+from .routers import auth, files, folders, metrics, photos, usage
+from .services import passwords, thumbnails
+from .services.object_cache import close_object_cache
+from .services.storage import STORAGE_BACKEND, get_storage
+import asyncio
 import os
 
-Base.metadata.create_all(bind=engine)
+# Прогрів клієнта сховища та пулу БД після старту, у фоні — воркер приймає запити одразу
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
 
-app = FastAPI(title="Photo Album API")
+async def warm_up():
+    try:
+        await run_in_threadpool(get_storage)
+        async with get_async_engine().connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"Помилка прогріву: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if STORAGE_BACKEND == "local":
+        # Помилка конфігурації локального сховища (немає SECRET_KEY) — при старті, а не на першому запиті
+        get_storage()
+    warmup_task = asyncio.create_task(warm_up()) if STARTUP_WARMUP else None
+    start_profiler()
+    yield
+    stop_profiler()
+    if warmup_task:
+        warmup_task.cancel()
+    thumbnails.shutdown_executor()
+    passwords.shutdown_executor()
+    close_object_cache()
+    await dispose_async_engine()
+    engine.dispose()
+
+app = FastAPI(title="Photo Album API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,15 +56,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER, "Content-Range", "Accept-Ranges"],
 )
-
-os.makedirs("uploads", exist_ok=True)
-
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(folders.router)
 app.include_router(photos.router)
+app.include_router(files.router)
+app.include_router(metrics.router)
+app.include_router(usage.router)
 
 @app.get("/")
 def root():
@@ -0,0 +1,218 @@
+"""Метрики у текстовому форматі Prometheus: затримки маршрутів, SQL-запити, виклики сховища.
+
+Все зберігається в пам'яті процесу — кожен воркер uvicorn віддає власні значення,
+Prometheus збирає їх окремо по кожному інстансу.
+"""
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from typing import Optional
+import bisect
+import os
+import threading
+import time
+
+# /metrics і /metrics/profile вимагають Authorization: Bearer <токен>; без токена вони вимкнені
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+class Histogram:
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        # мітки -> [лічильники по кошиках..., +Inf, сума]
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            prefix = f"{label_text}," if label_text else ""
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{label_text}}} {value}")
+        return lines
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Час обробки запиту", ("method", "route", "status")
+)
+REQUEST_SQL_QUERIES = Histogram(
+    "http_request_sql_queries", "Кількість SQL-запитів на один HTTP-запит", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_SQL_DURATION = Histogram(
+    "http_request_sql_duration_seconds", "Сумарний час SQL-запитів одного HTTP-запиту", ("method", "route")
+)
+SQL_QUERY_DURATION = Histogram("sql_query_duration_seconds", "Час одного SQL-запиту", ("statement",))
+STORAGE_CALL_DURATION = Histogram(
+    "storage_call_duration_seconds", "Час виклику сховища файлів", ("backend", "operation", "outcome")
+)
+PRESIGNED_URL_BATCH_DURATION = Histogram(
+    "presigned_url_batch_duration_seconds", "Час підпису пакета посилань", ()
+)
+PRESIGNED_URL_CACHE = Counter("presigned_url_cache_total", "Звернення до кешу посилань", ("result",))
+DOWNLOAD_CACHE = Counter("download_cache_total", "Звернення до дискового кешу завантажень", ("result",))
+DOWNLOAD_CACHE_EVICTED_BYTES = Counter("download_cache_evicted_bytes_total", "Байти, витіснені з кешу завантажень", ())
+
+METRICS = [
+    REQUEST_DURATION, REQUEST_SQL_QUERIES, REQUEST_SQL_DURATION, SQL_QUERY_DURATION,
+    STORAGE_CALL_DURATION, PRESIGNED_URL_BATCH_DURATION, PRESIGNED_URL_CACHE,
+    DOWNLOAD_CACHE, DOWNLOAD_CACHE_EVICTED_BYTES,
+]
+
+class RequestStats:
+    """Лічильники поточного HTTP-запиту; спільний змінний об'єкт, тож його бачать і потоки threadpool.
+
+    Після відправлення відповіді запис вимикається: фонові задачі успадковують контекст
+    запиту, але їхні SQL-запити до нього не належать.
+    """
+
+    __slots__ = ("sql_queries", "sql_seconds", "recording")
+
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.recording = True
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def start_request() -> RequestStats:
+    stats = RequestStats()
+    _request_stats.set(stats)
+    return stats
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started_at"].pop()
+    elapsed = time.perf_counter() - started
+    # Перше слово — SELECT/INSERT/UPDATE/... — без тексту запиту, щоб не роздувати кількість міток
+    SQL_QUERY_DURATION.observe(elapsed, statement.lstrip().split(None, 1)[0].upper())
+
+    stats = _request_stats.get()
+    if stats is not None and stats.recording:
+        stats.sql_queries += 1
+        stats.sql_seconds += elapsed
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started_at"):
+        connection.info["query_started_at"].pop()
+
+PASSWORD_HASH_GAUGES = {"queued", "running", "wait_seconds_max"}
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    # Черга хешування паролів уже рахує себе сама — віддаємо її знімок
+    from .services.passwords import password_hash_stats
+    for name, value in password_hash_stats().items():
+        metric_type = "gauge" if name in PASSWORD_HASH_GAUGES else "counter"
+        lines.append(f"# TYPE password_hash_{name} {metric_type}")
+        lines.append(f"password_hash_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+def _route_template(scope) -> str:
+    """Шаблон маршруту (/photos/{photo_id}), а не конкретний шлях — інакше міток буде безліч"""
+    route = scope.get("route")
+    if route is None:
+        for candidate in scope["app"].router.routes:
+            match, _child_scope = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", "unmatched")
+
+class MetricsMiddleware:
+    """ASGI-middleware: час запиту, кількість і час SQL, заголовок Server-Timing для DevTools"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = start_request()
+        status = "500"
+
+        def record():
+            # Один раз на запит: коли відправлено останній шматок тіла або застосунок завершився без нього
+            if not stats.recording:
+                return
+            stats.recording = False
+            _request_stats.set(None)
+            route = _route_template(scope)
+            method = scope["method"]
+            REQUEST_DURATION.observe(time.perf_counter() - started, method, route, status)
+            REQUEST_SQL_QUERIES.observe(stats.sql_queries, method, route)
+            REQUEST_SQL_DURATION.observe(stats.sql_seconds, method, route)
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                server_timing = (
+                    f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_queries} queries", '
+                    f"app;dur={elapsed_ms:.1f}"
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", server_timing.encode())]
+            await send(message)
+            # Фонові задачі BackgroundTasks виконуються вже після цього і в час запиту не входять
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            record()
@@ -1,6 +1,6 @@
-from sqlalchemy import Boolean, Column, String, Integer, ForeignKey, DateTime
+from sqlalchemy import BigInteger, Boolean, Column, String, Integer, Float, ForeignKey, DateTime, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from datetime import datetime
 import uuid
 from .database import Base
@@ -12,6 +12,13 @@ class User(Base):
     email      = Column(String, unique=True, nullable=False)
     name       = Column(String)
     password   = Column(String, nullable=False)
+    # Лічильник змін кореневих і «поширених мені» списків (див. versions.py)
+    version    = Column(Integer, nullable=False, default=0, server_default="0")
+    # Сумарний розмір і кількість завантажених користувачем фото (див. usage.py)
+    used_bytes  = Column(BigInteger, nullable=False, default=0, server_default="0")
+    photo_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # NULL — діє DEFAULT_QUOTA_BYTES
+    quota_bytes = Column(BigInteger, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     folders = relationship("Folder", back_populates="user")
@@ -25,8 +32,22 @@ class Folder(Base):
     name       = Column(String, nullable=False)
     user_id    = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     parent_id = Column(UUID(as_uuid=True), ForeignKey("folders.id", ondelete="CASCADE"), nullable=True)
+    # Матеріалізований шлях: id усіх предків і самої папки через "/", від кореня
+    path       = Column(String, nullable=False)
+    # Лічильник змін вмісту папки (див. versions.py)
+    version    = Column(Integer, nullable=False, default=0, server_default="0")
+    # Розмір і кількість фото в папці та всіх її підпапках (див. usage.py)
+    subtree_bytes       = Column(BigInteger, nullable=False, default=0, server_default="0")
+    subtree_photo_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_folders_path", "path", postgresql_ops={"path": "text_pattern_ops"}),
+        # Кореневі папки користувача та підпапки, у порядку пагінації
+        Index("ix_folders_user_parent_created", "user_id", "parent_id", "created_at", "id"),
+        Index("ix_folders_parent_created", "parent_id", "created_at", "id"),
+    )
+
     user     = relationship("User", back_populates="folders")
     parent   = relationship("Folder", remote_side=[id], back_populates="children")
     children = relationship("Folder", back_populates="parent")
@@ -43,8 +64,36 @@ class Photo(Base):
     mime_type  = Column(String)
     user_id    = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     folder_id = Column(UUID(as_uuid=True), ForeignKey("folders.id", ondelete="CASCADE"), nullable=True)
+    # SHA-256 вмісту; NULL для фото, завантажених до дедуплікації
+    content_hash = Column(String(64), nullable=True)
+    # Ширини вже згенерованих WebP-прев'ю (див. services/thumbnails.py)
+    thumbnail_widths = Column(ARRAY(Integer), nullable=False, default=list, server_default="{}")
+    # Метадані з заголовків файлу (див. services/photo_metadata.py)
+    taken_at     = Column(DateTime, nullable=True)
+    width        = Column(Integer, nullable=True)
+    height       = Column(Integer, nullable=True)
+    camera_make  = Column(String(128), nullable=True)
+    camera_model = Column(String(128), nullable=True)
+    latitude     = Column(Float, nullable=True)
+    longitude    = Column(Float, nullable=True)
+    # false — метадані ще не читались (фото до їх збору), їх заповнить воркер
+    metadata_extracted = Column(Boolean, nullable=False, default=False, server_default="false")
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Фото поза папками для власника та фото всередині папки, у порядку пагінації
+        Index("ix_photos_user_folder_created", "user_id", "folder_id", "created_at", "id"),
+        Index("ix_photos_folder_created", "folder_id", "created_at", "id"),
+        Index("ix_photos_s3_key", "s3_key"),
+        Index("ix_photos_user_content_hash", "user_id", "content_hash"),
+        # Пошук: діапазон дат зйомки, камера, координати — завжди в межах фото користувача
+        Index("ix_photos_user_taken", "user_id", "taken_at", "id"),
+        Index("ix_photos_user_camera_taken", "user_id", "camera_make", "camera_model", "taken_at"),
+        Index("ix_photos_user_location", "user_id", "latitude", "longitude",
+              postgresql_where=text("latitude IS NOT NULL")),
+        Index("ix_photos_metadata_pending", "s3_key", postgresql_where=text("NOT metadata_extracted")),
+    )
+
     user   = relationship("User", back_populates="photos")
     folder = relationship("Folder", back_populates="photos")
 
@@ -57,6 +106,11 @@ class SharedPhoto(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        UniqueConstraint("photo_id", "user_id", name="uq_shared_photos_photo_user"),
+        Index("ix_shared_photos_user_photo", "user_id", "photo_id"),
+    )
+
 
 class SharedFolder(Base):
     __tablename__ = "shared_folders"
@@ -65,4 +119,61 @@ class SharedFolder(Base):
     folder_id = Column(UUID(as_uuid=True), ForeignKey("folders.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     can_delete = Column(Boolean, default=False) 
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("folder_id", "user_id", name="uq_shared_folders_folder_user"),
+        Index("ix_shared_folders_user_folder", "user_id", "folder_id"),
+    )
+
+
+class DeletionJob(Base):
+    """Фонове видалення файлів з R2 після видалення папки з БД"""
+    __tablename__ = "deletion_jobs"
+
+    id              = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id         = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    folder_id       = Column(UUID(as_uuid=True), nullable=False)
+    status          = Column(String, nullable=False, default="pending")
+    total_objects   = Column(Integer, nullable=False, default=0)
+    deleted_objects = Column(Integer, nullable=False, default=0)
+    pending_keys    = Column(ARRAY(String), nullable=False, default=list)
+    created_at      = Column(DateTime, default=datetime.utcnow)
+    # Оновлюється з кожним збереженим прогресом — за ним видно задачі, що зависли після падіння воркера
+    updated_at      = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at     = Column(DateTime)
+
+
+class PhotoNotification(Base):
+    """Подія «нове фото у спільній папці» для одного отримувача; надсилаються дайджестом"""
+    __tablename__ = "photo_notifications"
+
+    id              = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    folder_id       = Column(UUID(as_uuid=True), ForeignKey("folders.id", ondelete="CASCADE"), nullable=False)
+    recipient_email = Column(String, nullable=False)
+    uploader_email  = Column(String, nullable=False)
+    photo_count     = Column(Integer, nullable=False, default=1, server_default="1")
+    status          = Column(String, nullable=False, default="pending")
+    attempts        = Column(Integer, nullable=False, default=0)
+    created_at      = Column(DateTime, default=datetime.utcnow)
+    sent_at         = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_photo_notifications_pending", "status", "folder_id", "recipient_email", "created_at"),
+    )
+
+
+class StoredObject(Base):
+    """Один файл у R2 на (користувач, SHA-256 вмісту); на нього можуть посилатися кілька фото"""
+    __tablename__ = "stored_objects"
+
+    user_id      = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    s3_key       = Column(String, nullable=False)
+    size         = Column(Integer)
+    ref_count    = Column(Integer, nullable=False, default=0)
+    created_at   = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_stored_objects_s3_key", "s3_key"),
+    )
@@ -0,0 +1,68 @@
+from fastapi import HTTPException, Query, Request, Response
+from sqlalchemy import Select, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+import base64
+import os
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 500))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Невалідний курсор")
+
+class PageParams:
+    """Параметри keyset-пагінації; курсор наступної сторінки повертається в заголовку X-Next-Cursor"""
+
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        cursor: Optional[str] = None,
+        limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    ):
+        self.request = request
+        self.response = response
+        self.cursor = cursor
+        self.limit = limit
+
+async def paginate(db: AsyncSession, query: Select, created_at_column, id_column, page: PageParams) -> list:
+    """Повертає одну сторінку запиту, впорядкованого за (created_at, id).
+
+    Замість created_at можна передати іншу не-NULL колонку з датою (напр. Photo.taken_at);
+    вона має бути серед вибраних колонок під тим самим ім'ям.
+    """
+    query = query.order_by(created_at_column, id_column)
+
+    if page.cursor:
+        created_at, row_id = decode_cursor(page.cursor)
+        query = query.where(
+            tuple_(created_at_column, id_column) > tuple_(
+                literal(created_at, created_at_column.type),
+                literal(row_id, id_column.type)
+            )
+        )
+
+    rows = (await db.execute(query.limit(page.limit + 1))).all()
+
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        page.response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, created_at_column.key), getattr(last, id_column.key)
+        )
+
+    return rows
@@ -0,0 +1,72 @@
+"""Опційний семплюючий профайлер: раз на PROFILER_INTERVAL_MS знімає стеки всіх потоків.
+
+Вимкнений, поки PROFILER_INTERVAL_MS не задано. Результат — «згорнуті» стеки
+(формат flamegraph.pl / speedscope): "модуль:функція;модуль:функція кількість".
+"""
+from collections import Counter
+from typing import Optional
+import os
+import sys
+import threading
+
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", 0))
+# Обмеження кількості різних стеків, щоб довгий прогін не з'їв пам'ять
+PROFILER_MAX_STACKS = int(os.getenv("PROFILER_MAX_STACKS", 20000))
+PROFILER_MAX_DEPTH = 64
+
+class SamplingProfiler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILER_MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                    frame = frame.f_back
+                collapsed = ";".join(reversed(stack))
+                with self._lock:
+                    if collapsed in self.samples or len(self.samples) < PROFILER_MAX_STACKS:
+                        self.samples[collapsed] += 1
+
+    def collapsed(self, reset: bool = False) -> str:
+        with self._lock:
+            samples = self.samples
+            if reset:
+                self.samples = Counter()
+        return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+_profiler: Optional[SamplingProfiler] = None
+
+def start_profiler():
+    global _profiler
+    if PROFILER_INTERVAL_MS > 0 and _profiler is None:
+        _profiler = SamplingProfiler(PROFILER_INTERVAL_MS / 1000)
+        _profiler.start()
+
+def stop_profiler():
+    global _profiler
+    if _profiler is not None:
+        _profiler.stop()
+        _profiler = None
+
+def get_profiler() -> Optional[SamplingProfiler]:
+    return _profiler
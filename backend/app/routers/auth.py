@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt
 from datetime import datetime, timedelta
-from ..database import get_db
+from ..database import get_async_db
 from ..models import User
 from ..schemas import UserRegister, UserLogin, TokenResponse
+from ..dependencies import SECRET_KEY, ALGORITHM
+from ..services.passwords import PasswordHashQueueFull, hash_password, verify_password
 import os
 
 router = APIRouter(prefix="/auth", tags=["auth"])
-pwd_context = CryptContext(schemes=["bcrypt"])
 
 def create_token(user_id: str) -> str:
     expire = datetime.utcnow() + timedelta(
@@ -17,31 +18,49 @@ def create_token(user_id: str) -> str:
     )
     return jwt.encode(
         {"sub": str(user_id), "exp": expire},
-        os.getenv("SECRET_KEY"),
-        algorithm=os.getenv("ALGORITHM")
+        SECRET_KEY,
+        algorithm=ALGORITHM
     )
 
 @router.post("/register", response_model=TokenResponse)
-def register(data: UserRegister, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == data.email).first():
+async def register(data: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    if await db.scalar(select(User).where(User.email == data.email)):
         raise HTTPException(status_code=400, detail="Email вже використовується")
 
+    try:
+        password_hash = await hash_password(data.password)
+    except PasswordHashQueueFull:
+        raise HTTPException(status_code=503, detail="Сервер перевантажений, спробуйте пізніше")
+
     user = User(
         email=data.email,
         name=data.name,
-        password=pwd_context.hash(data.password)
+        password=password_hash
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     return {"access_token": create_token(user.id)}
 
 @router.post("/login", response_model=TokenResponse)
-def login(data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
+async def login(data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == data.email))
 
-    if not user or not pwd_context.verify(data.password, user.password):
+    if not user:
         raise HTTPException(status_code=401, detail="Невірний email або пароль")
 
+    try:
+        valid, new_hash = await verify_password(data.password, user.password)
+    except PasswordHashQueueFull:
+        raise HTTPException(status_code=503, detail="Сервер перевантажений, спробуйте пізніше")
+
+    if not valid:
+        raise HTTPException(status_code=401, detail="Невірний email або пароль")
+
+    # Вартість bcrypt змінилась — прозоро оновлюємо хеш
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
     return {"access_token": create_token(user.id)}
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import FileResponse
+from ..services.storage import LocalStorage, get_storage
+import os
+import time
+
+router = APIRouter(prefix="/uploads", tags=["files"])
+
+# Якщо API стоїть за nginx, файл віддає nginx через sendfile: наприклад "/protected-uploads"
+# з location internal; alias <LOCAL_STORAGE_DIR>/;
+LOCAL_STORAGE_ACCEL_REDIRECT = os.getenv("LOCAL_STORAGE_ACCEL_REDIRECT")
+
+@router.get("/{key:path}")
+def get_file(key: str, expires: int, signature: str):
+    """Віддає файл з локального сховища за підписаним посиланням"""
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="Файл не знайдено")
+
+    if not storage.verify_signature(key, expires, signature):
+        raise HTTPException(status_code=403, detail="Посилання недійсне або застаріло")
+
+    try:
+        info = storage.head(key)
+    except ValueError:
+        info = None
+    if info is None:
+        raise HTTPException(status_code=404, detail="Файл не знайдено")
+
+    # Підписане посилання дійсне лише до expires — довше кешувати не можна
+    headers = {"Cache-Control": f"private, max-age={max(int(expires - time.time()), 0)}"}
+    if LOCAL_STORAGE_ACCEL_REDIRECT:
+        headers["X-Accel-Redirect"] = f"{LOCAL_STORAGE_ACCEL_REDIRECT.rstrip('/')}/{key}"
+        return Response(media_type=info.content_type, headers=headers)
+    return FileResponse(storage.path(key), media_type=info.content_type, headers=headers)
@@ -1,175 +1,305 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
+from datetime import datetime, timedelta
 from typing import List, Optional
+from urllib.parse import quote
+import uuid
 
-from ..services.s3 import delete_from_s3
-from ..database import get_db
-from ..models import Folder, Photo, SharedFolder, User
-from ..schemas import FolderCreate, FolderResponse, ShareFolderRequest
+from ..services.deletion import DELETION_JOB_STALE_AFTER, run_deletion_job
+from ..services.notifications import invalidate_recipients
+from ..services.zip_export import export_entries, stream_zip
+from ..database import get_async_db
+from ..models import DeletionJob, Folder, Photo, SharedFolder, User
+from ..schemas import DeletionJobResponse, FolderCreate, FolderMove, FolderResponse, FolderTreeNode, ShareFolderRequest
 from ..dependencies import get_current_user
+from .. import folder_tree
+from ..folder_tree import (
+    build_folder_path, can_delete_folder, can_view_folder, delete_subtree, folder_ancestor_ids, folder_tree_rows
+)
+from ..pagination import PageParams, paginate
+from ..caching import listing_etag, not_modified
+from ..versions import bump_parent, bump_user, folder_change_statements, photo_change_statements
+from ..usage import folder_move_statements, subtree_removal_statements
 
 router = APIRouter(prefix="/folders", tags=["folders"])
 
+# Лише колонки, потрібні для FolderResponse — без гідратації ORM-об'єктів
+FOLDER_LISTING_COLUMNS = (Folder.id, Folder.name, Folder.parent_id, Folder.created_at)
+
 @router.get("/", response_model=List[FolderResponse])
-def get_folders(
+async def get_folders(
     parent_id: Optional[UUID] = None,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     if parent_id is None:
-        folders = db.query(Folder).filter(
+        # Кешований користувач може мати застарілу версію — читаємо свіжу
+        version = await db.scalar(select(User.version).where(User.id == current_user.id))
+        if (cached := not_modified(page, listing_etag(page, "folders", current_user.id, version))):
+            return cached
+
+        query = select(*FOLDER_LISTING_COLUMNS).where(
             Folder.user_id == current_user.id,
             Folder.parent_id == None
-        ).all()
-        return folders
+        )
+        return await paginate(db, query, Folder.created_at, Folder.id, page)
 
-    parent_folder = db.query(Folder).filter(Folder.id == parent_id).first()
+    parent_folder = await db.get(Folder, parent_id)
     if not parent_folder:
         raise HTTPException(status_code=404, detail="Папку не знайдено")
 
-    has_access = False
-
-    if parent_folder.user_id == current_user.id:
-        has_access = True
-    else:
-        current_check = parent_folder
-        while current_check:
-            shared_link = db.query(SharedFolder).filter(
-                SharedFolder.folder_id == current_check.id,
-                SharedFolder.user_id == current_user.id
-            ).first()
-            
-            if shared_link:
-                has_access = True
-                break
-            
-            if current_check.parent_id:
-                current_check = db.query(Folder).filter(Folder.id == current_check.parent_id).first()
-            else:
-                break
+    has_access = await can_view_folder(db, parent_folder, current_user)
 
     if not has_access:
         raise HTTPException(status_code=403, detail="У вас немає доступу до цієї папки")
 
-    subfolders = db.query(Folder).filter(Folder.parent_id == parent_id).all()
-    return subfolders
+    if (cached := not_modified(page, listing_etag(page, "folders", parent_folder.id, parent_folder.version))):
+        return cached
+
+    query = select(*FOLDER_LISTING_COLUMNS).where(Folder.parent_id == parent_id)
+    return await paginate(db, query, Folder.created_at, Folder.id, page)
+
+@router.get("/tree", response_model=List[FolderTreeNode])
+async def get_folder_tree(
+    root_id: Optional[UUID] = None,
+    max_depth: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Усі папки користувача або піддерево root_id (напр. поширеної папки) одним запитом"""
+    root = None
+    if root_id is not None:
+        root = await db.get(Folder, root_id)
+        if not root:
+            raise HTTPException(status_code=404, detail="Папку не знайдено")
+        if not await can_view_folder(db, root, current_user):
+            raise HTTPException(status_code=403, detail="У вас немає доступу до цієї папки")
+
+    return await folder_tree_rows(db, root, current_user, max_depth)
 
 @router.post("/", response_model=FolderResponse)
-def create_folder(
+async def create_folder(
     data: FolderCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
+    parent = None
     if data.parent_id:
-        parent = db.query(Folder).filter(
+        parent = await db.scalar(select(Folder).where(
             Folder.id == data.parent_id,
             Folder.user_id == user.id
-        ).first()
+        ))
         if not parent:
             raise HTTPException(status_code=404, detail="Батьківська папка не знайдена")
 
-    folder = Folder(name=data.name, user_id=user.id, parent_id=data.parent_id)
+    folder_id = uuid.uuid4()
+    folder = Folder(
+        id=folder_id,
+        name=data.name,
+        user_id=user.id,
+        parent_id=data.parent_id,
+        path=build_folder_path(folder_id, parent)
+    )
     db.add(folder)
-    db.commit()
-    db.refresh(folder)
+    await db.execute(bump_parent(folder))
+    await db.commit()
+    await db.refresh(folder)
     return folder
 
-def delete_folder_recursively(folder_id: UUID, db: Session):
-    """Рекурсивно видаляє всі файли з S3 та записи з БД (фото і підпапки)"""
-    photos = db.query(Photo).filter(Photo.folder_id == folder_id).all()
-    for photo in photos:
-        delete_from_s3(photo.s3_key)
-        db.delete(photo)
+@router.put("/{folder_id}/move", response_model=FolderResponse)
+async def move_folder(
+    folder_id: UUID,
+    data: FolderMove,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    folder = await db.scalar(select(Folder).where(Folder.id == folder_id, Folder.user_id == user.id))
+    if not folder:
+        raise HTTPException(status_code=404, detail="Папку не знайдено або у вас немає прав")
 
-    subfolders = db.query(Folder).filter(Folder.parent_id == folder_id).all()
-    for subfolder in subfolders:
-        delete_folder_recursively(subfolder.id, db)
+    new_parent = None
+    if data.parent_id:
+        new_parent = await db.scalar(select(Folder).where(
+            Folder.id == data.parent_id,
+            Folder.user_id == user.id
+        ))
+        if not new_parent:
+            raise HTTPException(status_code=404, detail="Батьківська папка не знайдена")
+        if folder.id in folder_ancestor_ids(new_parent):
+            raise HTTPException(status_code=400, detail="Не можна перемістити папку саму в себе")
 
-    folder = db.query(Folder).filter(Folder.id == folder_id).first()
-    if folder:
-        db.delete(folder)
+    # Старе місце і «поширені» отримувачів — до переміщення, нове батьківське — після
+    for statement in [
+        *folder_change_statements(Folder.id == folder.id),
+        *folder_move_statements(folder, new_parent),
+    ]:
+        await db.execute(statement)
+    await folder_tree.move_folder(db, folder, new_parent)
+    await db.execute(bump_parent(folder))
+    await db.commit()
+    # Піддерево отримало інших предків, а з ними й інших отримувачів сповіщень
+    invalidate_recipients()
+    await db.refresh(folder)
+    return folder
+
+def deletion_job_response(job: DeletionJob) -> DeletionJobResponse:
+    failed_objects = len(job.pending_keys) if job.status == "failed" else 0
+    return DeletionJobResponse(
+        id=job.id,
+        folder_id=job.folder_id,
+        status=job.status,
+        total_objects=job.total_objects,
+        deleted_objects=job.deleted_objects,
+        failed_objects=failed_objects,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
 
 @router.delete("/{folder_id}")
-def delete_folder(
+async def delete_folder(
     folder_id: UUID,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    folder = db.query(Folder).filter(Folder.id == folder_id).first()
+    folder = await db.get(Folder, folder_id)
     if not folder:
         raise HTTPException(status_code=404, detail="Папку не знайдено")
 
-    has_permission = False
-
-    if folder.user_id == current_user.id:
-        has_permission = True
-    else:
-        current_check_folder = folder
-        while current_check_folder.parent_id:
-            shared_link = db.query(SharedFolder).filter(
-                SharedFolder.folder_id == current_check_folder.parent_id,
-                SharedFolder.user_id == current_user.id
-            ).first()
-            
-            if shared_link and shared_link.can_delete:
-                has_permission = True
-                break
-                
-            current_check_folder = db.query(Folder).filter(Folder.id == current_check_folder.parent_id).first()
-            if not current_check_folder:
-                break
+    has_permission = await can_delete_folder(db, folder, current_user)
 
     if not has_permission:
         raise HTTPException(status_code=403, detail="У вас немає прав на видалення цієї папки")
 
-    delete_folder_recursively(folder_id, db)
-    
-    db.commit()
-    
-    return {"message": "Папку та весь її вміст успішно видалено"}
+    subtree_ids = select(Folder.id).where(folder_tree.subtree_filter(folder))
+    for statement in [
+        *subtree_removal_statements(folder),
+        *folder_change_statements(Folder.id.in_(subtree_ids)),
+        *photo_change_statements(Photo.folder_id.in_(subtree_ids)),
+    ]:
+        await db.execute(statement)
+
+    s3_keys = await delete_subtree(db, folder)
+
+    # Ключі зберігаються в тій самій транзакції, тож файли не загубляться, навіть якщо воркер впаде
+    job = DeletionJob(
+        user_id=current_user.id,
+        folder_id=folder_id,
+        total_objects=len(s3_keys),
+        pending_keys=s3_keys,
+    )
+    db.add(job)
+    await db.commit()
+
+    if s3_keys:
+        background_tasks.add_task(run_deletion_job, job.id)
+    else:
+        job.status = "done"
+        job.finished_at = job.created_at
+        await db.commit()
+
+    return {"message": "Папку та весь її вміст успішно видалено", "job_id": str(job.id)}
+
+@router.get("/deletions/{job_id}", response_model=DeletionJobResponse)
+async def get_deletion_job(
+    job_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    job = await db.scalar(select(DeletionJob).where(
+        DeletionJob.id == job_id,
+        DeletionJob.user_id == current_user.id
+    ))
+    if not job:
+        raise HTTPException(status_code=404, detail="Задачу не знайдено")
+
+    return deletion_job_response(job)
+
+@router.post("/deletions/{job_id}/retry", response_model=DeletionJobResponse)
+async def retry_deletion_job(
+    job_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    job = await db.scalar(select(DeletionJob).where(
+        DeletionJob.id == job_id,
+        DeletionJob.user_id == current_user.id
+    ))
+    if not job:
+        raise HTTPException(status_code=404, detail="Задачу не знайдено")
+
+    # Окрім невдалих — задачі, що зависли в pending/running після падіння воркера.
+    # Умовний UPDATE не дає двом паралельним повторам запустити задачу двічі
+    stale_before = datetime.utcnow() - timedelta(seconds=DELETION_JOB_STALE_AFTER)
+    retried = await db.scalar(
+        update(DeletionJob)
+        .where(
+            DeletionJob.id == job.id,
+            or_(
+                DeletionJob.status == "failed",
+                and_(DeletionJob.status.in_(("pending", "running")), DeletionJob.updated_at < stale_before)
+            )
+        )
+        .values(status="pending", finished_at=None)
+        .returning(DeletionJob.id)
+        .execution_options(synchronize_session=False)
+    )
+    if not retried:
+        raise HTTPException(status_code=400, detail="Повторити можна лише невдалу або перервану задачу")
+    await db.commit()
+    await db.refresh(job)
+
+    background_tasks.add_task(run_deletion_job, job.id)
+    return deletion_job_response(job)
 
 @router.get("/shared", response_model=List[FolderResponse])
-def get_shared_folders(
-    db: Session = Depends(get_db),
+async def get_shared_folders(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    shared_records = db.query(SharedFolder).filter(SharedFolder.user_id == current_user.id).all()
-    folder_ids = [record.folder_id for record in shared_records]
-    
-    if not folder_ids:
-        return []
+    version = await db.scalar(select(User.version).where(User.id == current_user.id))
+    if (cached := not_modified(page, listing_etag(page, "shared-folders", current_user.id, version))):
+        return cached
 
-    folders = db.query(Folder).filter(Folder.id.in_(folder_ids)).all()
-    return folders
+    query = select(*FOLDER_LISTING_COLUMNS).join(
+        SharedFolder, SharedFolder.folder_id == Folder.id
+    ).where(SharedFolder.user_id == current_user.id)
+    return await paginate(db, query, Folder.created_at, Folder.id, page)
 
 
 @router.post("/{folder_id}/share")
-def share_folder(
+async def share_folder(
     folder_id: UUID,
     share_data: ShareFolderRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    folder = db.query(Folder).filter(Folder.id == folder_id, Folder.user_id == current_user.id).first()
+    folder = await db.scalar(select(Folder).where(Folder.id == folder_id, Folder.user_id == current_user.id))
     if not folder:
         raise HTTPException(status_code=404, detail="Папку не знайдено або у вас немає прав")
 
-    target_user = db.query(User).filter(User.email == share_data.email).first()
+    target_user = await db.scalar(select(User).where(User.email == share_data.email))
     if not target_user:
         raise HTTPException(status_code=404, detail="Користувача з таким email не знайдено")
 
     if target_user.id == current_user.id:
         raise HTTPException(status_code=400, detail="Не можна поділитися з собою")
 
-    already_shared = db.query(SharedFolder).filter(
+    already_shared = await db.scalar(select(SharedFolder).where(
         SharedFolder.folder_id == folder_id,
         SharedFolder.user_id == target_user.id
-    ).first()
+    ))
     
     if already_shared:
         already_shared.can_delete = share_data.can_delete
-        db.commit()
+        await db.execute(bump_user(target_user.id))
+        await db.commit()
         return {"message": "Права доступу оновлено"}
 
     new_share = SharedFolder(
@@ -178,6 +308,32 @@ def share_folder(
         can_delete=share_data.can_delete
     )
     db.add(new_share)
-    db.commit()
+    await db.execute(bump_user(target_user.id))
+    await db.commit()
 
-    return {"message": f"Папку успішно поширено для {target_user.email}"}
\ No newline at end of file
+    return {"message": f"Папку успішно поширено для {target_user.email}"}
+
+@router.get("/{folder_id}/export")
+async def export_folder(
+    folder_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """ZIP-архів папки з підпапками, що передається в міру створення"""
+    folder = await db.get(Folder, folder_id)
+    if not folder:
+        raise HTTPException(status_code=404, detail="Папку не знайдено")
+
+    if not await can_view_folder(db, folder, current_user):
+        raise HTTPException(status_code=403, detail="У вас немає доступу до цієї папки")
+
+    entries = await export_entries(db, folder)
+    # Передача архіву може тривати хвилинами — з'єднання з БД повертаємо в пул одразу
+    await db.close()
+
+    filename = quote(f"{folder.name}.zip")
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=\"export.zip\"; filename*=UTF-8''{filename}"},
+    )
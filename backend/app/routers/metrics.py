@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import hmac
+from ..metrics import METRICS_TOKEN, render_metrics
+from ..profiling import get_profiler
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+def check_metrics_token(authorization: Optional[str]):
+    # Стеки й шляхи запитів не віддаємо анонімно
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Метрики вимкнено (METRICS_TOKEN)")
+    if not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Потрібен токен метрик")
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics(authorization: Optional[str] = Header(None)):
+    check_metrics_token(authorization)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@router.get("/profile", response_class=PlainTextResponse)
+def get_profile(reset: bool = False, authorization: Optional[str] = Header(None)):
+    """Згорнуті стеки семплюючого профайлера; reset=true починає новий інтервал"""
+    check_metrics_token(authorization)
+    profiler = get_profiler()
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Профайлер вимкнено (PROFILER_INTERVAL_MS)")
+    return PlainTextResponse(profiler.collapsed(reset=reset))
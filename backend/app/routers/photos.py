@@ -1,210 +1,694 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
+from datetime import datetime, timedelta
 from typing import List, Optional
-from ..database import get_db
-from ..models import Folder, Photo, SharedFolder, SharedPhoto, User
-from ..schemas import PhotoResponse, ShareRequest
-from ..dependencies import get_current_user
-from ..services.s3 import upload_to_s3, get_presigned_url, delete_from_s3
-from ..services.email import send_photo_notification_email
+from jose import JWTError, jwt
+from ..database import get_async_db
+from ..models import Folder, Photo, SharedPhoto, StoredObject, User
+from ..schemas import (
+    BatchUploadItem, CompleteUploadRequest, PhotoResponse, PresignedUploadRequest,
+    PresignedUploadResponse, ShareRequest
+)
+from ..dependencies import ALGORITHM, SECRET_KEY, get_current_user
+from ..pagination import PageParams, paginate
+from ..caching import listing_etag, not_modified
+from ..folder_tree import can_delete_folder, can_view_folder
+from ..versions import bump_photo_listing, bump_user, photo_change_statements
+from ..usage import fits_quota, photo_usage_statements
+from ..services.storage import (
+    UPLOAD_CHUNK_SIZE, DirectUploadUnsupported, get_presigned_url, get_presigned_urls, get_storage,
+    presigned_url_bucket
+)
+from ..services.object_cache import get_object_cache
+from ..services.thumbnails import derivative_key, generate_thumbnails
+from ..services.photo_metadata import METADATA_COLUMNS, extract_stored_metadata, extract_upload_metadata
+from ..services.notifications import enqueue_photo_notifications, folder_recipients
+from ..services.content_store import (
+    claim_existing_object, content_key, hash_file, key_taken_by_other_content, register_uploaded_object,
+    release_objects
+)
+import asyncio
+import os
+import re
 import uuid
 
 router = APIRouter(prefix="/photos", tags=["photos"])
 
 ALLOWED_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif", "image/heic", "image/heif"}
 
+# Скільки файлів пакетного завантаження одночасно йдуть у сховище
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", 4))
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", 200))
+
+QUOTA_EXCEEDED = "Перевищено квоту сховища"
+
+# Скільки дійсний токен прямого завантаження: час на PUT за посиланням і виклик /upload/complete
+UPLOAD_TOKEN_TTL = int(os.getenv("UPLOAD_TOKEN_TTL", 2 * 3600))
+
+# Лише колонки, потрібні для PhotoResponse — без гідратації ORM-об'єктів
+PHOTO_LISTING_COLUMNS = (
+    Photo.id, Photo.filename, Photo.s3_key, Photo.thumbnail_widths, Photo.folder_id, Photo.created_at,
+    *(getattr(Photo, column) for column in METADATA_COLUMNS)
+)
+
+async def build_photo_responses(photos) -> List[PhotoResponse]:
+    """Формує відповіді з посиланнями на оригінали та прев'ю, підписаними одним пакетом"""
+    keys = []
+    for photo in photos:
+        keys.append(photo.s3_key)
+        keys.extend(derivative_key(photo.s3_key, width) for width in photo.thumbnail_widths or [])
+    # Підпис сотень посилань навантажує CPU — не блокуємо цикл подій
+    urls = await run_in_threadpool(get_presigned_urls, keys)
+
+    result = []
+    for photo in photos:
+        result.append(PhotoResponse(
+            id=photo.id,
+            filename=photo.filename,
+            url=urls[photo.s3_key],
+            thumbnails={
+                width: urls[derivative_key(photo.s3_key, width)]
+                for width in photo.thumbnail_widths or []
+            },
+            folder_id=photo.folder_id,
+            created_at=photo.created_at,
+            **{column: getattr(photo, column) for column in METADATA_COLUMNS},
+        ))
+    return result
+
 @router.get("/", response_model=List[PhotoResponse])
-def get_photos(
+async def get_photos(
     folder_id: Optional[UUID] = None,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
     if folder_id is None:
-        photos = db.query(Photo).filter(
+        # Кешований користувач може мати застарілу версію — читаємо свіжу
+        version = await db.scalar(select(User.version).where(User.id == user.id))
+        etag = listing_etag(page, "photos", user.id, version, presigned_url_bucket())
+        query = select(*PHOTO_LISTING_COLUMNS).where(
             Photo.user_id == user.id,
             Photo.folder_id == None
-        ).all()
+        )
     else:
-        folder = db.query(Folder).filter(Folder.id == folder_id).first()
+        folder = await db.get(Folder, folder_id)
         if not folder:
             raise HTTPException(status_code=404, detail="Папку не знайдено")
 
-        has_access = False
-        
-        if folder.user_id == user.id:
-            has_access = True
-        else:
-            shared_folder = db.query(SharedFolder).filter(
-                SharedFolder.folder_id == folder_id,
-                SharedFolder.user_id == user.id
-            ).first()
-            if shared_folder:
-                has_access = True
-                
-        if not has_access:
+        # Доступ дає і поширення будь-якого предка папки
+        if not await can_view_folder(db, folder, user):
             raise HTTPException(status_code=403, detail="У вас немає доступу до цієї папки")
 
-        photos = db.query(Photo).filter(Photo.folder_id == folder_id).all()
+        etag = listing_etag(page, "photos", folder.id, folder.version, presigned_url_bucket())
+        query = select(*PHOTO_LISTING_COLUMNS).where(Photo.folder_id == folder_id)
 
-    result = []
-    for photo in photos:
-        result.append(PhotoResponse(
-            id=photo.id,
-            filename=photo.filename,
-            url=get_presigned_url(photo.s3_key),
-            folder_id=photo.folder_id,
-            created_at=photo.created_at,
-        ))
-    return result
+    if (cached := not_modified(page, etag)):
+        return cached
+
+    photos = await paginate(db, query, Photo.created_at, Photo.id, page)
+    return await build_photo_responses(photos)
+
+async def notify_folder_recipients(db: AsyncSession, folder_id: UUID, user: User, photo_count: int):
+    """Ставить у чергу сповіщення всім, кому поширено папку або її предків"""
+    target_emails = {
+        email for recipient_id, email in await folder_recipients(db, folder_id)
+        if recipient_id != user.id
+    }
+
+    if target_emails:
+        enqueue_photo_notifications(db, folder_id, target_emails, user.email, photo_count)
+        await db.commit()
+
+async def store_upload(
+    db: AsyncSession,
+    user: User,
+    file: UploadFile,
+    db_lock: Optional[asyncio.Lock] = None
+) -> tuple[str, int, str, dict]:
+    """Зберігає вміст файлу в сховищі один раз на користувача; повертає (ключ, розмір, хеш, метадані).
+
+    Якщо такий самий вміст уже є, завантаження пропускається і береться наявний об'єкт.
+    """
+    db_lock = db_lock or asyncio.Lock()
+    content_hash, size = await run_in_threadpool(hash_file, file.file)
+    metadata = await run_in_threadpool(extract_upload_metadata, file.file)
+
+    async with db_lock:
+        existing_key = await claim_existing_object(db, user.id, content_hash)
+    if existing_key:
+        return existing_key, size, content_hash, metadata
+
+    s3_key = content_key(user.id, content_hash)
+    # Файл вже лежить у тимчасовому spool-файлі — віддаємо його в сховище частинами поза event loop
+    await run_in_threadpool(get_storage().upload_stream, file.file, s3_key, file.content_type)
+
+    async with db_lock:
+        stored_key = await register_uploaded_object(db, user.id, content_hash, s3_key, size)
+    if stored_key != s3_key:
+        # Паралельний запит зберіг той самий вміст першим — наша копія зайва
+        await run_in_threadpool(get_storage().delete, s3_key)
+    return stored_key, size, content_hash, metadata
+
+async def known_thumbnail_widths(db: AsyncSession, s3_keys) -> dict[str, list[int]]:
+    """Прев'ю, вже згенеровані для цих об'єктів іншими фото"""
+    rows = await db.execute(
+        select(Photo.s3_key, Photo.thumbnail_widths).where(
+            Photo.s3_key.in_(list(s3_keys)),
+            func.cardinality(Photo.thumbnail_widths) > 0
+        ).distinct(Photo.s3_key)
+    )
+    return {s3_key: widths for s3_key, widths in rows}
+
+async def save_uploaded_photo(
+    db: AsyncSession,
+    background_tasks: BackgroundTasks,
+    user: User,
+    filename: str,
+    s3_key: str,
+    size: int,
+    content_type: str,
+    folder_id: Optional[UUID],
+    content_hash: Optional[str] = None,
+    metadata: Optional[dict] = None
+) -> Photo:
+    """Створює запис про вже збережений у сховищі файл, ставить прев'ю та сповіщення в чергу"""
+    photo = Photo(
+        filename=filename,
+        s3_key=s3_key,
+        size=size,
+        mime_type=content_type,
+        user_id=user.id,
+        folder_id=folder_id,
+        content_hash=content_hash,
+        thumbnail_widths=(await known_thumbnail_widths(db, [s3_key])).get(s3_key, []),
+        **(metadata or {}),
+        metadata_extracted=metadata is not None,
+    )
+    db.add(photo)
+    for statement in photo_usage_statements(user.id, folder_id, size or 0):
+        await db.execute(statement)
+    await db.execute(bump_photo_listing(folder_id, user.id))
+    await db.commit()
+    await db.refresh(photo)
+
+    if not photo.thumbnail_widths:
+        background_tasks.add_task(generate_thumbnails, s3_key)
+
+    if folder_id:
+        await notify_folder_recipients(db, folder_id, user, photo_count=1)
+
+    return photo
 
 @router.post("/upload", response_model=PhotoResponse)
 async def upload_photo(
     file: UploadFile = File(...),
     folder_id: Optional[UUID] = None,
     background_tasks: BackgroundTasks = BackgroundTasks(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
     if file.content_type not in ALLOWED_TYPES:
         raise HTTPException(status_code=400, detail="Дозволені тільки зображення")
 
-    contents = await file.read()
-    s3_key = f"{user.id}/{uuid.uuid4()}-{file.filename}"
-    upload_to_s3(contents, s3_key, file.content_type)
+    # Розмір spool-файлу відомий ще до передачі в сховище
+    if not await fits_quota(db, user.id, file.size or 0):
+        raise HTTPException(status_code=413, detail=QUOTA_EXCEEDED)
 
-    photo = Photo(
-        filename=file.filename,
+    s3_key, size, content_hash, metadata = await store_upload(db, user, file)
+
+    photo = await save_uploaded_photo(
+        db, background_tasks, user, file.filename, s3_key, size, file.content_type, folder_id, content_hash, metadata
+    )
+    return (await build_photo_responses([photo]))[0]
+
+@router.post("/upload/batch", response_model=List[BatchUploadItem])
+async def upload_photos_batch(
+    files: List[UploadFile] = File(...),
+    folder_id: Optional[UUID] = None,
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Не більше {MAX_BATCH_FILES} файлів за раз")
+    if not await fits_quota(db, user.id, sum(file.size or 0 for file in files)):
+        raise HTTPException(status_code=413, detail=QUOTA_EXCEEDED)
+
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    # AsyncSession не можна використовувати конкурентно — запити до БД з різних файлів по черзі
+    db_lock = asyncio.Lock()
+
+    async def upload_one(file: UploadFile):
+        if file.content_type not in ALLOWED_TYPES:
+            return None, "Дозволені тільки зображення"
+
+        async with semaphore:
+            try:
+                s3_key, size, content_hash, metadata = await store_upload(db, user, file, db_lock)
+            except Exception as e:
+                print(f"Помилка завантаження {file.filename}: {e}")
+                return None, "Не вдалося завантажити файл"
+
+        return Photo(
+            filename=file.filename,
+            s3_key=s3_key,
+            size=size,
+            mime_type=file.content_type,
+            user_id=user.id,
+            folder_id=folder_id,
+            content_hash=content_hash,
+            **metadata,
+            metadata_extracted=True,
+        ), None
+
+    outcomes = await asyncio.gather(*(upload_one(file) for file in files))
+
+    # Усі рядки однією транзакцією — SQLAlchemy вставляє їх пакетним INSERT
+    photos = [photo for photo, _error in outcomes if photo is not None]
+    known_widths = await known_thumbnail_widths(db, {photo.s3_key for photo in photos})
+    for photo in photos:
+        photo.thumbnail_widths = known_widths.get(photo.s3_key, [])
+    db.add_all(photos)
+    if photos:
+        for statement in photo_usage_statements(
+            user.id, folder_id, sum(photo.size for photo in photos), count=len(photos)
+        ):
+            await db.execute(statement)
+        await db.execute(bump_photo_listing(folder_id, user.id))
+    await db.commit()
+
+    for s3_key in {photo.s3_key for photo in photos} - known_widths.keys():
+        background_tasks.add_task(generate_thumbnails, s3_key)
+
+    if folder_id and photos:
+        await notify_folder_recipients(db, folder_id, user, photo_count=len(photos))
+
+    responses = iter(await build_photo_responses(photos))
+    result = []
+    for file, (photo, error) in zip(files, outcomes):
+        result.append(BatchUploadItem(
+            filename=file.filename,
+            photo=next(responses) if photo is not None else None,
+            error=error,
+        ))
+    return result
+
+def create_upload_token(user_id: UUID, s3_key: str, size: int, sha256: Optional[str]) -> str:
+    """Підписує ключ, заявлений розмір і хеш прямого завантаження — клієнт не може змінити їх до complete.
+
+    Без claim sub, тож як токен входу він не приймається.
+    """
+    return jwt.encode(
+        {
+            "upload_user": str(user_id),
+            "key": s3_key,
+            "size": size,
+            "sha256": sha256,
+            "exp": datetime.utcnow() + timedelta(seconds=UPLOAD_TOKEN_TTL),
+        },
+        SECRET_KEY,
+        algorithm=ALGORITHM
+    )
+
+def read_upload_token(token: str, user_id: UUID, s3_key: str, sha256: Optional[str]) -> int:
+    """Заявлений при presign розмір; 400, якщо токен недійсний чи виданий на інший ключ або хеш"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Токен завантаження недійсний або застарів")
+    if (
+        payload.get("upload_user") != str(user_id)
+        or payload.get("key") != s3_key
+        or payload.get("sha256") != sha256
+        or not isinstance(payload.get("size"), int)
+    ):
+        raise HTTPException(status_code=400, detail="Токен завантаження не відповідає файлу")
+    return payload["size"]
+
+@router.post("/upload/presign", response_model=PresignedUploadResponse)
+async def presign_upload(
+    data: PresignedUploadRequest,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    """Видає посилання для завантаження файлу напряму в R2, минаючи API.
+
+    Якщо клієнт передав SHA-256 вмісту, який у користувача вже є, завантажувати нічого не треба.
+    """
+    if data.content_type not in ALLOWED_TYPES:
+        raise HTTPException(status_code=400, detail="Дозволені тільки зображення")
+    if not await fits_quota(db, user.id, data.size):
+        raise HTTPException(status_code=413, detail=QUOTA_EXCEEDED)
+
+    if data.sha256:
+        existing_key = await db.scalar(select(StoredObject.s3_key).where(
+            StoredObject.user_id == user.id,
+            StoredObject.content_hash == data.sha256,
+            StoredObject.ref_count > 0
+        ))
+        if existing_key:
+            return PresignedUploadResponse(
+                s3_key=existing_key,
+                already_stored=True,
+                upload_token=create_upload_token(user.id, existing_key, data.size, data.sha256),
+            )
+        s3_key = content_key(user.id, data.sha256)
+    else:
+        s3_key = f"{user.id}/{uuid.uuid4()}-{data.filename}"
+
+    upload_token = create_upload_token(user.id, s3_key, data.size, data.sha256)
+    storage = get_storage()
+    try:
+        if data.size <= UPLOAD_CHUNK_SIZE:
+            url = await run_in_threadpool(storage.generate_presigned_put_url, s3_key, data.content_type, data.size)
+            return PresignedUploadResponse(s3_key=s3_key, url=url, upload_token=upload_token)
+
+        part_count = -(-data.size // UPLOAD_CHUNK_SIZE)
+        if part_count > 10000:
+            raise HTTPException(status_code=400, detail="Файл завеликий")
+
+        upload_id, part_urls = await run_in_threadpool(
+            storage.create_presigned_multipart_upload, s3_key, data.content_type, part_count
+        )
+    except DirectUploadUnsupported:
+        raise HTTPException(status_code=400, detail="Сховище не підтримує пряме завантаження, використайте /photos/upload")
+    return PresignedUploadResponse(
         s3_key=s3_key,
-        size=len(contents),
-        mime_type=file.content_type,
-        user_id=user.id,
-        folder_id=folder_id,
+        upload_id=upload_id,
+        part_size=UPLOAD_CHUNK_SIZE,
+        part_urls=part_urls,
+        upload_token=upload_token,
     )
-    db.add(photo)
-    db.commit()
-    db.refresh(photo)
 
-    if folder_id:
-        current_folder_to_check = db.query(Folder).filter(Folder.id == folder_id).first()
-        target_emails = set()
-        main_folder_name = current_folder_to_check.name if current_folder_to_check else "папку"
-
-        temp_folder = current_folder_to_check
-        while temp_folder:
-            shared_records = db.query(SharedFolder).filter(SharedFolder.folder_id == temp_folder.id).all()
-            
-            for record in shared_records:
-                user_to_notify = db.query(User).filter(User.id == record.user_id).first()
-                if user_to_notify and user_to_notify.id != user.id:
-                    target_emails.add(user_to_notify.email)
-
-            if temp_folder.parent_id:
-                temp_folder = db.query(Folder).filter(Folder.id == temp_folder.parent_id).first()
+@router.post("/upload/complete", response_model=PhotoResponse)
+async def complete_upload(
+    data: CompleteUploadRequest,
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    """Перевіряє завантажений напряму об'єкт через HEAD і створює запис про фото.
+
+    Ключ, хеш і розмір мають збігатися з підписаними при presign (upload_token).
+    SHA-256 від клієнта не перевіряється: дедуплікація в межах одного користувача,
+    тож хибний хеш зачепить лише його власні фото. Ключ, на який уже посилається
+    інший вміст, не реєструється і не видаляється.
+    """
+    if not data.s3_key.startswith(f"{user.id}/"):
+        raise HTTPException(status_code=403, detail="Це не ваш файл")
+    declared_size = read_upload_token(data.upload_token, user.id, data.s3_key, data.sha256)
+
+    if await key_taken_by_other_content(db, data.s3_key, data.sha256):
+        raise HTTPException(status_code=400, detail="Фото вже збережено")
+
+    claimed_key = None
+    if data.sha256:
+        claimed_key = await claim_existing_object(db, user.id, data.sha256)
+
+    if claimed_key:
+        # Вміст уже збережено — копію, яку клієнт міг завантажити паралельно, прибираємо
+        if claimed_key != data.s3_key:
+            if data.upload_id:
+                await run_in_threadpool(get_storage().abort_multipart_upload, data.s3_key, data.upload_id)
             else:
-                break
-
-        if target_emails:
-            background_tasks.add_task(
-                send_photo_notification_email, 
-                recipient_emails=list(target_emails), 
-                uploader_email=user.email, 
-                folder_name=main_folder_name
-            )
+                await run_in_threadpool(get_storage().delete, data.s3_key)
+        s3_key = claimed_key
+    else:
+        s3_key = data.s3_key
+        if data.upload_id:
+            parts = [{"ETag": part.etag, "PartNumber": part.part_number} for part in data.parts]
+            try:
+                await run_in_threadpool(get_storage().complete_multipart_upload, s3_key, data.upload_id, parts)
+            except Exception:
+                raise HTTPException(status_code=400, detail="Не вдалося завершити завантаження")
+
+    head = await run_in_threadpool(get_storage().head, s3_key)
+    if head is None:
+        raise HTTPException(status_code=400, detail="Файл не знайдено у сховищі")
 
-    return PhotoResponse(
-        id=photo.id,
-        filename=photo.filename,
-        url=get_presigned_url(s3_key),
-        folder_id=photo.folder_id,
-        created_at=photo.created_at,
+    # Для вже збереженого вмісту розмір перевірено при першому завантаженні
+    if not claimed_key and head.size != declared_size:
+        await run_in_threadpool(get_storage().delete, s3_key)
+        raise HTTPException(status_code=400, detail="Розмір файлу не збігається із заявленим")
+
+    content_type = head.content_type
+    if content_type not in ALLOWED_TYPES:
+        if not claimed_key:
+            await run_in_threadpool(get_storage().delete, s3_key)
+        raise HTTPException(status_code=400, detail="Дозволені тільки зображення")
+
+    # Перевірка при presign спиралась на заявлений розмір — тут уже фактичний.
+    # Незакомічене посилання claim_existing_object відкотиться разом із сесією
+    if not await fits_quota(db, user.id, head.size):
+        if not claimed_key:
+            await run_in_threadpool(get_storage().delete, s3_key)
+        raise HTTPException(status_code=413, detail=QUOTA_EXCEEDED)
+
+    if data.sha256 and not claimed_key:
+        stored_key = await register_uploaded_object(db, user.id, data.sha256, s3_key, head.size)
+        if stored_key != s3_key:
+            await run_in_threadpool(get_storage().delete, s3_key)
+            s3_key = stored_key
+
+    # Файлу в API немає — заголовки читаються з початку об'єкта одним ranged GET
+    try:
+        metadata = await run_in_threadpool(extract_stored_metadata, s3_key)
+    except Exception as e:
+        print(f"Не вдалося прочитати метадані {s3_key}: {e}")
+        metadata = None
+
+    photo = await save_uploaded_photo(
+        db, background_tasks, user, data.filename, s3_key,
+        head.size, content_type, data.folder_id, data.sha256, metadata
     )
+    return (await build_photo_responses([photo]))[0]
 
 @router.delete("/{photo_id}")
-def delete_photo(
+async def delete_photo(
     photo_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
-    photo = db.query(Photo).filter(Photo.id == photo_id).first()
+    photo = await db.get(Photo, photo_id)
     if not photo:
         raise HTTPException(status_code=404, detail="Фото не знайдено")
 
-    has_permission = False
-
-    if photo.user_id == user.id:
-        has_permission = True
-    else:
-        if photo.folder_id:
-            shared_folder = db.query(SharedFolder).filter(
-                SharedFolder.folder_id == photo.folder_id,
-                SharedFolder.user_id == user.id
-            ).first()
-            
-            if shared_folder and shared_folder.can_delete:
-                has_permission = True
+    has_permission = photo.user_id == user.id
+    if not has_permission and photo.folder_id:
+        folder = await db.get(Folder, photo.folder_id)
+        has_permission = await can_delete_folder(db, folder, user, include_self=True)
 
     if not has_permission:
         raise HTTPException(status_code=403, detail="У вас немає прав на видалення цього фото")
 
-    delete_from_s3(photo.s3_key)
-    db.delete(photo)
-    db.commit()
+    for statement in [
+        *photo_usage_statements(photo.user_id, photo.folder_id, -(photo.size or 0), count=-1),
+        *photo_change_statements(Photo.id == photo.id),
+    ]:
+        await db.execute(statement)
+
+    # Вміст з хешем може бути спільним для кількох фото — видаляємо лише останнє посилання
+    if photo.content_hash:
+        unreferenced = await release_objects(db, [(photo.user_id, photo.content_hash)])
+    else:
+        unreferenced = [photo.s3_key]
+
+    if unreferenced:
+        await run_in_threadpool(get_storage().delete, photo.s3_key)
+        if photo.thumbnail_widths:
+            await run_in_threadpool(
+                get_storage().delete_many,
+                [derivative_key(photo.s3_key, width) for width in photo.thumbnail_widths]
+            )
+    await db.delete(photo)
+    await db.commit()
     return {"message": "Фото видалено"}
 
 @router.post("/{photo_id}/share")
-def share_photo(
+async def share_photo(
     photo_id: UUID,
     share_data: ShareRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    photo = db.query(Photo).filter(Photo.id == photo_id, Photo.user_id == current_user.id).first()
+    photo = await db.scalar(select(Photo).where(Photo.id == photo_id, Photo.user_id == current_user.id))
     if not photo:
         raise HTTPException(status_code=404, detail="Фото не знайдено або ви не є його власником")
 
-    target_user = db.query(User).filter(User.email == share_data.email).first()
+    target_user = await db.scalar(select(User).where(User.email == share_data.email))
     if not target_user:
         raise HTTPException(status_code=404, detail="Користувача з таким email не знайдено")
         
     if target_user.id == current_user.id:
         raise HTTPException(status_code=400, detail="Ви не можете поділитися фотографією самі з собою")
 
-    already_shared = db.query(SharedPhoto).filter(
+    already_shared = await db.scalar(select(SharedPhoto).where(
         SharedPhoto.photo_id == photo.id,
         SharedPhoto.user_id == target_user.id
-    ).first()
+    ))
     if already_shared:
         return {"message": "Доступ вже надано раніше"}
 
     shared_photo = SharedPhoto(photo_id=photo.id, user_id=target_user.id)
     db.add(shared_photo)
-    db.commit()
+    await db.execute(bump_user(target_user.id))
+    await db.commit()
 
     return {"message": f"Фото успішно поширено для {target_user.email}"}
 
+@router.get("/search", response_model=List[PhotoResponse])
+async def search_photos(
+    taken_from: Optional[datetime] = None,
+    taken_to: Optional[datetime] = None,
+    camera_make: Optional[str] = None,
+    camera_model: Optional[str] = None,
+    min_width: Optional[int] = Query(None, ge=1),
+    min_height: Optional[int] = Query(None, ge=1),
+    has_location: Optional[bool] = None,
+    min_latitude: Optional[float] = Query(None, ge=-90, le=90),
+    max_latitude: Optional[float] = Query(None, ge=-90, le=90),
+    min_longitude: Optional[float] = Query(None, ge=-180, le=180),
+    max_longitude: Optional[float] = Query(None, ge=-180, le=180),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    """Пошук серед власних фото за метаданими зйомки.
+
+    З фільтром за датою результати впорядковані за часом зйомки (індекс user_id, taken_at),
+    інакше — за часом завантаження.
+    """
+    conditions = [Photo.user_id == user.id]
+    if camera_make:
+        conditions.append(Photo.camera_make == camera_make)
+    if camera_model:
+        conditions.append(Photo.camera_model == camera_model)
+    if min_width:
+        conditions.append(Photo.width >= min_width)
+    if min_height:
+        conditions.append(Photo.height >= min_height)
+    if has_location is not None:
+        conditions.append(Photo.latitude.is_not(None) if has_location else Photo.latitude.is_(None))
+    if min_latitude is not None:
+        conditions.append(Photo.latitude >= min_latitude)
+    if max_latitude is not None:
+        conditions.append(Photo.latitude <= max_latitude)
+    if min_longitude is not None:
+        conditions.append(Photo.longitude >= min_longitude)
+    if max_longitude is not None:
+        conditions.append(Photo.longitude <= max_longitude)
+
+    order_column = Photo.created_at
+    if taken_from or taken_to:
+        order_column = Photo.taken_at
+        conditions.append(Photo.taken_at.is_not(None))
+        if taken_from:
+            conditions.append(Photo.taken_at >= taken_from)
+        if taken_to:
+            conditions.append(Photo.taken_at < taken_to)
+
+    query = select(*PHOTO_LISTING_COLUMNS).where(*conditions)
+    photos = await paginate(db, query, order_column, Photo.id, page)
+    return await build_photo_responses(photos)
+
 @router.get("/shared", response_model=List[PhotoResponse])
-def get_shared_photos(
-    db: Session = Depends(get_db),
+async def get_shared_photos(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    shared_records = db.query(SharedPhoto).filter(SharedPhoto.user_id == current_user.id).all()
-    
-    photo_ids = [record.photo_id for record in shared_records]
-    
-    if not photo_ids:
-        return []
+    version = await db.scalar(select(User.version).where(User.id == current_user.id))
+    etag = listing_etag(page, "shared-photos", current_user.id, version, presigned_url_bucket())
+    if (cached := not_modified(page, etag)):
+        return cached
 
-    photos = db.query(Photo).filter(Photo.id.in_(photo_ids)).all()
+    query = select(*PHOTO_LISTING_COLUMNS).join(
+        SharedPhoto, SharedPhoto.photo_id == Photo.id
+    ).where(SharedPhoto.user_id == current_user.id)
+    photos = await paginate(db, query, Photo.created_at, Photo.id, page)
+    return await build_photo_responses(photos)
 
-    result = []
-    for photo in photos:
-        result.append(PhotoResponse(
-            id=photo.id,
-            filename=photo.filename,
-            url=get_presigned_url(photo.s3_key),
-            folder_id=photo.folder_id,
-            created_at=photo.created_at,
+# bytes=0-99, bytes=-500, bytes=100-, кілька діапазонів через кому
+RANGE_HEADER = re.compile(r"^\s*bytes\s*=\s*(\d+-\d*|-\d+)(\s*,\s*(\d+-\d*|-\d+))*\s*$", re.IGNORECASE)
+
+class CachedFileResponse(FileResponse):
+    """FileResponse, що звільняє файл у кеші завантажень, хоч би як завершилась відправка.
+
+    background не підходить: Starlette не запускає його, коли сама відповідає 400/416
+    на Range або коли клієнт відключається посеред передачі.
+    """
+
+    def __init__(self, *args, release, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+@router.get("/{photo_id}/content")
+async def download_photo(
+    photo_id: UUID,
+    width: Optional[int] = None,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    """Вміст фото (або мініатюри width) з підтримкою Range.
+
+    Гарячі об'єкти віддаються з дискового кешу API; без кешу або для завеликих
+    об'єктів — перенаправлення на підписане посилання сховища.
+    """
+    photo = await db.get(Photo, photo_id)
+    if not photo:
+        raise HTTPException(status_code=404, detail="Фото не знайдено")
+
+    if photo.user_id != user.id:
+        shared = await db.scalar(select(SharedPhoto.id).where(
+            SharedPhoto.photo_id == photo.id,
+            SharedPhoto.user_id == user.id
         ))
-        
-    return result
\ No newline at end of file
+        folder = await db.get(Folder, photo.folder_id) if not shared and photo.folder_id else None
+        if not shared and not (folder and await can_view_folder(db, folder, user)):
+            raise HTTPException(status_code=404, detail="Фото не знайдено")
+
+    if width is None:
+        s3_key, media_type = photo.s3_key, photo.mime_type
+    elif width in (photo.thumbnail_widths or []):
+        s3_key, media_type = derivative_key(photo.s3_key, width), "image/webp"
+    else:
+        raise HTTPException(status_code=404, detail="Мініатюри такого розміру немає")
+    # Некоректний Range відхиляємо до звернення до кешу і сховища
+    if range_header is not None and not RANGE_HEADER.match(range_header):
+        raise HTTPException(status_code=400, detail="Некоректний заголовок Range")
+    # Завантаження з origin при промаху може бути довгим — з'єднання з БД більше не потрібне
+    await db.close()
+
+    cache = get_object_cache()
+    cached = None
+    if cache is not None:
+        try:
+            cached = await run_in_threadpool(cache.acquire, s3_key)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Файл не знайдено")
+        except Exception as e:
+            # Диск кешу заповнений, сховище відповіло помилкою — віддаємо за підписаним посиланням
+            print(f"Кеш завантажень недоступний для {s3_key}: {e}")
+    if cached is None:
+        return RedirectResponse(await run_in_threadpool(get_presigned_url, s3_key))
+
+    # Ключ не змінюється разом із вмістом, тож відповідь можна кешувати в браузері надовго;
+    # файл закріплений у кеші, доки відповідь не завершиться
+    return CachedFileResponse(
+        cached.path,
+        media_type=media_type or cached.content_type,
+        headers={"Cache-Control": "private, max-age=86400"},
+        release=lambda: cache.release(s3_key),
+    )
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from ..database import get_async_db
+from ..models import Folder, User
+from ..schemas import FolderUsageResponse, UsageResponse
+from ..dependencies import get_current_user
+from ..folder_tree import can_view_folder
+from ..usage import effective_quota, user_usage
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+@router.get("", response_model=UsageResponse)
+async def get_usage(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Використання сховища з лічильників — без підсумовування фото"""
+    used_bytes, photo_count, quota_bytes = await user_usage(db, current_user.id)
+    quota = effective_quota(quota_bytes)
+    return UsageResponse(
+        used_bytes=used_bytes,
+        photo_count=photo_count,
+        quota_bytes=quota,
+        remaining_bytes=max(quota - used_bytes, 0) if quota is not None else None,
+    )
+
+@router.get("/folders/{folder_id}", response_model=FolderUsageResponse)
+async def get_folder_usage(
+    folder_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Розмір і кількість фото папки разом з усіма підпапками"""
+    folder = await db.get(Folder, folder_id)
+    if not folder:
+        raise HTTPException(status_code=404, detail="Папку не знайдено")
+
+    if not await can_view_folder(db, folder, current_user):
+        raise HTTPException(status_code=403, detail="У вас немає доступу до цієї папки")
+
+    return FolderUsageResponse(
+        folder_id=folder.id,
+        total_bytes=folder.subtree_bytes,
+        photo_count=folder.subtree_photo_count,
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
 from uuid import UUID
 from datetime import datetime
 
@@ -20,6 +20,9 @@ class FolderCreate(BaseModel):
     name: str
     parent_id: Optional[UUID] = None
 
+class FolderMove(BaseModel):
+    parent_id: Optional[UUID] = None
+
 class FolderResponse(BaseModel):
     id: UUID
     name: str
@@ -29,19 +32,95 @@ class FolderResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class FolderTreeNode(BaseModel):
+    id: UUID
+    name: str
+    parent_id: Optional[UUID]
+    depth: int
+    photo_count: int
+    total_size: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class PhotoResponse(BaseModel):
     id: UUID
     filename: str
     url: str
+    thumbnails: Dict[int, str] = {}
     folder_id: Optional[UUID]
     created_at: datetime
+    taken_at: Optional[datetime] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    camera_make: Optional[str] = None
+    camera_model: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
     class Config:
         from_attributes = True
 
+class DeletionJobResponse(BaseModel):
+    id: UUID
+    folder_id: UUID
+    status: str
+    total_objects: int
+    deleted_objects: int
+    failed_objects: int
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+class BatchUploadItem(BaseModel):
+    filename: str
+    photo: Optional[PhotoResponse] = None
+    error: Optional[str] = None
+
+class PresignedUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+    sha256: Optional[str] = None
+
+class PresignedUploadResponse(BaseModel):
+    s3_key: str
+    already_stored: bool = False
+    url: Optional[str] = None
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    part_urls: List[str] = []
+    # Підписані ключ, розмір і хеш; передати без змін у /photos/upload/complete
+    upload_token: str
+
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class CompleteUploadRequest(BaseModel):
+    upload_token: str
+    s3_key: str
+    filename: str
+    folder_id: Optional[UUID] = None
+    upload_id: Optional[str] = None
+    parts: List[UploadedPart] = []
+    sha256: Optional[str] = None
+
 class ShareRequest(BaseModel):
     email: EmailStr
 
 class ShareFolderRequest(BaseModel):
     email: EmailStr
-    can_delete: bool = False
\ No newline at end of file
+    can_delete: bool = False
+
+class UsageResponse(BaseModel):
+    used_bytes: int
+    photo_count: int
+    # None — без обмежень
+    quota_bytes: Optional[int] = None
+    remaining_bytes: Optional[int] = None
+
+class FolderUsageResponse(BaseModel):
+    folder_id: UUID
+    total_bytes: int
+    photo_count: int
@@ -0,0 +1,111 @@
+import hashlib
+import uuid
+from collections import Counter
+from uuid import UUID
+from typing import Optional
+from sqlalchemy import Integer, String, column, delete, exists, or_, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models import Photo, StoredObject
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_file(file_obj) -> tuple[str, int]:
+    """SHA-256 і розмір локального (spool) файлу; після читання повертає позицію на початок"""
+    hasher = hashlib.sha256()
+    size = 0
+    while chunk := file_obj.read(HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+        size += len(chunk)
+    file_obj.seek(0)
+    return hasher.hexdigest(), size
+
+def content_key(user_id: UUID, content_hash: str) -> str:
+    """Ключ нового об'єкта; суфікс гарантує, що повторне завантаження після видалення не перетреться з видаленням"""
+    return f"{user_id}/sha256/{content_hash}-{uuid.uuid4().hex[:8]}"
+
+async def key_taken_by_other_content(db: AsyncSession, s3_key: str, content_hash: Optional[str]) -> bool:
+    """Чи посилаються на ключ фото або збережений об'єкт з іншим хешем.
+
+    Такий ключ не можна ні реєструвати під content_hash, ні видаляти як зайву копію.
+    Для завантаження без хешу зайнятий будь-який ключ, на який уже посилається фото.
+    """
+    photo_filter = [Photo.s3_key == s3_key]
+    if content_hash:
+        photo_filter.append(Photo.content_hash.is_distinct_from(content_hash))
+    return await db.scalar(select(or_(
+        exists().where(
+            StoredObject.s3_key == s3_key,
+            StoredObject.content_hash.is_distinct_from(content_hash)
+        ),
+        exists().where(*photo_filter),
+    )))
+
+async def claim_existing_object(db: AsyncSession, user_id: UUID, content_hash: str) -> Optional[str]:
+    """Атомарно додає посилання на вже збережений вміст; None — якщо такого ще немає"""
+    return await db.scalar(
+        update(StoredObject)
+        .where(
+            StoredObject.user_id == user_id,
+            StoredObject.content_hash == content_hash,
+            StoredObject.ref_count > 0
+        )
+        .values(ref_count=StoredObject.ref_count + 1)
+        .returning(StoredObject.s3_key)
+        .execution_options(synchronize_session=False)
+    )
+
+async def register_uploaded_object(db: AsyncSession, user_id: UUID, content_hash: str, s3_key: str, size: int) -> str:
+    """Реєструє щойно завантажений об'єкт з одним посиланням.
+
+    Якщо паралельний запит встиг зареєструвати той самий вміст, повертається його ключ —
+    тоді власну копію викликач має видалити.
+    """
+    statement = insert(StoredObject).values(
+        user_id=user_id,
+        content_hash=content_hash,
+        s3_key=s3_key,
+        size=size,
+        ref_count=1,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[StoredObject.user_id, StoredObject.content_hash],
+        set_={"ref_count": StoredObject.ref_count + 1}
+    ).returning(StoredObject.s3_key)
+    return await db.scalar(statement)
+
+async def release_objects(db: AsyncSession, refs: list[tuple[UUID, str]]) -> list[str]:
+    """Знімає по одному посиланню за кожну пару (користувач, хеш).
+
+    Повертає ключі об'єктів, на які більше ніхто не посилається — їх слід видалити з R2.
+    """
+    if not refs:
+        return []
+
+    counts = Counter(refs)
+    released = values(
+        column("user_id", PG_UUID(as_uuid=True)),
+        column("content_hash", String),
+        column("count", Integer),
+        name="released",
+    ).data([(user_id, content_hash, count) for (user_id, content_hash), count in counts.items()])
+
+    await db.execute(
+        update(StoredObject)
+        .where(
+            StoredObject.user_id == released.c.user_id,
+            StoredObject.content_hash == released.c.content_hash
+        )
+        .values(ref_count=StoredObject.ref_count - released.c.count)
+        .execution_options(synchronize_session=False)
+    )
+
+    return (await db.scalars(
+        delete(StoredObject)
+        .where(
+            tuple_(StoredObject.user_id, StoredObject.content_hash).in_(list(counts)),
+            StoredObject.ref_count <= 0
+        )
+        .returning(StoredObject.s3_key)
+        .execution_options(synchronize_session=False)
+    )).all()
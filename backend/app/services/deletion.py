@@ -0,0 +1,56 @@
+import os
+import time
+from datetime import datetime
+from uuid import UUID
+from ..database import SessionLocal
+from ..models import DeletionJob
+from .storage import DELETE_BATCH_SIZE, get_storage
+
+DELETE_MAX_ATTEMPTS = int(os.getenv("DELETE_MAX_ATTEMPTS", 3))
+DELETE_RETRY_DELAY = float(os.getenv("DELETE_RETRY_DELAY", 1.0))
+# Задача pending/running без прогресу довше за цей час вважається перерваною і її можна повторити
+DELETION_JOB_STALE_AFTER = int(os.getenv("DELETION_JOB_STALE_AFTER", 15 * 60))
+
+def _delete_batch(batch: list[str]) -> list[str]:
+    """Видаляє пакет з повторними спробами для ключів, що не видалились"""
+    failed = batch
+    for attempt in range(DELETE_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(DELETE_RETRY_DELAY * 2 ** (attempt - 1))
+        failed = get_storage().delete_many(failed)
+        if not failed:
+            break
+    return failed
+
+def run_deletion_job(job_id: UUID):
+    """Фонова задача: видаляє файли задачі пакетами по 1000, зберігаючи прогрес після кожного пакета"""
+    db = SessionLocal()
+    try:
+        job = db.query(DeletionJob).filter(DeletionJob.id == job_id).first()
+        if not job:
+            return
+
+        job.status = "running"
+        db.commit()
+
+        keys = list(job.pending_keys)
+        failed_keys = []
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            failed = _delete_batch(batch)
+            failed_keys.extend(failed)
+
+            job.deleted_objects += len(batch) - len(failed)
+            job.pending_keys = failed_keys + keys[start + DELETE_BATCH_SIZE:]
+            db.commit()
+
+        job.status = "failed" if failed_keys else "done"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        print(f"Помилка виконання задачі видалення {job_id}: {e}")
+        db.rollback()
+        db.query(DeletionJob).filter(DeletionJob.id == job_id).update({DeletionJob.status: "failed"})
+        db.commit()
+    finally:
+        db.close()
@@ -1,37 +1,86 @@
 import smtplib
+import time
 from email.message import EmailMessage
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT= os.getenv("SMTP_PORT")
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_FROM = os.getenv("SMTP_FROM") or SMTP_USER
+# false — звичайний SMTP без TLS, напр. для локального тестового сервера `python -m aiosmtpd -n`
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "true").lower() == "true"
+SMTP_MAX_ATTEMPTS = int(os.getenv("SMTP_MAX_ATTEMPTS", 3))
+SMTP_RETRY_DELAY = float(os.getenv("SMTP_RETRY_DELAY", 2.0))
 
-def send_photo_notification_email(recipient_emails: list[str], uploader_email: str, folder_name: str):
-    """Фонова задача для відправки листів усім, з ким поділилися папкою"""
-    if not SMTP_USER or not SMTP_PASSWORD:
-        print("Попередження: Не налаштовано SMTP_USER або SMTP_PASSWORD. Лист не відправлено.")
-        return
-
+def build_digest_email(recipient_email: str, folder_name: str, uploader_emails: list[str], photo_count: int) -> EmailMessage:
+    """Один лист-дайджест про всі нові фото в папці за вікно агрегації"""
     msg = EmailMessage()
-    msg['Subject'] = f"Нове фото у спільній папці '{folder_name}'!"
-    msg['From'] = SMTP_USER
-    msg['To'] = ", ".join(recipient_emails) 
-    
+    if photo_count == 1:
+        msg['Subject'] = f"Нове фото у спільній папці '{folder_name}'!"
+    else:
+        msg['Subject'] = f"{photo_count} нових фото у спільній папці '{folder_name}'!"
+    msg['From'] = SMTP_FROM
+    msg['To'] = recipient_email
+
+    uploaders = ", ".join(uploader_emails)
     msg.set_content(
         f"Привіт!\n\n"
-        f"Користувач {uploader_email} щойно завантажив нове фото у спільну папку '{folder_name}'.\n"
-        f"Зайдіть у свій PhotoAlbum, щоб переглянути його!\n\n"
+        f"Користувачі {uploaders} завантажили нові фото ({photo_count}) у спільну папку '{folder_name}'.\n"
+        f"Зайдіть у свій PhotoAlbum, щоб переглянути їх!\n\n"
         f"З повагою, ваш PhotoAlbum."
     )
+    return msg
+
+class SMTPMailer:
+    """Тримає одне постійне SMTP-з'єднання на процес і перепідключається за потреби"""
+
+    def __init__(self):
+        self._server = None
 
-    try:
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT) as server:
+    def _connect(self):
+        if SMTP_USE_SSL:
+            server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT)
+        else:
+            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+        if SMTP_USER and SMTP_PASSWORD:
             server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(msg)
-            print(f"Листи успішно відправлено на {recipient_emails}")
-    except Exception as e:
-        print(f"Помилка при відправці листа: {e}")
\ No newline at end of file
+        self._server = server
+
+    def _ensure_connected(self):
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return
+            except smtplib.SMTPException:
+                pass
+            self.close()
+        self._connect()
+
+    def send(self, msg: EmailMessage) -> bool:
+        """Надсилає лист з повторними спробами та експоненційною затримкою"""
+        if not SMTP_SERVER:
+            print("Попередження: Не налаштовано SMTP_SERVER. Лист не відправлено.")
+            return False
+
+        for attempt in range(SMTP_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(SMTP_RETRY_DELAY * 2 ** (attempt - 1))
+            try:
+                self._ensure_connected()
+                self._server.send_message(msg)
+                print(f"Лист успішно відправлено на {msg['To']}")
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"Помилка при відправці листа (спроба {attempt + 1}): {e}")
+                self.close()
+        return False
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
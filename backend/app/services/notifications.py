@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from uuid import UUID
+from sqlalchemy import ARRAY, any_, cast, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, object_session
+from ..folder_tree import PATH_SEPARATOR
+from ..models import Folder, PhotoNotification, SharedFolder, User
+from .email import SMTPMailer, build_digest_email
+
+# Усі завантаження в папку за це вікно потрапляють в один лист кожному отримувачу
+NOTIFY_DIGEST_WINDOW = int(os.getenv("NOTIFY_DIGEST_WINDOW", 300))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", 100))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", 5))
+
+# Отримувачі папки кешуються в процесі; зміни поширень в інших воркерах видно не пізніше TTL
+RECIPIENT_CACHE_TTL = float(os.getenv("RECIPIENT_CACHE_TTL", 60))
+RECIPIENT_CACHE_SIZE = int(os.getenv("RECIPIENT_CACHE_SIZE", 4096))
+
+# folder_id -> (момент застаріння, ((user_id, email), ...))
+_recipient_cache: "OrderedDict[UUID, tuple[float, tuple[tuple[UUID, str], ...]]]" = OrderedDict()
+_recipient_cache_lock = threading.Lock()
+# Зростає з кожним скиданням: запит, що почався до скидання, не кладе в кеш застарілий результат
+_recipient_cache_generation = 0
+_INVALIDATE_KEY = "invalidate_recipients"
+
+def invalidate_recipients():
+    """Скидає кеш отримувачів; поширення успадковуються піддеревом, тож скидається весь"""
+    global _recipient_cache_generation
+    with _recipient_cache_lock:
+        _recipient_cache.clear()
+        _recipient_cache_generation += 1
+
+def _mark_session(target):
+    session = object_session(target)
+    if session is not None:
+        session.info[_INVALIDATE_KEY] = True
+
+# Події маперів спрацьовують під час flush, до коміту: кеш скидається лише після коміту,
+# інакше паралельний запит встигне закешувати ще старих отримувачів
+@event.listens_for(SharedFolder, "after_insert")
+@event.listens_for(SharedFolder, "after_update")
+@event.listens_for(SharedFolder, "after_delete")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target):
+    _mark_session(target)
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_email_change(mapper, connection, target):
+    # Користувачі оновлюються часто (лічильники, версії), а отримувачів стосується лише email
+    if inspect(target).attrs.email.history.has_changes():
+        _mark_session(target)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop(_INVALIDATE_KEY, False):
+        invalidate_recipients()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop(_INVALIDATE_KEY, None)
+
+def recipients_query(folder_id: UUID):
+    """Один запит: користувачі, яким поширено папку чи будь-якого її предка (id предків — з path)"""
+    target = aliased(Folder)
+    ancestor_ids = cast(func.string_to_array(target.path, PATH_SEPARATOR), ARRAY(PG_UUID(as_uuid=True)))
+    return (
+        select(User.id, User.email)
+        .join(SharedFolder, SharedFolder.user_id == User.id)
+        .join(target, target.id == folder_id)
+        .where(SharedFolder.folder_id == any_(ancestor_ids))
+        .distinct()
+    )
+
+async def folder_recipients(db: AsyncSession, folder_id: UUID) -> tuple[tuple[UUID, str], ...]:
+    """(user_id, email) усіх, хто бачить папку через поширення"""
+    with _recipient_cache_lock:
+        entry = _recipient_cache.get(folder_id)
+        if entry is not None and entry[0] >= time.monotonic():
+            _recipient_cache.move_to_end(folder_id)
+            return entry[1]
+        generation = _recipient_cache_generation
+
+    recipients = tuple((user_id, email) for user_id, email in await db.execute(recipients_query(folder_id)))
+
+    with _recipient_cache_lock:
+        if generation != _recipient_cache_generation:
+            return recipients
+        _recipient_cache[folder_id] = (time.monotonic() + RECIPIENT_CACHE_TTL, recipients)
+        _recipient_cache.move_to_end(folder_id)
+        while len(_recipient_cache) > RECIPIENT_CACHE_SIZE:
+            _recipient_cache.popitem(last=False)
+    return recipients
+
+def enqueue_photo_notifications(db, folder_id: UUID, recipient_emails, uploader_email: str, photo_count: int = 1):
+    """Ставить сповіщення в чергу в поточній транзакції; відправляє їх окремий воркер"""
+    db.add_all([
+        PhotoNotification(
+            folder_id=folder_id,
+            recipient_email=recipient_email,
+            uploader_email=uploader_email,
+            photo_count=photo_count,
+        )
+        for recipient_email in recipient_emails
+    ])
+
+def process_due_notifications(db: Session, mailer: SMTPMailer) -> int:
+    """Надсилає дайджести для груп (папка, отримувач), чиє вікно агрегації вже минуло"""
+    cutoff = datetime.utcnow() - timedelta(seconds=NOTIFY_DIGEST_WINDOW)
+
+    due_groups = db.query(
+        PhotoNotification.folder_id,
+        PhotoNotification.recipient_email
+    ).filter(
+        PhotoNotification.status == "pending"
+    ).group_by(
+        PhotoNotification.folder_id,
+        PhotoNotification.recipient_email
+    ).having(
+        func.min(PhotoNotification.created_at) <= cutoff
+    ).limit(NOTIFY_BATCH_SIZE).all()
+
+    sent = 0
+    for folder_id, recipient_email in due_groups:
+        # SKIP LOCKED дозволяє запускати кілька воркерів без подвійної відправки
+        notifications = db.query(PhotoNotification).filter(
+            PhotoNotification.status == "pending",
+            PhotoNotification.folder_id == folder_id,
+            PhotoNotification.recipient_email == recipient_email
+        ).with_for_update(skip_locked=True).all()
+        if not notifications:
+            db.commit()
+            continue
+
+        folder_name = db.query(Folder.name).filter(Folder.id == folder_id).scalar() or "папку"
+        uploader_emails = sorted({notification.uploader_email for notification in notifications})
+        photo_count = sum(notification.photo_count for notification in notifications)
+        msg = build_digest_email(recipient_email, folder_name, uploader_emails, photo_count)
+
+        if mailer.send(msg):
+            now = datetime.utcnow()
+            for notification in notifications:
+                notification.status = "sent"
+                notification.sent_at = now
+            sent += 1
+        else:
+            for notification in notifications:
+                notification.attempts += 1
+                if notification.attempts >= NOTIFY_MAX_ATTEMPTS:
+                    notification.status = "failed"
+        db.commit()
+
+    return sent
@@ -0,0 +1,161 @@
+"""Дисковий LRU-кеш об'єктів сховища для проксі завантажень.
+
+Ключі об'єктів незмінні (новий вміст — новий ключ), тож кеш ніколи не треба оновлювати,
+лише витісняти. Кожен процес тримає власний каталог DOWNLOAD_CACHE_DIR/<pid> і власний
+індекс; при зупинці каталог видаляється.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import NamedTuple, Optional
+from ..metrics import DOWNLOAD_CACHE, DOWNLOAD_CACHE_EVICTED_BYTES
+from .storage import get_storage
+
+# 0 — кеш вимкнено, завантаження перенаправляються на presigned URL
+DOWNLOAD_CACHE_BYTES = int(os.getenv("DOWNLOAD_CACHE_BYTES", 0))
+DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "photo-download-cache"))
+# Більші об'єкти не кешуються, щоб один файл не витіснив увесь гарячий набір
+DOWNLOAD_CACHE_MAX_OBJECT_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_OBJECT_BYTES", DOWNLOAD_CACHE_BYTES // 8))
+
+class CachedObject(NamedTuple):
+    path: str
+    size: int
+    content_type: Optional[str]
+
+class _Entry:
+    __slots__ = ("object", "pins")
+
+    def __init__(self, cached: CachedObject):
+        self.object = cached
+        self.pins = 0
+
+class DiskObjectCache:
+    def __init__(self, root: str, max_bytes: int, max_object_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Один промах — одне звернення до сховища: інші запити того ж ключа чекають на цей Future
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def acquire(self, key: str) -> Optional[CachedObject]:
+        """Файл об'єкта в кеші (завантажує при промаху) або None, якщо об'єкт завеликий для кешу.
+
+        Поки файл не звільнено через release(key), його не буде витіснено.
+        Блокуючий виклик — з async-коду запускати через threadpool.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.pins += 1
+                self._entries.move_to_end(key)
+                DOWNLOAD_CACHE.inc("hit")
+                return entry.object
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+
+        if not owner:
+            DOWNLOAD_CACHE.inc("wait")
+            cached = future.result()
+            return self.acquire(key) if cached is not None else None
+
+        DOWNLOAD_CACHE.inc("miss")
+        try:
+            cached = self._fill(key)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if cached is not None:
+                entry = self._entries[key] = _Entry(cached)
+                entry.pins += 1
+                self.total_bytes += cached.size
+                self._evict()
+        future.set_result(cached)
+        return cached
+
+    def release(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.pins -= 1
+            self._evict()
+
+    def _fill(self, key: str) -> Optional[CachedObject]:
+        storage = get_storage()
+        info = storage.head(key)
+        if info is None:
+            raise FileNotFoundError(key)
+        if info.size > self.max_object_bytes:
+            DOWNLOAD_CACHE.inc("bypass")
+            return None
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as tmp:
+            try:
+                storage.download(key, tmp)
+            except Exception:
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, path)
+        return CachedObject(path=path, size=os.path.getsize(path), content_type=info.content_type)
+
+    def _evict(self):
+        """Викликати під self._lock: видаляє найдавніші незайняті файли, поки кеш більший за ліміт"""
+        for key in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.pins > 0:
+                continue
+            del self._entries[key]
+            self.total_bytes -= entry.object.size
+            DOWNLOAD_CACHE_EVICTED_BYTES.inc(amount=entry.object.size)
+            try:
+                os.unlink(entry.object.path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+_cache: Optional[DiskObjectCache] = None
+_cache_lock = threading.Lock()
+
+def get_object_cache() -> Optional[DiskObjectCache]:
+    """Кеш цього процесу або None, якщо DOWNLOAD_CACHE_BYTES не задано"""
+    global _cache
+    if DOWNLOAD_CACHE_BYTES <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskObjectCache(
+                os.path.join(DOWNLOAD_CACHE_DIR, str(os.getpid())), DOWNLOAD_CACHE_BYTES, DOWNLOAD_CACHE_MAX_OBJECT_BYTES
+            )
+        return _cache
+
+def close_object_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
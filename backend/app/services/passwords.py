@@ -0,0 +1,78 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from typing import Optional
+
+# bcrypt відпускає GIL під час хешування, тож окремий пул потоків справді паралелить роботу
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 64))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+
+# deprecated="auto" позначає застарілими хеші з іншою вартістю — їх перехешовуємо при вході
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_stats_lock = threading.Lock()
+_stats = {
+    "queued": 0,
+    "running": 0,
+    "completed": 0,
+    "rejected": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+
+
+class PasswordHashQueueFull(Exception):
+    """Черга хешування переповнена — запит слід відхилити, а не чекати"""
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+def password_hash_stats() -> dict:
+    """Знімок метрик черги хешування паролів"""
+    with _stats_lock:
+        return dict(_stats)
+
+def _run_tracked(func, enqueued_at: float, *args):
+    waited = time.monotonic() - enqueued_at
+    with _stats_lock:
+        _stats["queued"] -= 1
+        _stats["running"] += 1
+        _stats["wait_seconds_total"] += waited
+        _stats["wait_seconds_max"] = max(_stats["wait_seconds_max"], waited)
+    try:
+        return func(*args)
+    finally:
+        with _stats_lock:
+            _stats["running"] -= 1
+            _stats["completed"] += 1
+
+def _release_cancelled(future):
+    # Скасоване await скасовує й future; якщо задача ще чекала в черзі, _run_tracked
+    # не виконається, тож місце в черзі звільняємо тут
+    if future.cancelled():
+        with _stats_lock:
+            _stats["queued"] -= 1
+
+async def _submit(func, *args):
+    with _stats_lock:
+        if _stats["queued"] >= PASSWORD_HASH_QUEUE_LIMIT:
+            _stats["rejected"] += 1
+            raise PasswordHashQueueFull()
+        _stats["queued"] += 1
+
+    future = _executor.submit(_run_tracked, func, time.monotonic(), *args)
+    future.add_done_callback(_release_cancelled)
+    return await asyncio.wrap_future(future)
+
+async def hash_password(password: str) -> str:
+    return await _submit(pwd_context.hash, password)
+
+async def verify_password(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    """Перевіряє пароль; другим значенням повертає новий хеш, якщо старий треба оновити"""
+    return await _submit(pwd_context.verify_and_update, password, password_hash)
@@ -0,0 +1,250 @@
+"""Метадані фото з заголовків файлу: час зйомки, розміри, камера, GPS.
+
+Pillow при відкритті читає лише заголовки (EXIF, IHDR/SOF) і не декодує пікселі,
+тож вистачає перших METADATA_HEADER_BYTES файлу — для старих фото вони читаються
+з R2 одним ranged GET.
+"""
+import io
+import os
+import re
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from ..models import Photo
+from ..versions import photo_change_statements
+from .storage import get_storage
+
+if TYPE_CHECKING:
+    # Pillow імпортується лише при першому розборі файлу
+    from PIL import Image
+
+METADATA_HEADER_BYTES = int(os.getenv("METADATA_HEADER_BYTES", 256 * 1024))
+METADATA_BACKFILL_BATCH = int(os.getenv("METADATA_BACKFILL_BATCH", 200))
+METADATA_BACKFILL_CONCURRENCY = int(os.getenv("METADATA_BACKFILL_CONCURRENCY", 8))
+
+# Колонки Photo, які заповнює extract_metadata
+METADATA_COLUMNS = ("taken_at", "width", "height", "camera_make", "camera_model", "latitude", "longitude")
+
+# Теги EXIF (TIFF/EXIF 2.3)
+TAG_MAKE = 0x010F
+TAG_MODEL = 0x0110
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+TAG_DATETIME_ORIGINAL = 0x9003
+IFD_EXIF = 0x8769
+IFD_GPS = 0x8825
+GPS_LATITUDE_REF, GPS_LATITUDE, GPS_LONGITUDE_REF, GPS_LONGITUDE = 1, 2, 3, 4
+
+# Для PNG/WebP без EXIF — дата з XMP
+XMP_DATE = re.compile(rb'(?:exif:DateTimeOriginal|xmp:CreateDate|photoshop:DateCreated)(?:="|>)([^"<]+)')
+
+def _parse_exif_datetime(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.strptime(value.strip("\x00 ")[:19], "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+def _parse_xmp_datetime(xmp: bytes) -> Optional[datetime]:
+    match = XMP_DATE.search(xmp)
+    if not match:
+        return None
+    try:
+        # Як і в EXIF, зберігаємо місцевий час зйомки без часового поясу
+        return datetime.fromisoformat(match.group(1).decode().strip()).replace(tzinfo=None)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def _clean_text(value) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = value.strip("\x00 ")
+    return value[:128] or None
+
+def _gps_degrees(value, ref) -> Optional[float]:
+    try:
+        degrees, minutes, seconds = (float(part) for part in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    result = degrees + minutes / 60 + seconds / 3600
+    return -result if ref in ("S", "W") else result
+
+def _webp_headers(data: bytes) -> Optional[tuple[int, int, Optional[bytes], Optional[bytes]]]:
+    """(ширина, висота, EXIF, XMP) з RIFF-чанків WebP.
+
+    Pillow відкриває WebP через libwebp, якій потрібен увесь файл, тож заголовки розбираємо самі.
+    Чанки за межами прочитаного початку файлу пропускаються.
+    """
+    width = height = exif = xmp = None
+    offset = 12
+    while offset + 8 <= len(data):
+        tag, length = data[offset:offset + 4], struct.unpack("<I", data[offset + 4:offset + 8])[0]
+        payload = data[offset + 8:offset + 8 + length]
+        if tag == b"VP8X" and len(payload) >= 10:
+            width = int.from_bytes(payload[4:7], "little") + 1
+            height = int.from_bytes(payload[7:10], "little") + 1
+        elif tag == b"VP8 " and width is None and len(payload) >= 10 and payload[3:6] == b"\x9d\x01\x2a":
+            width = struct.unpack("<H", payload[6:8])[0] & 0x3FFF
+            height = struct.unpack("<H", payload[8:10])[0] & 0x3FFF
+        elif tag == b"VP8L" and width is None and len(payload) >= 5 and payload[0] == 0x2F:
+            bits = int.from_bytes(payload[1:5], "little")
+            width = (bits & 0x3FFF) + 1
+            height = ((bits >> 14) & 0x3FFF) + 1
+        elif tag == b"EXIF" and len(payload) == length:
+            exif = payload
+        elif tag == b"XMP " and len(payload) == length:
+            xmp = payload
+        # Розмір чанку вирівнюється до парного
+        offset += 8 + length + (length & 1)
+    if width is None:
+        return None
+    return width, height, exif, xmp
+
+def _read_exif(raw) -> "Image.Exif":
+    """EXIF із сирих байтів заголовка; Image.getexif() для PNG/WebP без EXIF-чанку декодує все зображення"""
+    from PIL import Image
+
+    exif = Image.Exif()
+    if raw:
+        try:
+            exif.load(raw)
+        except Exception as e:
+            print(f"Не вдалося розібрати EXIF: {e}")
+            return Image.Exif()
+    return exif
+
+def extract_metadata(file_obj) -> dict:
+    """Значення METADATA_COLUMNS з заголовків зображення; порожні, якщо формат не розпізнано.
+
+    Пікселі не декодуються: розміри беруться з заголовка, EXIF — з уже прочитаного при
+    відкритті чанку. Кожне поле читається окремо, тож зламаний EXIF не забирає розміри.
+    Блокуючий виклик — з async-коду запускати через threadpool.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    metadata = dict.fromkeys(METADATA_COLUMNS)
+    data = file_obj.read()
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        headers = _webp_headers(data)
+        if headers is None:
+            print("Не вдалося прочитати заголовки WebP")
+            return metadata
+        width, height, raw_exif, xmp = headers
+        exif = _read_exif(raw_exif)
+    else:
+        try:
+            image = Image.open(io.BytesIO(data))
+        except (UnidentifiedImageError, OSError, ValueError) as e:
+            print(f"Не вдалося прочитати заголовки зображення: {e}")
+            return metadata
+
+        with image:
+            width, height = image.size
+            exif = _read_exif(image.info.get("exif"))
+            xmp = image.info.get("xmp") or image.info.get("XML:com.adobe.xmp")
+
+    def read(name, getter):
+        try:
+            metadata[name] = getter()
+        except Exception as e:
+            print(f"Не вдалося прочитати {name} з EXIF: {e}")
+
+    # Орієнтації 5–8 повертають кадр на 90°: показуємо розміри такими, як їх побачить користувач
+    try:
+        if exif.get(TAG_ORIENTATION) in (5, 6, 7, 8):
+            width, height = height, width
+    except Exception as e:
+        print(f"Не вдалося прочитати орієнтацію з EXIF: {e}")
+    metadata["width"], metadata["height"] = width, height
+
+    read("camera_make", lambda: _clean_text(exif.get(TAG_MAKE)))
+    read("camera_model", lambda: _clean_text(exif.get(TAG_MODEL)))
+    read("taken_at", lambda: (
+        _parse_exif_datetime(exif.get_ifd(IFD_EXIF).get(TAG_DATETIME_ORIGINAL))
+        or _parse_exif_datetime(exif.get(TAG_DATETIME))
+    ))
+    if metadata["taken_at"] is None and xmp:
+        read("taken_at", lambda: _parse_xmp_datetime(xmp if isinstance(xmp, bytes) else xmp.encode()))
+
+    def location():
+        gps = exif.get_ifd(IFD_GPS)
+        if not gps:
+            return None, None
+        latitude = _gps_degrees(gps.get(GPS_LATITUDE), gps.get(GPS_LATITUDE_REF))
+        longitude = _gps_degrees(gps.get(GPS_LONGITUDE), gps.get(GPS_LONGITUDE_REF))
+        if latitude is not None and longitude is not None and -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            return latitude, longitude
+        return None, None
+
+    try:
+        metadata["latitude"], metadata["longitude"] = location()
+    except Exception as e:
+        print(f"Не вдалося прочитати GPS з EXIF: {e}")
+
+    return metadata
+
+def extract_upload_metadata(file_obj) -> dict:
+    """Метадані локального (spool) файлу; після читання повертає позицію на початок"""
+    try:
+        return extract_metadata(io.BytesIO(file_obj.read(METADATA_HEADER_BYTES)))
+    finally:
+        file_obj.seek(0)
+
+def extract_stored_metadata(s3_key: str) -> dict:
+    """Метадані об'єкта у сховищі за першими METADATA_HEADER_BYTES, без завантаження цілого файлу"""
+    return extract_metadata(io.BytesIO(get_storage().read_range(s3_key, 0, METADATA_HEADER_BYTES)))
+
+def backfill_metadata(db: Session) -> int:
+    """Заповнює метадані пакету фото, завантажених до їх збору; повертає кількість оброблених ключів.
+
+    Ключі з тимчасовими помилками сховища не позначаються і не рахуються — воркер почекає
+    перед наступною спробою.
+
+    Однаковий вміст (спільний s3_key після дедуплікації) читається один раз.
+    """
+    s3_keys = db.scalars(
+        select(Photo.s3_key)
+        .where(Photo.metadata_extracted == False)
+        .group_by(Photo.s3_key)
+        .limit(METADATA_BACKFILL_BATCH)
+    ).all()
+    if not s3_keys:
+        return 0
+
+    storage = get_storage()
+
+    def read(s3_key):
+        """(ключ, метадані); None замість метаданих — тимчасова помилка, ключ лишається в черзі"""
+        try:
+            return s3_key, extract_stored_metadata(s3_key)
+        except Exception as e:
+            try:
+                missing = storage.head(s3_key) is None
+            except Exception:
+                missing = False
+            if missing:
+                # Об'єкт зник — позначаємо оброблений, щоб не читати його знову
+                print(f"Об'єкт {s3_key} відсутній у сховищі, метадані пропущено")
+                return s3_key, {}
+            print(f"Не вдалося прочитати метадані {s3_key}, повторимо пізніше: {e}")
+            return s3_key, None
+
+    with ThreadPoolExecutor(max_workers=METADATA_BACKFILL_CONCURRENCY) as executor:
+        results = list(executor.map(read, s3_keys))
+
+    processed = [(s3_key, metadata) for s3_key, metadata in results if metadata is not None]
+    for s3_key, metadata in processed:
+        db.execute(
+            update(Photo)
+            .where(Photo.s3_key == s3_key, Photo.metadata_extracted == False)
+            .values(**metadata, metadata_extracted=True)
+            .execution_options(synchronize_session=False)
+        )
+        for statement in photo_change_statements(Photo.s3_key == s3_key):
+            db.execute(statement)
+    db.commit()
+    return len(processed)
@@ -2,62 +2,242 @@ import os
 import boto3
 from botocore.config import Config
 from botocore.exceptions import ClientError
-from dotenv import load_dotenv
+from typing import Optional
+import hashlib
 import io
-
-load_dotenv()
+from .storage import UPLOAD_CHUNK_SIZE, ObjectInfo, StorageBackend
 
 R2_ACCOUNT_ID = os.getenv("R2_ACCOUNT_ID")
 R2_ACCESS_KEY_ID = os.getenv("R2_ACCESS_KEY_ID")
 R2_SECRET_ACCESS_KEY = os.getenv("R2_SECRET_ACCESS_KEY")
 R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME")
 
-s3_client = boto3.client(
-    's3',
-    endpoint_url=f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
-    aws_access_key_id=R2_ACCESS_KEY_ID,
-    aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-    config=Config(signature_version='s3v4'),
-    region_name='auto'
-)
-
-def upload_to_s3(contents: bytes, s3_key: str, content_type: str):
-    """Завантажує файл у Cloudflare R2"""
-    try:
-        file_obj = io.BytesIO(contents)
-        s3_client.upload_fileobj(
-            file_obj,
-            R2_BUCKET_NAME,
-            s3_key,
-            ExtraArgs={"ContentType": content_type}
+class S3Storage(StorageBackend):
+    """Cloudflare R2 через S3 API"""
+
+    def __init__(self, bucket: str = R2_BUCKET_NAME):
+        self.bucket = bucket
+        self.client = boto3.client(
+            's3',
+            endpoint_url=f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
+            aws_access_key_id=R2_ACCESS_KEY_ID,
+            aws_secret_access_key=R2_SECRET_ACCESS_KEY,
+            config=Config(signature_version='s3v4'),
+            region_name='auto'
         )
-    except ClientError as e:
-        print(f"Помилка завантаження в R2: {e}")
-        raise e
-
-def get_presigned_url(s3_key: str, expiration=3600) -> str:
-    """Генерує тимчасове посилання на файл"""
-    try:
-        response = s3_client.generate_presigned_url(
-            'get_object',
+
+    def upload(self, contents: bytes, s3_key: str, content_type: str):
+        """Завантажує файл у Cloudflare R2"""
+        try:
+            file_obj = io.BytesIO(contents)
+            self.client.upload_fileobj(
+                file_obj,
+                self.bucket,
+                s3_key,
+                ExtraArgs={"ContentType": content_type}
+            )
+        except ClientError as e:
+            print(f"Помилка завантаження в R2: {e}")
+            raise e
+
+    def upload_stream(self, file_obj, s3_key: str, content_type: str) -> tuple[int, str]:
+        """Потоково завантажує файл у R2 частинами, не тримаючи його в пам'яті цілком.
+
+        Повертає розмір у байтах та SHA-256 вмісту, пораховані під час читання.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+
+        # Читаємо на одну частину наперед, щоб знати, чи це остання
+        chunk = file_obj.read(UPLOAD_CHUNK_SIZE)
+        next_chunk = file_obj.read(UPLOAD_CHUNK_SIZE) if chunk else b""
+
+        # Файл вміщується в одну частину — multipart не потрібен
+        if not next_chunk:
+            hasher.update(chunk)
+            try:
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=s3_key,
+                    Body=chunk,
+                    ContentType=content_type
+                )
+            except ClientError as e:
+                print(f"Помилка завантаження в R2: {e}")
+                raise e
+            return len(chunk), hasher.hexdigest()
+
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket,
+            Key=s3_key,
+            ContentType=content_type
+        )["UploadId"]
+
+        parts = []
+        try:
+            part_number = 1
+            while chunk:
+                hasher.update(chunk)
+                size += len(chunk)
+                response = self.client.upload_part(
+                    Bucket=self.bucket,
+                    Key=s3_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=chunk
+                )
+                parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+                part_number += 1
+                chunk, next_chunk = next_chunk, file_obj.read(UPLOAD_CHUNK_SIZE)
+
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except Exception as e:
+            print(f"Помилка multipart-завантаження в R2, скасовуємо: {e}")
+            self.abort_multipart_upload(s3_key, upload_id)
+            raise e
+
+        return size, hasher.hexdigest()
+
+    def generate_presigned_put_url(self, s3_key: str, content_type: str, size: int, expiration=3600) -> str:
+        """Посилання для прямого завантаження файлу клієнтом у R2 одним PUT.
+
+        Content-Length входить у підпис, тож PUT іншого розміру R2 відхилить.
+        """
+        return self.client.generate_presigned_url(
+            'put_object',
             Params={
-                'Bucket': R2_BUCKET_NAME,
-                'Key': s3_key
+                'Bucket': self.bucket,
+                'Key': s3_key,
+                'ContentType': content_type,
+                'ContentLength': size
             },
             ExpiresIn=expiration
         )
-        return response
-    except ClientError as e:
-        print(f"Помилка генерації URL: {e}")
-        return ""
-
-def delete_from_s3(s3_key: str):
-    """Видаляє файл з Cloudflare R2"""
-    try:
-        s3_client.delete_object(
-            Bucket=R2_BUCKET_NAME,
-            Key=s3_key
-        )
-    except ClientError as e:
-        print(f"Помилка видалення з R2: {e}")
-        raise e
\ No newline at end of file
+
+    def create_presigned_multipart_upload(self, s3_key: str, content_type: str, part_count: int, expiration=3600) -> tuple[str, list[str]]:
+        """Починає multipart-завантаження і повертає його id та посилання для кожної частини"""
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket,
+            Key=s3_key,
+            ContentType=content_type
+        )["UploadId"]
+
+        part_urls = [
+            self.client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': self.bucket,
+                    'Key': s3_key,
+                    'UploadId': upload_id,
+                    'PartNumber': part_number
+                },
+                ExpiresIn=expiration
+            )
+            for part_number in range(1, part_count + 1)
+        ]
+        return upload_id, part_urls
+
+    def complete_multipart_upload(self, s3_key: str, upload_id: str, parts: list[dict]):
+        """Завершує multipart-завантаження з частин [{"ETag": ..., "PartNumber": ...}]"""
+        try:
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])}
+            )
+        except ClientError as e:
+            print(f"Помилка завершення multipart-завантаження в R2: {e}")
+            raise e
+
+    def abort_multipart_upload(self, s3_key: str, upload_id: str):
+        """Скасовує незавершене multipart-завантаження, щоб R2 не зберігав його частини"""
+        try:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket,
+                Key=s3_key,
+                UploadId=upload_id
+            )
+        except ClientError as e:
+            print(f"Не вдалося скасувати multipart-завантаження {upload_id}: {e}")
+
+    def head(self, s3_key: str) -> Optional[ObjectInfo]:
+        """Метадані об'єкта в R2 або None, якщо його немає"""
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=s3_key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            print(f"Помилка перевірки об'єкта в R2: {e}")
+            raise e
+        return ObjectInfo(size=response["ContentLength"], content_type=response.get("ContentType"))
+
+    def download(self, s3_key: str, file_obj):
+        """Завантажує файл з R2 у переданий файловий об'єкт"""
+        try:
+            self.client.download_fileobj(self.bucket, s3_key, file_obj)
+        except ClientError as e:
+            print(f"Помилка завантаження з R2: {e}")
+            raise e
+
+    def read_range(self, s3_key: str, start: int, length: int) -> bytes:
+        """Частина об'єкта одним ranged GET"""
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket,
+                Key=s3_key,
+                Range=f"bytes={start}-{start + length - 1}"
+            )
+        except ClientError as e:
+            print(f"Помилка читання з R2: {e}")
+            raise e
+        return response["Body"].read()
+
+    def sign_url(self, s3_key: str, expires_in: int) -> str:
+        try:
+            return self.client.generate_presigned_url(
+                'get_object',
+                Params={
+                    'Bucket': self.bucket,
+                    'Key': s3_key
+                },
+                ExpiresIn=expires_in
+            )
+        except ClientError as e:
+            print(f"Помилка генерації URL: {e}")
+            return ""
+
+    def delete(self, s3_key: str):
+        """Видаляє файл з Cloudflare R2"""
+        try:
+            self.client.delete_object(
+                Bucket=self.bucket,
+                Key=s3_key
+            )
+        except ClientError as e:
+            print(f"Помилка видалення з R2: {e}")
+            raise e
+
+    def delete_many(self, s3_keys: list[str]) -> list[str]:
+        """Видаляє до 1000 файлів одним запитом DeleteObjects; повертає ключі, які не вдалося видалити"""
+        try:
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={
+                    "Objects": [{"Key": s3_key} for s3_key in s3_keys],
+                    "Quiet": True
+                }
+            )
+        except ClientError as e:
+            print(f"Помилка пакетного видалення з R2: {e}")
+            return list(s3_keys)
+
+        errors = response.get("Errors", [])
+        for error in errors:
+            print(f"Не вдалося видалити {error.get('Key')} з R2: {error.get('Message')}")
+        return [error["Key"] for error in errors]
@@ -0,0 +1,319 @@
+"""Сховище файлів фото з вибором реалізації через STORAGE_BACKEND.
+
+r2     — Cloudflare R2 / S3 (services/s3.py), за замовчуванням;
+local  — каталог на диску, файли віддає сам API (або nginx через X-Accel-Redirect);
+memory — словник у пам'яті процесу, для тестів і бенчмарків без мережі.
+"""
+import os
+import functools
+import hashlib
+import hmac
+import io
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from urllib.parse import quote
+from ..metrics import PRESIGNED_URL_BATCH_DURATION, PRESIGNED_URL_CACHE, STORAGE_CALL_DURATION
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "r2")
+
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "uploads")
+# Повна адреса, бо фронтенд працює з іншого домену
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "http://localhost:8000/uploads")
+
+# Розмір частини multipart-завантаження; S3/R2 вимагають щонайменше 5 МБ для всіх частин, крім останньої
+UPLOAD_CHUNK_SIZE = max(int(os.getenv("S3_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)), 5 * 1024 * 1024)
+
+# Ліміт S3 API DeleteObjects; інші сховища ділять видалення на такі самі пакети
+DELETE_BATCH_SIZE = 1000
+
+# Presigned URL кешуються по часових кошиках: у межах одного кошика той самий ключ
+# отримує байт-в-байт однакове посилання, яке браузер/CDN можуть кешувати
+PRESIGNED_URL_BUCKET_SECONDS = int(os.getenv("PRESIGNED_URL_BUCKET_SECONDS", 900))
+PRESIGNED_URL_CACHE_SIZE = int(os.getenv("PRESIGNED_URL_CACHE_SIZE", 10000))
+
+_presigned_url_cache: "OrderedDict[tuple[str, int, int], str]" = OrderedDict()
+_presigned_url_lock = threading.Lock()
+
+class ObjectInfo(NamedTuple):
+    size: int
+    content_type: Optional[str]
+
+class DirectUploadUnsupported(Exception):
+    """Сховище не вміє приймати файли напряму від клієнта"""
+
+def _timed(operation: str, method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = method(self, *args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            STORAGE_CALL_DURATION.observe(
+                time.perf_counter() - started, type(self).__name__, operation, outcome
+            )
+    return wrapper
+
+class StorageBackend:
+    """Інтерфейс сховища. Усі методи блокуючі — з async-коду запускати через threadpool."""
+
+    # Операції, час яких пишеться в метрики; sign_url міряється пакетом у get_presigned_urls
+    TIMED_OPERATIONS = ("upload", "upload_stream", "download", "read_range", "head", "delete", "delete_many")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for operation in cls.TIMED_OPERATIONS:
+            if operation in cls.__dict__:
+                setattr(cls, operation, _timed(operation, cls.__dict__[operation]))
+
+    def upload(self, contents: bytes, key: str, content_type: str):
+        raise NotImplementedError
+
+    def upload_stream(self, file_obj, key: str, content_type: str) -> tuple[int, str]:
+        """Зберігає файл частинами; повертає розмір у байтах та SHA-256 вмісту"""
+        raise NotImplementedError
+
+    def download(self, key: str, file_obj):
+        """Записує вміст об'єкта в переданий файловий об'єкт"""
+        raise NotImplementedError
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        """Байти [start, start + length) об'єкта; менше, якщо об'єкт коротший"""
+        raise NotImplementedError
+
+    def head(self, key: str) -> Optional[ObjectInfo]:
+        """Метадані об'єкта або None, якщо його немає"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def delete_many(self, keys: list[str]) -> list[str]:
+        """Видаляє до DELETE_BATCH_SIZE об'єктів; повертає ключі, які не вдалося видалити"""
+        failed = []
+        for key in keys:
+            try:
+                self.delete(key)
+            except Exception as e:
+                print(f"Не вдалося видалити {key}: {e}")
+                failed.append(key)
+        return failed
+
+    def sign_url(self, key: str, expires_in: int) -> str:
+        """Тимчасове посилання на читання; порожній рядок, якщо підписати не вдалося"""
+        raise NotImplementedError
+
+    def generate_presigned_put_url(self, key: str, content_type: str, size: int, expiration=3600) -> str:
+        """Посилання на один PUT рівно size байтів"""
+        raise DirectUploadUnsupported()
+
+    def create_presigned_multipart_upload(self, key: str, content_type: str, part_count: int, expiration=3600) -> tuple[str, list[str]]:
+        raise DirectUploadUnsupported()
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]):
+        raise DirectUploadUnsupported()
+
+    def abort_multipart_upload(self, key: str, upload_id: str):
+        raise DirectUploadUnsupported()
+
+def _copy_hashing(file_obj, destination) -> tuple[int, str]:
+    hasher = hashlib.sha256()
+    size = 0
+    while chunk := file_obj.read(UPLOAD_CHUNK_SIZE):
+        hasher.update(chunk)
+        size += len(chunk)
+        destination.write(chunk)
+    return size, hasher.hexdigest()
+
+class LocalStorage(StorageBackend):
+    """Файли в каталозі на диску; тип вмісту — у сусідньому файлі <ключ>.content-type"""
+
+    def __init__(self, root: str, base_url: str, secret: Optional[str]):
+        if not secret:
+            # Порожнім ключем підписане посилання міг би підробити будь-хто
+            raise ValueError("Для STORAGE_BACKEND=local потрібен SECRET_KEY")
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        self.secret = secret.encode()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Недопустимий ключ: {key}")
+        return path
+
+    def _write(self, key: str, content_type: str, write) -> tuple[int, str]:
+        # Пишемо в тимчасовий файл і підміняємо атомарно — читачі не побачать половину файлу
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as tmp:
+            try:
+                result = write(tmp)
+            except Exception:
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, path)
+        with open(f"{path}.content-type", "w") as meta:
+            meta.write(content_type or "")
+        return result
+
+    def upload(self, contents: bytes, key: str, content_type: str):
+        self._write(key, content_type, lambda tmp: tmp.write(contents))
+
+    def upload_stream(self, file_obj, key: str, content_type: str) -> tuple[int, str]:
+        return self._write(key, content_type, lambda tmp: _copy_hashing(file_obj, tmp))
+
+    def download(self, key: str, file_obj):
+        with open(self.path(key), "rb") as source:
+            shutil.copyfileobj(source, file_obj, UPLOAD_CHUNK_SIZE)
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self.path(key), "rb") as source:
+            source.seek(start)
+            return source.read(length)
+
+    def head(self, key: str) -> Optional[ObjectInfo]:
+        path = self.path(key)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return None
+        try:
+            with open(f"{path}.content-type") as meta:
+                content_type = meta.read() or None
+        except FileNotFoundError:
+            content_type = None
+        return ObjectInfo(size=size, content_type=content_type)
+
+    def delete(self, key: str):
+        path = self.path(key)
+        for file_path in (path, f"{path}.content-type"):
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                pass
+
+    def _signature(self, key: str, expires: int) -> str:
+        return hmac.new(self.secret, f"{key}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+    def sign_url(self, key: str, expires_in: int) -> str:
+        expires = int(time.time()) + expires_in
+        return f"{self.base_url}/{quote(key)}?expires={expires}&signature={self._signature(key, expires)}"
+
+    def verify_signature(self, key: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(key, expires), signature)
+
+class MemoryStorage(StorageBackend):
+    """Об'єкти в словнику процесу: без диска і мережі, для тестів і бенчмарків"""
+
+    def __init__(self):
+        self.objects: dict[str, tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def upload(self, contents: bytes, key: str, content_type: str):
+        with self._lock:
+            self.objects[key] = (bytes(contents), content_type)
+
+    def upload_stream(self, file_obj, key: str, content_type: str) -> tuple[int, str]:
+        buffer = io.BytesIO()
+        size, content_hash = _copy_hashing(file_obj, buffer)
+        self.upload(buffer.getvalue(), key, content_type)
+        return size, content_hash
+
+    def download(self, key: str, file_obj):
+        with self._lock:
+            contents, _content_type = self.objects[key]
+        file_obj.write(contents)
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with self._lock:
+            contents, _content_type = self.objects[key]
+        return contents[start:start + length]
+
+    def head(self, key: str) -> Optional[ObjectInfo]:
+        with self._lock:
+            stored = self.objects.get(key)
+        if stored is None:
+            return None
+        return ObjectInfo(size=len(stored[0]), content_type=stored[1])
+
+    def delete(self, key: str):
+        with self._lock:
+            self.objects.pop(key, None)
+
+    def sign_url(self, key: str, expires_in: int) -> str:
+        return f"memory://{quote(key)}?expires={int(time.time()) + expires_in}"
+
+@functools.lru_cache(maxsize=None)
+def get_storage() -> StorageBackend:
+    """Сховище, вибране через STORAGE_BACKEND; створюється при першому зверненні"""
+    if STORAGE_BACKEND == "local":
+        return LocalStorage(LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL, os.getenv("SECRET_KEY"))
+    if STORAGE_BACKEND == "memory":
+        return MemoryStorage()
+    if STORAGE_BACKEND == "r2":
+        # boto3 імпортується лише тоді, коли він справді потрібен
+        from .s3 import S3Storage
+        return S3Storage()
+    raise ValueError(f"Невідоме сховище STORAGE_BACKEND={STORAGE_BACKEND}")
+
+def presigned_url_bucket() -> int:
+    """Поточний часовий кошик: поки він не зміниться, посилання лишаються байт-в-байт тими самими"""
+    return int(time.time() // PRESIGNED_URL_BUCKET_SECONDS)
+
+def get_presigned_urls(keys: list[str], expiration=3600) -> dict[str, str]:
+    """Генерує тимчасові посилання для списку файлів, повторно використовуючи кешовані.
+
+    Посилання підписується на expiration + довжину кошика, тож кешоване значення
+    лишається дійсним щонайменше expiration секунд протягом усього кошика.
+    """
+    started = time.perf_counter()
+    time_bucket = presigned_url_bucket()
+    urls = {}
+    missing = []
+
+    with _presigned_url_lock:
+        for key in keys:
+            cache_key = (key, expiration, time_bucket)
+            url = _presigned_url_cache.get(cache_key)
+            if url is None:
+                missing.append(key)
+            else:
+                _presigned_url_cache.move_to_end(cache_key)
+                urls[key] = url
+
+    PRESIGNED_URL_CACHE.inc("hit", amount=len(urls))
+    PRESIGNED_URL_CACHE.inc("miss", amount=len(missing))
+
+    storage = get_storage()
+    signed = {}
+    for key in dict.fromkeys(missing):
+        signed[key] = storage.sign_url(key, expiration + PRESIGNED_URL_BUCKET_SECONDS)
+
+    if signed:
+        with _presigned_url_lock:
+            for key, url in signed.items():
+                if not url:
+                    continue
+                # Якщо інший потік встиг підписати раніше — віддаємо його посилання
+                url = _presigned_url_cache.setdefault((key, expiration, time_bucket), url)
+                signed[key] = url
+            while len(_presigned_url_cache) > PRESIGNED_URL_CACHE_SIZE:
+                _presigned_url_cache.popitem(last=False)
+        urls.update(signed)
+
+    PRESIGNED_URL_BATCH_DURATION.observe(time.perf_counter() - started)
+    return urls
+
+def get_presigned_url(key: str, expiration=3600) -> str:
+    """Генерує тимчасове посилання на файл"""
+    return get_presigned_urls([key], expiration)[key]
@@ -0,0 +1,107 @@
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from ..database import SessionLocal
+from ..models import Photo
+from ..versions import photo_change_statements
+from .storage import get_storage
+
+THUMBNAIL_WIDTHS = sorted(int(width) for width in os.getenv("THUMBNAIL_WIDTHS", "320,1280").split(","))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", max((os.cpu_count() or 2) // 2, 1)))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", 80))
+
+_executor = None
+
+def _init_worker():
+    """Pillow та HEIF-декодер імпортуються лише в процесах пулу, а не при старті API"""
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        # Без pillow-heif прев'ю для HEIC/HEIF просто не генеруються
+        pass
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS, initializer=_init_worker)
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def derivative_key(s3_key: str, width: int) -> str:
+    """Ключ WebP-прев'ю поруч з оригіналом"""
+    return f"{s3_key}.w{width}.webp"
+
+def photo_object_keys(s3_key: str, thumbnail_widths) -> list[str]:
+    """Усі об'єкти в R2, що належать фото: оригінал і його прев'ю"""
+    return [s3_key] + [derivative_key(s3_key, width) for width in thumbnail_widths or []]
+
+def render_derivatives(path: str, widths: list[int]) -> dict[int, bytes]:
+    """Виконується в окремому процесі: зменшує зображення до кожної ширини і кодує у WebP"""
+    from PIL import Image, ImageOps
+
+    results = {}
+    with Image.open(path) as image:
+        # Для JPEG декодер одразу масштабує на етапі DCT — не розпаковуємо повний розмір
+        image.draft("RGB", (max(widths), max(widths)))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        # Від більшої ширини до меншої, кожне прев'ю масштабується з попереднього
+        for width in sorted(widths, reverse=True):
+            if width < image.width:
+                height = max(round(image.height * width / image.width), 1)
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+            results[width] = buffer.getvalue()
+    return results
+
+def generate_thumbnails(s3_key: str):
+    """Фонова задача: генерує прев'ю об'єкта в пулі процесів і позначає їх у всіх фото з цим ключем"""
+    try:
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(s3_key)[1]) as tmp:
+            get_storage().download(s3_key, tmp)
+            tmp.flush()
+            derivatives = _get_executor().submit(render_derivatives, tmp.name, THUMBNAIL_WIDTHS).result()
+    except Exception as e:
+        print(f"Не вдалося згенерувати прев'ю для {s3_key}: {e}")
+        return
+
+    # Невдала ширина не зупиняє інші — у фото записуються лише збережені
+    storage = get_storage()
+    uploaded = []
+    for width, contents in sorted(derivatives.items()):
+        try:
+            storage.upload(contents, derivative_key(s3_key, width), "image/webp")
+        except Exception as e:
+            print(f"Не вдалося зберегти прев'ю {width}px для {s3_key}: {e}")
+            continue
+        uploaded.append(width)
+    if not uploaded:
+        return
+
+    db = SessionLocal()
+    try:
+        updated = db.query(Photo).filter(Photo.s3_key == s3_key).update(
+            {Photo.thumbnail_widths: uploaded},
+            synchronize_session=False
+        )
+        if not updated:
+            # Фото видалили під час генерації — прев'ю вже ніхто не прибере, крім нас
+            db.rollback()
+            storage.delete_many([derivative_key(s3_key, width) for width in uploaded])
+            return
+        # Прев'ю з'являються у списках — їхні ETag мають змінитись
+        for statement in photo_change_statements(Photo.s3_key == s3_key):
+            db.execute(statement)
+        db.commit()
+    finally:
+        db.close()
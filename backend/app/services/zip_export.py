@@ -0,0 +1,205 @@
+"""Потоковий ZIP-експорт піддерева папок.
+
+Архів пишеться у режимі store (фото вже стиснені) у незвертуваний потік: zipfile
+тоді ставить розміри й CRC у data descriptor після кожного файлу, а ZIP64 вмикає
+сам, коли файл, зміщення чи кількість записів перевищують ліміти звичайного ZIP.
+Об'єкти читаються ranged-запитами по EXPORT_CHUNK_SIZE, тож у пам'яті одночасно
+не більше ніж 2 × EXPORT_PREFETCH шматків незалежно від розміру фото.
+"""
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterator, NamedTuple, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..folder_tree import subtree_filter
+from ..models import Folder, Photo
+from .storage import get_storage
+
+EXPORT_PREFETCH = int(os.getenv("EXPORT_PREFETCH", 4))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1024 * 1024))
+ERRORS_FILENAME = "export-errors.txt"
+# Найраніша дата, яку вміщує формат ZIP
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+class ExportEntry(NamedTuple):
+    name: str
+    # None — запис каталогу
+    s3_key: Optional[str]
+    modified: Optional[datetime]
+
+def _safe_name(name: str) -> str:
+    name = (name or "").replace("/", "_").replace("\\", "_").strip()
+    return "_" if name in ("", ".", "..") else name
+
+def _unique_name(name: str, used: set[str]) -> str:
+    """photo.jpg, photo (2).jpg, ... — у межах одного каталогу архіву"""
+    candidate = name
+    stem, extension = os.path.splitext(name)
+    counter = 2
+    while candidate.lower() in used:
+        candidate = f"{stem} ({counter}){extension}"
+        counter += 1
+    used.add(candidate.lower())
+    return candidate
+
+async def export_entries(db: AsyncSession, root: Folder) -> list[ExportEntry]:
+    """Каталоги й файли архіву двома запитами; шляхи всередині починаються з імені root"""
+    folders = (await db.execute(
+        select(Folder.id, Folder.name, Folder.parent_id, Folder.created_at)
+        .where(subtree_filter(root))
+        .order_by(Folder.path)
+    )).all()
+    photos = (await db.execute(
+        select(Photo.folder_id, Photo.filename, Photo.s3_key, Photo.created_at)
+        .join(Folder, Folder.id == Photo.folder_id)
+        .where(subtree_filter(root))
+        .order_by(Folder.path, Photo.created_at, Photo.id)
+    )).all()
+
+    # Упорядкування за path гарантує, що батько вже має свій шлях в архіві
+    directories: dict = {}
+    used_names: dict = {}
+    entries = []
+    for folder in folders:
+        parent_dir = directories.get(folder.parent_id, "") if folder.id != root.id else ""
+        siblings = used_names.setdefault(parent_dir, set())
+        directory = f"{parent_dir}{_unique_name(_safe_name(folder.name), siblings)}/"
+        directories[folder.id] = directory
+        entries.append(ExportEntry(directory, None, folder.created_at))
+
+    for photo in photos:
+        directory = directories[photo.folder_id]
+        siblings = used_names.setdefault(directory, set())
+        name = _unique_name(_safe_name(photo.filename), siblings)
+        entries.append(ExportEntry(f"{directory}{name}", photo.s3_key, photo.created_at))
+    return entries
+
+class _ChunkWriter:
+    """Незвертуваний приймач для zipfile: накопичує записане до наступного drain()"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _zip_info(entry: ExportEntry) -> zipfile.ZipInfo:
+    date_time = entry.modified.timetuple()[:6] if entry.modified else ZIP_EPOCH
+    info = zipfile.ZipInfo(entry.name, date_time=max(date_time, ZIP_EPOCH))
+    info.compress_type = zipfile.ZIP_STORED
+    if entry.s3_key is None:
+        info.external_attr = 0o40755 << 16 | 0x10
+    else:
+        info.external_attr = 0o644 << 16
+    return info
+
+def _read_chunk(s3_key: str, start: int, length: int) -> bytes:
+    chunk = get_storage().read_range(s3_key, start, length)
+    if len(chunk) != length:
+        raise IOError(f"Об'єкт {s3_key} змінився під час експорту")
+    return chunk
+
+def _open(s3_key: str) -> tuple[int, bytes]:
+    """Розмір об'єкта і його перший шматок"""
+    info = get_storage().head(s3_key)
+    if info is None:
+        raise FileNotFoundError(s3_key)
+    if not info.size:
+        return 0, b""
+    return info.size, _read_chunk(s3_key, 0, min(info.size, EXPORT_CHUNK_SIZE))
+
+def _remaining_chunks(executor: ThreadPoolExecutor, s3_key: str, start: int, size: int) -> Iterator[bytes]:
+    """Решта об'єкта по шматках, до EXPORT_PREFETCH запитів наперед"""
+    offsets = iter(range(start, size, EXPORT_CHUNK_SIZE))
+    pending = deque()
+
+    def prefetch():
+        while len(pending) < EXPORT_PREFETCH:
+            offset = next(offsets, None)
+            if offset is None:
+                return
+            pending.append(executor.submit(_read_chunk, s3_key, offset, min(EXPORT_CHUNK_SIZE, size - offset)))
+
+    try:
+        prefetch()
+        while pending:
+            chunk = pending.popleft().result()
+            prefetch()
+            yield chunk
+    finally:
+        for future in pending:
+            future.cancel()
+
+def stream_zip(entries: list[ExportEntry]) -> Iterator[bytes]:
+    """Шматки ZIP-архіву в міру його побудови.
+
+    Блокуючий генератор — StreamingResponse виконує його у threadpool. Розміри й
+    перші шматки наступних EXPORT_PREFETCH файлів читаються паралельно з поточним;
+    відсутні у сховищі пропускаються й перелічуються в export-errors.txt наприкінці
+    архіву. Помилка читання посеред файлу обриває передачу — запис у ZIP уже почато.
+    """
+    writer = _ChunkWriter()
+    executor = ThreadPoolExecutor(max_workers=EXPORT_PREFETCH)
+    files = iter([entry for entry in entries if entry.s3_key is not None])
+    pending = deque()
+    failed = []
+
+    def prefetch():
+        while len(pending) < EXPORT_PREFETCH:
+            entry = next(files, None)
+            if entry is None:
+                return
+            pending.append((entry, executor.submit(_open, entry.s3_key)))
+
+    def flush():
+        data = writer.drain()
+        if data:
+            yield data
+
+    try:
+        prefetch()
+        with zipfile.ZipFile(writer, "w", zipfile.ZIP_STORED) as archive:
+            for entry in entries:
+                if entry.s3_key is None:
+                    archive.writestr(_zip_info(entry), b"")
+            yield from flush()
+
+            while pending:
+                entry, future = pending.popleft()
+                prefetch()
+                try:
+                    size, first_chunk = future.result()
+                except Exception as e:
+                    print(f"Експорт: не вдалося прочитати {entry.s3_key}: {e}")
+                    failed.append(entry.name)
+                    continue
+
+                info = _zip_info(entry)
+                # Розмір відомий до заголовка — за ним zipfile вирішує, чи потрібен ZIP64
+                info.file_size = size
+                with archive.open(info, "w") as target:
+                    target.write(first_chunk)
+                    del first_chunk
+                    yield from flush()
+                    for chunk in _remaining_chunks(executor, entry.s3_key, min(size, EXPORT_CHUNK_SIZE), size):
+                        target.write(chunk)
+                        yield from flush()
+                yield from flush()
+
+            if failed:
+                archive.writestr(ERRORS_FILENAME, "Не вдалося додати до архіву:\n" + "\n".join(failed) + "\n")
+        yield from flush()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
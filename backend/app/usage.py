@@ -0,0 +1,220 @@
+"""Лічильники використання сховища: на користувача (User.used_bytes, photo_count)
+і на піддерево папки (Folder.subtree_bytes, subtree_photo_count).
+
+Як і versions.py, функції повертають UPDATE-вирази, які виконуються в тій самій
+транзакції, що й зміна фото чи папок — до самої зміни, поки зачеплені рядки ще існують.
+Розмір рахується за Photo.size кожного фото, тож дедупліковані копії враховуються окремо.
+reconcile_usage перераховує все з таблиці photos і виправляє можливі розбіжності.
+
+Запуск перерахунку вручну: python -m app.usage
+"""
+import os
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import ARRAY, cast, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from .database import SessionLocal
+from .folder_tree import PATH_SEPARATOR, folder_ancestor_ids, subtree_filter
+from .models import Folder, Photo, User
+
+# Квота за замовчуванням для користувачів без власної (User.quota_bytes); 0 — без обмежень
+DEFAULT_QUOTA_BYTES = int(os.getenv("DEFAULT_QUOTA_BYTES", 0))
+
+def _change_users(user_filter, size, count):
+    return (
+        update(User)
+        .where(user_filter)
+        .values(used_bytes=User.used_bytes + size, photo_count=User.photo_count + count)
+        .execution_options(synchronize_session=False)
+    )
+
+def _change_folders(folder_filter, size, count):
+    return (
+        update(Folder)
+        .where(folder_filter)
+        .values(subtree_bytes=Folder.subtree_bytes + size, subtree_photo_count=Folder.subtree_photo_count + count)
+        .execution_options(synchronize_session=False)
+    )
+
+def _path_ids(path_column):
+    return cast(func.string_to_array(path_column, PATH_SEPARATOR), ARRAY(PG_UUID(as_uuid=True)))
+
+def photo_usage_statements(user_id: UUID, folder_id: Optional[UUID], size: int, count: int = 1) -> list:
+    """Додавання (або, з від'ємними size і count, видалення) фото користувача в папці.
+
+    Блокує рядок користувача, потім папки — виконувати до лічильників версій, інакше
+    паралельні зміни в папці та її предку чекатимуть одна одну по колу.
+    """
+    statements = [_change_users(User.id == user_id, size, count)]
+    if folder_id:
+        # Папка та всі її предки — за path, без окремого читання папки
+        target = aliased(Folder)
+        ancestors = select(func.unnest(_path_ids(target.path))).where(target.id == folder_id)
+        statements.append(_change_folders(Folder.id.in_(ancestors), size, count))
+    return statements
+
+def _subtree_totals(folder: Folder):
+    removed = aliased(Folder)
+    size = select(removed.subtree_bytes).where(removed.id == folder.id).scalar_subquery()
+    count = select(removed.subtree_photo_count).where(removed.id == folder.id).scalar_subquery()
+    return size, count
+
+def subtree_removal_statements(folder: Folder) -> list:
+    """Видалення папки з піддеревом: предки втрачають її підсумок, кожен завантажувач — свої фото"""
+    subtree_ids = select(Folder.id).where(subtree_filter(folder))
+    per_user = (
+        select(
+            Photo.user_id,
+            func.coalesce(func.sum(Photo.size), 0).label("size"),
+            func.count().label("count"),
+        )
+        .where(Photo.folder_id.in_(subtree_ids))
+        .group_by(Photo.user_id)
+        .subquery()
+    )
+    statements = [
+        update(User)
+        .where(User.id == per_user.c.user_id)
+        .values(used_bytes=User.used_bytes - per_user.c.size, photo_count=User.photo_count - per_user.c.count)
+        .execution_options(synchronize_session=False)
+    ]
+
+    ancestor_ids = folder_ancestor_ids(folder, include_self=False)
+    if ancestor_ids:
+        size, count = _subtree_totals(folder)
+        statements.append(_change_folders(Folder.id.in_(ancestor_ids), -size, -count))
+    return statements
+
+def folder_move_statements(folder: Folder, new_parent: Optional[Folder]) -> list:
+    """Перенесення піддерева: підсумок папки переходить від старих предків до нових (спільні не змінюються).
+
+    Виконувати до move_folder, поки folder.path ще старий.
+    """
+    old_ancestors = set(folder_ancestor_ids(folder, include_self=False))
+    new_ancestors = set(folder_ancestor_ids(new_parent)) if new_parent else set()
+    size, count = _subtree_totals(folder)
+
+    statements = []
+    if old_ancestors - new_ancestors:
+        statements.append(_change_folders(Folder.id.in_(old_ancestors - new_ancestors), -size, -count))
+    if new_ancestors - old_ancestors:
+        statements.append(_change_folders(Folder.id.in_(new_ancestors - old_ancestors), size, count))
+    return statements
+
+def effective_quota(quota_bytes: Optional[int]) -> Optional[int]:
+    """Квота користувача в байтах або None, якщо обмежень немає"""
+    if quota_bytes is not None:
+        return quota_bytes
+    return DEFAULT_QUOTA_BYTES or None
+
+async def user_usage(db: AsyncSession, user_id: UUID):
+    """(used_bytes, photo_count, quota_bytes) — свіже читання, бо користувач у запиті може бути кешованим"""
+    return (await db.execute(
+        select(User.used_bytes, User.photo_count, User.quota_bytes).where(User.id == user_id)
+    )).one()
+
+async def fits_quota(db: AsyncSession, user_id: UUID, incoming_bytes: int) -> bool:
+    """Чи вміститься ще incoming_bytes; паралельні завантаження можуть ненадовго перевищити квоту"""
+    used_bytes, _photo_count, quota_bytes = await user_usage(db, user_id)
+    quota = effective_quota(quota_bytes)
+    return quota is None or used_bytes + incoming_bytes <= quota
+
+def reconcile_usage(db: Session) -> tuple[int, int]:
+    """Перераховує всі лічильники з таблиці photos кількома set-based запитами.
+
+    Оновлюються лише рядки з розбіжностями; повертає (виправлено користувачів, виправлено папок).
+
+    Інкременти лічильників виконуються до зміни photos у тій самій транзакції, тож блокування
+    таблиць users і folders дочікується транзакцій, що вже змінили лічильники, і затримує нові
+    до коміту перерахунку — інакше абсолютне значення затерло б паралельний інкремент.
+    Читання не блокуються.
+    """
+    db.execute(text("LOCK TABLE users, folders IN SHARE ROW EXCLUSIVE MODE"))
+    user_totals = (
+        select(
+            Photo.user_id,
+            func.coalesce(func.sum(Photo.size), 0).label("size"),
+            func.count().label("count"),
+        )
+        .group_by(Photo.user_id)
+        .subquery()
+    )
+    users_fixed = db.execute(
+        update(User)
+        .where(
+            User.id == user_totals.c.user_id,
+            or_(User.used_bytes != user_totals.c.size, User.photo_count != user_totals.c.count)
+        )
+        .values(used_bytes=user_totals.c.size, photo_count=user_totals.c.count)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    users_fixed += db.execute(
+        update(User)
+        .where(
+            or_(User.used_bytes != 0, User.photo_count != 0),
+            User.id.not_in(select(Photo.user_id).distinct())
+        )
+        .values(used_bytes=0, photo_count=0)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # Підсумок кожної папки з фото додається до неї самої та всіх її предків з path
+    direct = (
+        select(
+            Photo.folder_id,
+            func.coalesce(func.sum(Photo.size), 0).label("size"),
+            func.count().label("count"),
+        )
+        .where(Photo.folder_id.is_not(None))
+        .group_by(Photo.folder_id)
+        .subquery()
+    )
+    expanded = (
+        select(func.unnest(_path_ids(Folder.path)).label("ancestor_id"), direct.c.size, direct.c.count)
+        .select_from(Folder)
+        .join(direct, direct.c.folder_id == Folder.id)
+        .subquery()
+    )
+    folder_totals = (
+        select(
+            expanded.c.ancestor_id,
+            func.sum(expanded.c.size).label("size"),
+            func.sum(expanded.c.count).label("count"),
+        )
+        .group_by(expanded.c.ancestor_id)
+        .subquery()
+    )
+    folders_fixed = db.execute(
+        update(Folder)
+        .where(
+            Folder.id == folder_totals.c.ancestor_id,
+            or_(Folder.subtree_bytes != folder_totals.c.size, Folder.subtree_photo_count != folder_totals.c.count)
+        )
+        .values(subtree_bytes=folder_totals.c.size, subtree_photo_count=folder_totals.c.count)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    folders_fixed += db.execute(
+        update(Folder)
+        .where(
+            or_(Folder.subtree_bytes != 0, Folder.subtree_photo_count != 0),
+            Folder.id.not_in(select(folder_totals.c.ancestor_id))
+        )
+        .values(subtree_bytes=0, subtree_photo_count=0)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    db.commit()
+    return users_fixed, folders_fixed
+
+def main():
+    db = SessionLocal()
+    try:
+        users_fixed, folders_fixed = reconcile_usage(db)
+    finally:
+        db.close()
+    print(f"Лічильники перераховано: виправлено {users_fixed} користувачів, {folders_fixed} папок")
+
+if __name__ == "__main__":
+    main()
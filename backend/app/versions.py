@@ -0,0 +1,67 @@
+"""Лічильники змін для ETag списків.
+
+Folder.version змінюється, коли змінюється вміст папки (фото чи підпапки),
+User.version — коли змінюються кореневі списки користувача або те, чим з ним поділились.
+Функції повертають UPDATE-вирази, тож їх можна виконати і в sync, і в async сесії —
+до самої зміни, поки зачеплені рядки ще існують. Користувачі оновлюються раніше
+за папки — у тому ж порядку, що й лічильники використання (usage.py).
+"""
+from sqlalchemy import select, union, update
+from .models import Folder, Photo, SharedFolder, SharedPhoto, User
+
+def _bump_folders(folder_ids):
+    return (
+        update(Folder)
+        .where(Folder.id.in_(folder_ids))
+        .values(version=Folder.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def _bump_users(user_ids):
+    return (
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(version=User.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def bump_folder(folder_id):
+    return _bump_folders([folder_id])
+
+def bump_user(user_id):
+    return _bump_users([user_id])
+
+def bump_photo_listing(folder_id, user_id):
+    """Список, у якому з'являються нові фото: папка або корінь завантажувача"""
+    if folder_id:
+        return bump_folder(folder_id)
+    return bump_user(user_id)
+
+def bump_parent(folder: Folder):
+    """Список, у якому видно папку: батьківська папка або корінь власника"""
+    if folder.parent_id:
+        return bump_folder(folder.parent_id)
+    return bump_user(folder.user_id)
+
+def photo_change_statements(photo_filter) -> list:
+    """Зміна фото: їхні папки, кореневі списки власників і «поширені мені» отримувачів"""
+    changed_photos = select(Photo.id).where(photo_filter)
+    return [
+        _bump_users(union(
+            select(Photo.user_id).where(photo_filter, Photo.folder_id.is_(None)),
+            select(SharedPhoto.user_id).where(SharedPhoto.photo_id.in_(changed_photos)),
+        )),
+        _bump_folders(select(Photo.folder_id).where(photo_filter, Photo.folder_id.is_not(None))),
+    ]
+
+def folder_change_statements(folder_filter) -> list:
+    """Зміна папок: списки, де вони видні, та «поширені мені» отримувачів"""
+    return [
+        _bump_users(union(
+            select(Folder.user_id).where(folder_filter, Folder.parent_id.is_(None)),
+            select(SharedFolder.user_id).where(
+                SharedFolder.folder_id.in_(select(Folder.id).where(folder_filter))
+            ),
+        )),
+        _bump_folders(select(Folder.parent_id).where(folder_filter, Folder.parent_id.is_not(None))),
+    ]
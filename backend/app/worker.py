@@ -0,0 +1,54 @@
+"""Окремий процес для фонових задач, що не мають виконуватись у веб-воркерах.
+
+Запуск: python -m app.worker
+"""
+import os
+import time
+from .database import SessionLocal
+from .services.email import SMTPMailer
+from .services.notifications import process_due_notifications
+from .services.photo_metadata import METADATA_BACKFILL_BATCH, backfill_metadata
+from .usage import reconcile_usage
+
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", 10))
+# Як часто перераховувати лічильники використання сховища; 0 — не перераховувати
+USAGE_RECONCILE_INTERVAL = float(os.getenv("USAGE_RECONCILE_INTERVAL", 24 * 3600))
+
+def main():
+    mailer = SMTPMailer()
+    print("Воркер фонових задач запущено")
+    # Перший перерахунок — через інтервал, а не на кожному перезапуску воркера
+    next_reconcile = time.monotonic() + USAGE_RECONCILE_INTERVAL
+    try:
+        while True:
+            db = SessionLocal()
+            backfilled = 0
+            try:
+                process_due_notifications(db, mailer)
+            except Exception as e:
+                print(f"Помилка обробки сповіщень: {e}")
+                db.rollback()
+            try:
+                backfilled = backfill_metadata(db)
+            except Exception as e:
+                print(f"Помилка заповнення метаданих фото: {e}")
+                db.rollback()
+            try:
+                if USAGE_RECONCILE_INTERVAL and time.monotonic() >= next_reconcile:
+                    next_reconcile = time.monotonic() + USAGE_RECONCILE_INTERVAL
+                    users_fixed, folders_fixed = reconcile_usage(db)
+                    if users_fixed or folders_fixed:
+                        print(f"Лічильники використання виправлено: {users_fixed} користувачів, {folders_fixed} папок")
+            except Exception as e:
+                print(f"Помилка перерахунку використання сховища: {e}")
+                db.rollback()
+            finally:
+                db.close()
+            # Поки є старі фото без метаданих — наступний пакет одразу
+            if backfilled < METADATA_BACKFILL_BATCH:
+                time.sleep(WORKER_POLL_INTERVAL)
+    finally:
+        mailer.close()
+
+if __name__ == "__main__":
+    main()
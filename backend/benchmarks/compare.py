@@ -0,0 +1,36 @@
+"""Порівнює два файли результатів benchmarks.run.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+
+COLUMNS = ("p50_ms", "p90_ms", "p99_ms", "queries_mean", "rps")
+
+def change(old, new) -> str:
+    if old is None or new is None:
+        return f"{'-' if new is None else new:>9}"
+    if not old:
+        return f"{new:>9}"
+    return f"{new:>9} ({(new - old) / old:+.0%})"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old['commit']} {old['label']}  ->  {new['commit']} {new['label']}")
+    print(f"{'сценарій':28} " + " ".join(f"{column:>17}" for column in COLUMNS))
+    for name, new_summary in new["scenarios"].items():
+        old_summary = old["scenarios"].get(name, {})
+        cells = [f"{change(old_summary.get(column), new_summary.get(column)):>17}" for column in COLUMNS]
+        print(f"{name:28} " + " ".join(cells))
+
+if __name__ == "__main__":
+    main()
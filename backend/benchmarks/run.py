@@ -0,0 +1,346 @@
+"""Бенчмарк основних шляхів API: списки, завантаження, видалення папок.
+
+Запуск з каталогу backend (потрібні локальна БД з міграціями та pip install -r benchmarks/requirements.txt):
+    python -m benchmarks.run --iterations 200 --concurrency 8 --label my-change
+
+За замовчуванням застосунок працює в цьому ж процесі через ASGI з STORAGE_BACKEND=memory,
+тож мережа і R2 не потрібні. Фонові задачі (мініатюри після upload, видалення об'єктів
+після DELETE /folders) доробляються після відповіді, як під uvicorn, і у вимір не входять;
+між сценаріями скрипт чекає, поки вони завершаться. З --base-url запити йдуть на запущений
+сервер, який має дивитися в ту саму БД (DATABASE_URL), що й цей скрипт.
+
+Результат друкується таблицею і зберігається в benchmarks/results/<час>-<коміт>.json;
+порівняння двох прогонів: python -m benchmarks.compare old.json new.json
+"""
+import os
+
+# До імпорту застосунку: сховище в пам'яті й без фонового прогріву
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("STARTUP_WARMUP", "false")
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import random
+import re
+import subprocess
+import time
+from datetime import datetime
+from typing import Optional
+import httpx
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.models import Folder, Photo
+from app.routers.auth import create_token
+from app.usage import photo_usage_statements
+from . import seed as seeding
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+# Маркери JPEG: початок файлу й сегмент коментаря, який декодери пропускають
+JPEG_SOI = b"\xff\xd8"
+JPEG_COM = b"\xff\xfe"
+JPEG_SEGMENT_MAX = 65535
+# Випадкові байти в першому коментарі роблять кожне завантаження унікальним для дедуплікації
+UNIQUE_BYTES = 16
+
+class DetachedBackground:
+    """ASGI-обгортка для запуску в процесі: повертає керування, щойно надіслано тіло відповіді.
+
+    httpx.ASGITransport чекає, доки застосунок завершиться, а Starlette виконує
+    BackgroundTasks саме перед цим — без обгортки вони потрапили б у латентність запиту.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.pending: set[asyncio.Task] = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        response_sent = asyncio.Event()
+
+        async def send_and_detect_end(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_sent.set()
+
+        task = asyncio.create_task(self.app(scope, receive, send_and_detect_end))
+        self.pending.add(task)
+        task.add_done_callback(self._finished)
+        waiter = asyncio.create_task(response_sent.wait())
+        await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        # Помилка після відправленої відповіді (500 від ServerErrorMiddleware) лише логується
+        if not response_sent.is_set():
+            task.result()
+
+    def _finished(self, task: asyncio.Task):
+        self.pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Застосунок після відповіді: {task.exception()!r}")
+
+    async def settle(self):
+        """Чекає фонові задачі всіх уже відправлених відповідей"""
+        while self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+
+def _comment_segments(length: int) -> bytes:
+    """Сегменти COM загальною довжиною рівно length байт (length == 0 або >= 4)"""
+    segments = []
+    while length:
+        size = min(length, JPEG_SEGMENT_MAX + 2)
+        if 0 < length - size < 4:
+            size -= 4
+        segments.append(JPEG_COM + (size - 2).to_bytes(2, "big") + bytes(size - 4))
+        length -= size
+    return b"".join(segments)
+
+def jpeg_payload(size: int) -> bytes:
+    """Справжній JPEG рівно size байт: шум, доповнений коментарями до потрібного розміру"""
+    from PIL import Image
+
+    # Перший коментар — місце для унікальних байтів (див. unique_payload)
+    unique = JPEG_COM + (UNIQUE_BYTES + 2).to_bytes(2, "big") + bytes(UNIQUE_BYTES)
+    rng = random.Random(size)
+    # Шум майже не стискається, тож пікселі займуть більшу частину файлу
+    side = max(int(math.sqrt(size / 2)), 8)
+    while side >= 8:
+        buffer = io.BytesIO()
+        Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3)).save(buffer, "JPEG", quality=85)
+        encoded = buffer.getvalue()
+        padding = size - len(encoded) - len(unique)
+        if padding == 0 or padding >= 4:
+            return JPEG_SOI + unique + _comment_segments(padding) + encoded[len(JPEG_SOI):]
+        side = side - 1 if padding > 0 else int(side * 0.8)
+    raise ValueError(f"Замалий розмір JPEG: {size} байт")
+
+def unique_payload(payload: bytes) -> bytes:
+    start = len(JPEG_SOI) + 4
+    return payload[:start] + os.urandom(UNIQUE_BYTES) + payload[start + UNIQUE_BYTES:]
+
+class Scenario:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: list[float] = []
+        self.queries: list[int] = []
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def record(self, response: httpx.Response, latency: float, expected_status: int):
+        if response.status_code != expected_status:
+            self.errors += 1
+            return
+        self.latencies.append(latency)
+        match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+        if match:
+            self.queries.append(int(match.group(1)))
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[max(math.ceil(p * len(latencies)) - 1, 0)] * 1000, 2)
+
+        return {
+            "count": len(latencies),
+            "errors": self.errors,
+            "p50_ms": percentile(0.50),
+            "p90_ms": percentile(0.90),
+            "p99_ms": percentile(0.99),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+            "queries_mean": round(sum(self.queries) / len(self.queries), 2) if self.queries else None,
+            "queries_max": max(self.queries) if self.queries else None,
+            "rps": round(len(latencies) / self.elapsed, 1) if self.elapsed else None,
+        }
+
+async def run_scenario(scenario: Scenario, iterations: int, concurrency: int, make_request):
+    """make_request(i) -> (відповідь, час, очікуваний статус); запускається iterations разів з concurrency паралельно"""
+    counter = iter(range(iterations))
+
+    async def worker():
+        for index in counter:
+            try:
+                response, latency, expected_status = await make_request(index)
+            except httpx.HTTPError as e:
+                print(f"{scenario.name}: {e}")
+                scenario.errors += 1
+                continue
+            scenario.record(response, latency, expected_status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    scenario.elapsed = time.perf_counter() - started
+
+async def timed(coroutine) -> tuple[httpx.Response, float]:
+    started = time.perf_counter()
+    response = await coroutine
+    return response, time.perf_counter() - started
+
+def seed_deletion_target(user_id) -> str:
+    """Невелике піддерево для одного виміру DELETE /folders/{id}; створення не входить у вимір"""
+    folders, photos = seeding.build_tree(user_id, depth=2, breadth=2, photos=5, rng=random.Random())
+    db = SessionLocal()
+    try:
+        db.execute(insert(Folder), folders)
+        # Через ті самі лічильники, що й завантаження, — інакше видалення зведе used_bytes у мінус
+        for folder in folders:
+            folder_photos = [photo for photo in photos if photo["folder_id"] == folder["id"]]
+            size = sum(photo["size"] for photo in folder_photos)
+            for statement in photo_usage_statements(user_id, folder["id"], size, len(folder_photos)):
+                db.execute(statement)
+        db.execute(insert(Photo), photos)
+        db.commit()
+    finally:
+        db.close()
+    return str(folders[0]["id"])
+
+async def run_benchmarks(client: httpx.AsyncClient, data: seeding.SeededData, args, settle=None) -> dict[str, dict]:
+    """settle() — чекати фонові задачі застосунку між сценаріями (лише для запуску в процесі)"""
+    rng = random.Random(args.seed)
+    users = data.user_ids
+    headers = {user_id: {"Authorization": f"Bearer {create_token(user_id)}"} for user_id in users}
+    scenarios = {}
+    upload_contents = jpeg_payload(args.upload_size)
+
+    def pick_user():
+        return rng.choice(users)
+
+    async def list_photos(_index):
+        user_id = pick_user()
+        folder_id = rng.choice(data.folder_ids[user_id])
+        return (*await timed(client.get("/photos/", params={"folder_id": str(folder_id)}, headers=headers[user_id])), 200)
+
+    async def list_photos_not_modified(_index):
+        user_id = pick_user()
+        folder_id = rng.choice(data.folder_ids[user_id])
+        params = {"folder_id": str(folder_id)}
+        first = await client.get("/photos/", params=params, headers=headers[user_id])
+        conditional = {**headers[user_id], "If-None-Match": first.headers.get("etag", "")}
+        return (*await timed(client.get("/photos/", params=params, headers=conditional)), 304)
+
+    async def list_folders(_index):
+        user_id = pick_user()
+        parent_id = rng.choice(data.root_folder_ids[user_id])
+        return (*await timed(client.get("/folders/", params={"parent_id": str(parent_id)}, headers=headers[user_id])), 200)
+
+    async def upload_photo(index):
+        user_id = pick_user()
+        folder_id = rng.choice(data.folder_ids[user_id])
+        # Унікальний вміст, інакше дедуплікація пропустить запис у сховище
+        files = {"file": (f"bench-{index}.jpg", unique_payload(upload_contents), "image/jpeg")}
+        return (*await timed(client.post(
+            "/photos/upload", params={"folder_id": str(folder_id)}, files=files, headers=headers[user_id]
+        )), 200)
+
+    async def delete_folder(_index):
+        user_id = pick_user()
+        folder_id = await asyncio.to_thread(seed_deletion_target, user_id)
+        return (*await timed(client.delete(f"/folders/{folder_id}", headers=headers[user_id])), 200)
+
+    plan = {
+        "GET /photos/": list_photos,
+        "GET /photos/ (304)": list_photos_not_modified,
+        "GET /folders/?parent_id=": list_folders,
+        "POST /photos/upload": upload_photo,
+        "DELETE /folders/{id}": delete_folder,
+    }
+    for name, make_request in plan.items():
+        if args.only and not any(part in name for part in args.only):
+            continue
+        scenario = Scenario(name)
+        # Кілька запитів на прогрів пулів і кешів не враховуються
+        await run_scenario(Scenario(name), min(args.warmup, args.iterations), args.concurrency, make_request)
+        if settle:
+            await settle()
+        await run_scenario(scenario, args.iterations, args.concurrency, make_request)
+        if settle:
+            await settle()
+        scenarios[name] = scenario.summary()
+        print_row(name, scenarios[name])
+    return scenarios
+
+def print_row(name: str, summary: dict):
+    def fmt(value):
+        return "-" if value is None else f"{value}"
+    print(f"{name:28} {fmt(summary['p50_ms']):>9} {fmt(summary['p90_ms']):>9} {fmt(summary['p99_ms']):>9} "
+          f"{fmt(summary['queries_mean']):>8} {fmt(summary['rps']):>8} {summary['errors']:>6}")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def main_async(args):
+    config = seeding.SeedConfig(args.users, args.depth, args.breadth, args.photos, args.shares, args.seed)
+    db = SessionLocal()
+    try:
+        seeding.reset(db)
+        data = seeding.seed(db, config)
+    finally:
+        db.close()
+
+    settle = None
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        target = args.base_url
+    else:
+        from app.main import app
+        detached = DetachedBackground(app)
+        settle = detached.settle
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=detached), base_url="http://benchmark", timeout=60)
+        target = f"in-process, STORAGE_BACKEND={os.environ['STORAGE_BACKEND']}"
+
+    print(f"Ціль: {target}; {args.iterations} ітерацій, паралельно {args.concurrency}")
+    print(f"{'сценарій':28} {'p50 мс':>9} {'p90 мс':>9} {'p99 мс':>9} {'запитів':>8} {'rps':>8} {'помил.':>6}")
+    async with client:
+        scenarios = await run_benchmarks(client, data, args, settle)
+
+    return {
+        "commit": git_commit(),
+        "label": args.label,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "target": target,
+        "config": {**vars(config), "iterations": args.iterations, "concurrency": args.concurrency,
+                   "upload_size": args.upload_size},
+        "scenarios": scenarios,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="адреса запущеного сервера замість застосунку в цьому процесі")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=seeding.SeedConfig.users)
+    parser.add_argument("--depth", type=int, default=seeding.SeedConfig.depth)
+    parser.add_argument("--breadth", type=int, default=seeding.SeedConfig.breadth)
+    parser.add_argument("--photos", type=int, default=seeding.SeedConfig.photos, help="фото в кожній папці")
+    parser.add_argument("--shares", type=int, default=seeding.SeedConfig.shares)
+    parser.add_argument("--seed", type=int, default=seeding.SeedConfig.seed)
+    parser.add_argument("--upload-size", type=int, default=256 * 1024, help="розмір файлу для upload, байт")
+    parser.add_argument("--only", nargs="*", help="лише сценарії, що містять ці підрядки")
+    parser.add_argument("--label", default="", help="позначка прогону у файлі результатів")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    filename = f"{datetime.utcnow():%Y%m%d-%H%M%S}-{result['commit']}{'-' + args.label if args.label else ''}.json"
+    path = os.path.join(RESULTS_DIR, filename)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Результати: {path}")
+
+if __name__ == "__main__":
+    main()
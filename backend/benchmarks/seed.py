@@ -0,0 +1,170 @@
+"""Наповнює локальну БД синтетичними даними для бенчмарків.
+
+Запуск з каталогу backend (після alembic upgrade head):
+    python -m benchmarks.seed --users 20 --depth 4 --breadth 3 --photos 25 --shares 3 --reset
+
+Усі користувачі мають email @benchmark.local — --reset видаляє лише їх та їхні дані.
+"""
+import argparse
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.folder_tree import PATH_SEPARATOR
+from app.models import Folder, Photo, SharedFolder, SharedPhoto, User
+from app.usage import reconcile_usage
+
+EMAIL_DOMAIN = "benchmark.local"
+# Вхід паролем не бенчмаркається — токени видаються напряму, тож хеш навмисно невалідний
+UNUSABLE_PASSWORD = "!"
+INSERT_BATCH_SIZE = 5000
+
+@dataclass
+class SeedConfig:
+    users: int = 10
+    depth: int = 3
+    breadth: int = 3
+    photos: int = 20
+    shares: int = 2
+    seed: int = 42
+
+@dataclass
+class SeededData:
+    user_ids: list[uuid.UUID] = field(default_factory=list)
+    # Кореневі папки кожного користувача та всі папки з фото
+    root_folder_ids: dict[uuid.UUID, list[uuid.UUID]] = field(default_factory=dict)
+    folder_ids: dict[uuid.UUID, list[uuid.UUID]] = field(default_factory=dict)
+
+def reset(db: Session):
+    """Видаляє лише користувачів @benchmark.local і все, що їм належить"""
+    bench_users = select(User.id).where(User.email.like(f"%@{EMAIL_DOMAIN}"))
+    db.execute(delete(Photo).where(Photo.user_id.in_(bench_users)))
+    db.execute(delete(Folder).where(Folder.user_id.in_(bench_users)))
+    db.execute(delete(User).where(User.id.in_(bench_users)))
+    db.commit()
+
+def _insert_batched(db: Session, model, rows: list[dict]):
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(model), rows[start:start + INSERT_BATCH_SIZE])
+
+def build_tree(user_id: uuid.UUID, depth: int, breadth: int, photos: int, rng: random.Random,
+               parent: Optional[tuple[uuid.UUID, str]] = None) -> tuple[list[dict], list[dict]]:
+    """Рядки folders і photos для дерева depth × breadth з photos фото в кожній папці"""
+    folders, photo_rows = [], []
+    started = datetime.utcnow() - timedelta(days=30)
+
+    def add_level(parent_id, parent_path, level):
+        for index in range(breadth):
+            folder_id = uuid.uuid4()
+            path = f"{parent_path}{PATH_SEPARATOR}{folder_id}" if parent_path else str(folder_id)
+            folders.append({
+                "id": folder_id,
+                "name": f"folder-{level}-{index}",
+                "user_id": user_id,
+                "parent_id": parent_id,
+                "path": path,
+                "created_at": started + timedelta(seconds=rng.randrange(30 * 86400)),
+            })
+            for photo_index in range(photos):
+                photo_rows.append({
+                    "id": uuid.uuid4(),
+                    "filename": f"photo-{photo_index}.jpg",
+                    "s3_key": f"{user_id}/{uuid.uuid4()}-photo-{photo_index}.jpg",
+                    "size": rng.randrange(200_000, 8_000_000),
+                    "mime_type": "image/jpeg",
+                    "user_id": user_id,
+                    "folder_id": folder_id,
+                    "thumbnail_widths": [],
+                    "created_at": started + timedelta(seconds=rng.randrange(30 * 86400)),
+                })
+            if level + 1 < depth:
+                add_level(folder_id, path, level + 1)
+
+    parent_id, parent_path = parent if parent else (None, None)
+    add_level(parent_id, parent_path, 0)
+    return folders, photo_rows
+
+def seed(db: Session, config: SeedConfig) -> SeededData:
+    rng = random.Random(config.seed)
+    data = SeededData()
+
+    users = [
+        {
+            "id": uuid.uuid4(),
+            "email": f"bench-{uuid.uuid4().hex[:12]}@{EMAIL_DOMAIN}",
+            "name": f"Benchmark {index}",
+            "password": UNUSABLE_PASSWORD,
+        }
+        for index in range(config.users)
+    ]
+    _insert_batched(db, User, users)
+    data.user_ids = [user["id"] for user in users]
+
+    all_folders, all_photos = [], []
+    for user_id in data.user_ids:
+        folders, photos = build_tree(user_id, config.depth, config.breadth, config.photos, rng)
+        all_folders.extend(folders)
+        all_photos.extend(photos)
+        data.root_folder_ids[user_id] = [folder["id"] for folder in folders if folder["parent_id"] is None]
+        data.folder_ids[user_id] = [folder["id"] for folder in folders]
+    # Батьківські папки йдуть раніше за дочірні, тож FK не порушується
+    _insert_batched(db, Folder, all_folders)
+    _insert_batched(db, Photo, all_photos)
+
+    shares, photo_shares = [], []
+    photos_by_user = {}
+    for photo in all_photos:
+        photos_by_user.setdefault(photo["user_id"], []).append(photo["id"])
+    for user_id in data.user_ids:
+        others = [other for other in data.user_ids if other != user_id]
+        for recipient_id in rng.sample(others, min(config.shares, len(others))):
+            shares.append({
+                "id": uuid.uuid4(),
+                "folder_id": rng.choice(data.root_folder_ids[user_id]),
+                "user_id": recipient_id,
+                "can_delete": False,
+            })
+            if photos_by_user.get(user_id):
+                photo_shares.append({
+                    "id": uuid.uuid4(),
+                    "photo_id": rng.choice(photos_by_user[user_id]),
+                    "user_id": recipient_id,
+                })
+    _insert_batched(db, SharedFolder, shares)
+    _insert_batched(db, SharedPhoto, photo_shares)
+
+    db.commit()
+    # Рядки вставлено напряму, в обхід лічильників використання — перераховуємо їх
+    reconcile_usage(db)
+    return data
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=SeedConfig.users)
+    parser.add_argument("--depth", type=int, default=SeedConfig.depth)
+    parser.add_argument("--breadth", type=int, default=SeedConfig.breadth)
+    parser.add_argument("--photos", type=int, default=SeedConfig.photos, help="фото в кожній папці")
+    parser.add_argument("--shares", type=int, default=SeedConfig.shares, help="поширень на користувача")
+    parser.add_argument("--seed", type=int, default=SeedConfig.seed)
+    parser.add_argument("--reset", action="store_true", help="спершу видалити попередні дані бенчмарків")
+    args = parser.parse_args()
+
+    config = SeedConfig(args.users, args.depth, args.breadth, args.photos, args.shares, args.seed)
+    db = SessionLocal()
+    try:
+        if args.reset:
+            reset(db)
+        data = seed(db, config)
+    finally:
+        db.close()
+
+    folder_count = sum(len(ids) for ids in data.folder_ids.values())
+    print(f"Створено {len(data.user_ids)} користувачів, {folder_count} папок, "
+          f"{folder_count * config.photos} фото")
+
+if __name__ == "__main__":
+    main()
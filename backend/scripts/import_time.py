@@ -0,0 +1,52 @@
+"""Вимірює час імпорту app.main і перевіряє його проти бюджету.
+
+Запуск з каталогу backend: python scripts/import_time.py [--budget-ms 1500] [--top 15]
+Повертає код 1, якщо імпорт довший за бюджет — можна ставити в CI перед деплоєм.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(module: str) -> list[tuple[int, int, str]]:
+    """Запускає чистий інтерпретатор з -X importtime; повертає (self мкс, cumulative мкс, модуль)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Не вдалося імпортувати {module}:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", 1500)))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    # Модулі верхнього рівня (відступ в один пробіл) разом покривають увесь імпорт
+    total_ms = sum(cumulative for _self, cumulative, name in rows if not name.startswith("  ")) / 1000
+
+    print(f"Найважчі імпорти ({args.module}):")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} мс  (власний {self_us / 1000:6.1f})  {name.strip()}")
+    print(f"Разом: {total_ms:.1f} мс, бюджет {args.budget_ms:.0f} мс")
+
+    if total_ms > args.budget_ms:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import os
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.models import StoredObject
+from app.services.content_store import (
+    claim_existing_object, content_key, register_uploaded_object, release_objects
+)
+
+def run(scenario):
+    """Виконує scenario(session) у власному циклі подій з окремим рушієм без пулу"""
+    async def main():
+        url = make_url(os.environ["DATABASE_URL"]).set(drivername="postgresql+asyncpg")
+        engine = create_async_engine(url, poolclass=NullPool)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                return await scenario(session)
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+async def ref_count(session, user_id, content_hash):
+    return await session.scalar(select(StoredObject.ref_count).where(
+        StoredObject.user_id == user_id, StoredObject.content_hash == content_hash
+    ))
+
+def test_identical_content_is_stored_once(make_user):
+    user_id, _headers = make_user()
+    content_hash = digest(b"photo")
+
+    async def scenario(session):
+        assert await claim_existing_object(session, user_id, content_hash) is None
+        s3_key = content_key(user_id, content_hash)
+        assert await register_uploaded_object(session, user_id, content_hash, s3_key, 5) == s3_key
+        assert await claim_existing_object(session, user_id, content_hash) == s3_key
+        await session.commit()
+        assert await ref_count(session, user_id, content_hash) == 2
+
+        # Об'єкт видаляється лише разом з останнім посиланням
+        assert await release_objects(session, [(user_id, content_hash)]) == []
+        assert await release_objects(session, [(user_id, content_hash)]) == [s3_key]
+        await session.commit()
+        assert await ref_count(session, user_id, content_hash) is None
+
+    run(scenario)
+
+def test_concurrent_copy_resolves_to_the_first_key(make_user):
+    user_id, _headers = make_user()
+    content_hash = digest(b"race")
+
+    async def scenario(session):
+        first = content_key(user_id, content_hash)
+        second = content_key(user_id, content_hash)
+        assert await register_uploaded_object(session, user_id, content_hash, first, 4) == first
+        # Другий завантажувач отримує наявний ключ і має прибрати власну копію
+        assert await register_uploaded_object(session, user_id, content_hash, second, 4) == first
+        assert await ref_count(session, user_id, content_hash) == 2
+        await session.commit()
+
+    run(scenario)
+
+def test_release_counts_repeated_references(make_user):
+    user_id, _headers = make_user()
+    shared, single = digest(b"shared"), digest(b"single")
+
+    async def scenario(session):
+        shared_key = content_key(user_id, shared)
+        single_key = content_key(user_id, single)
+        await register_uploaded_object(session, user_id, shared, shared_key, 1)
+        await claim_existing_object(session, user_id, shared)
+        await claim_existing_object(session, user_id, shared)
+        await register_uploaded_object(session, user_id, single, single_key, 1)
+
+        released = await release_objects(session, [(user_id, shared), (user_id, shared), (user_id, single)])
+        assert released == [single_key]
+        assert await ref_count(session, user_id, shared) == 1
+        await session.commit()
+
+    run(scenario)
+
+def test_content_is_not_shared_between_users(make_user):
+    owner_id, _headers = make_user()
+    other_id, _headers = make_user()
+    content_hash = digest(b"same bytes")
+
+    async def scenario(session):
+        await register_uploaded_object(session, owner_id, content_hash, content_key(owner_id, content_hash), 1)
+        assert await claim_existing_object(session, other_id, content_hash) is None
+        await session.commit()
+
+    run(scenario)
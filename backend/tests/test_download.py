@@ -0,0 +1,55 @@
+from app.models import User
+from app.services.object_cache import get_object_cache
+from conftest import create_folder, image_bytes, upload_photo
+
+def test_content_serves_byte_ranges(client, make_user):
+    _user_id, headers = make_user()
+    contents = image_bytes(3)
+    url = f"/photos/{upload_photo(client, headers, contents)['id']}/content"
+
+    full = client.get(url, headers=headers)
+    assert full.status_code == 200
+    assert full.content == contents
+
+    partial = client.get(url, headers={**headers, "Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.content == contents[:10]
+    assert partial.headers["Content-Range"] == f"bytes 0-9/{len(contents)}"
+
+    suffix = client.get(url, headers={**headers, "Range": "bytes=-5"})
+    assert suffix.status_code == 206
+    assert suffix.content == contents[-5:]
+
+    unsatisfiable = client.get(url, headers={**headers, "Range": f"bytes={len(contents) + 10}-"})
+    assert unsatisfiable.status_code == 416
+    malformed = client.get(url, headers={**headers, "Range": "bytes=abc"})
+    assert malformed.status_code == 400
+
+    # Жодна відповідь, зокрема 400 і 416, не лишає файл закріпленим у кеші
+    assert all(entry.pins == 0 for entry in get_object_cache()._entries.values())
+
+def test_thumbnail_content(client, make_user):
+    _user_id, headers = make_user()
+    upload_photo(client, headers, image_bytes(5, size=(800, 600)))
+    # Мініатюри створюються у фоновій задачі, яку TestClient чекає до кінця відповіді
+    photo = client.get("/photos/", headers=headers).json()[0]
+    assert photo["thumbnails"]
+    width = next(iter(photo["thumbnails"]))
+
+    response = client.get(f"/photos/{photo['id']}/content", params={"width": width}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert client.get(f"/photos/{photo['id']}/content", params={"width": 7}, headers=headers).status_code == 404
+
+def test_content_follows_folder_sharing(client, make_user, db):
+    _owner_id, owner_headers = make_user()
+    other_id, other_headers = make_user()
+    folder = create_folder(client, owner_headers, "Shared")
+    photo = upload_photo(client, owner_headers, image_bytes(4), folder_id=folder["id"])
+    url = f"/photos/{photo['id']}/content"
+
+    assert client.get(url, headers=other_headers).status_code == 404
+    other_email = db.get(User, other_id).email
+    shared = client.post(f"/folders/{folder['id']}/share", headers=owner_headers, json={"email": other_email})
+    assert shared.status_code == 200, shared.text
+    assert client.get(url, headers=other_headers).status_code == 200
@@ -0,0 +1,58 @@
+from app.models import User
+from conftest import add_photos, create_folder
+
+def test_unchanged_listing_returns_304(client, make_user):
+    _user_id, headers = make_user()
+    create_folder(client, headers, "Album")
+
+    first = client.get("/folders/", headers=headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = client.get("/folders/", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+    assert client.get("/folders/", headers={**headers, "If-None-Match": "*"}).status_code == 304
+
+def test_changes_produce_a_new_etag(client, make_user):
+    _user_id, headers = make_user()
+    parent = create_folder(client, headers, "Parent")
+    root_etag = client.get("/folders/", headers=headers).headers["ETag"]
+    child_etag = client.get("/folders/", headers=headers, params={"parent_id": parent["id"]}).headers["ETag"]
+
+    create_folder(client, headers, "Child", parent["id"])
+
+    children = client.get("/folders/", headers={**headers, "If-None-Match": child_etag}, params={"parent_id": parent["id"]})
+    assert children.status_code == 200
+    assert children.headers["ETag"] != child_etag
+    assert len(children.json()) == 1
+
+    create_folder(client, headers, "Second root")
+    roots = client.get("/folders/", headers={**headers, "If-None-Match": root_etag})
+    assert roots.status_code == 200
+    assert len(roots.json()) == 2
+
+def test_each_page_has_its_own_etag(client, make_user, db):
+    user_id, headers = make_user()
+    add_photos(db, user_id, 3)
+
+    first = client.get("/photos/", headers=headers, params={"limit": 2})
+    second = client.get("/photos/", headers=headers, params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert first.headers["ETag"] != second.headers["ETag"]
+
+    stale = client.get("/photos/", headers={**headers, "If-None-Match": first.headers["ETag"]}, params={"limit": 3})
+    assert stale.status_code == 200
+
+def test_sharing_changes_recipient_listing(client, make_user, db):
+    _owner_id, owner_headers = make_user()
+    recipient_id, recipient_headers = make_user()
+    folder = create_folder(client, owner_headers, "Shared")
+    etag = client.get("/folders/shared", headers=recipient_headers).headers["ETag"]
+
+    email = db.get(User, recipient_id).email
+    assert client.post(f"/folders/{folder['id']}/share", headers=owner_headers, json={"email": email}).status_code == 200
+
+    shared = client.get("/folders/shared", headers={**recipient_headers, "If-None-Match": etag})
+    assert shared.status_code == 200
+    assert [item["id"] for item in shared.json()] == [folder["id"]]
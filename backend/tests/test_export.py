@@ -0,0 +1,64 @@
+import io
+import zipfile
+
+from app.models import Photo
+from app.services import zip_export
+from conftest import create_folder, image_bytes, upload_photo
+
+def test_export_streams_subtree_as_zip(client, make_user):
+    _user_id, headers = make_user()
+    trip = create_folder(client, headers, "Trip")
+    day = create_folder(client, headers, "Day 1", trip["id"])
+    first, second, nested = image_bytes(1), image_bytes(2), image_bytes(3)
+    upload_photo(client, headers, first, "photo.jpg", trip["id"])
+    upload_photo(client, headers, second, "photo.jpg", trip["id"])
+    upload_photo(client, headers, nested, "beach.jpg", day["id"])
+
+    response = client.get(f"/folders/{trip['id']}/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        assert set(archive.namelist()) == {
+            "Trip/", "Trip/Day 1/", "Trip/photo.jpg", "Trip/photo (2).jpg", "Trip/Day 1/beach.jpg"
+        }
+        assert archive.read("Trip/photo.jpg") == first
+        assert archive.read("Trip/photo (2).jpg") == second
+        assert archive.read("Trip/Day 1/beach.jpg") == nested
+
+def test_export_is_hidden_from_other_users(client, make_user):
+    _owner_id, owner_headers = make_user()
+    _other_id, other_headers = make_user()
+    folder = create_folder(client, owner_headers, "Private")
+
+    assert client.get(f"/folders/{folder['id']}/export", headers=other_headers).status_code == 403
+
+def test_export_reads_objects_in_chunks(client, make_user, storage, monkeypatch):
+    monkeypatch.setattr(zip_export, "EXPORT_CHUNK_SIZE", 100)
+    _user_id, headers = make_user()
+    folder = create_folder(client, headers, "Album")
+    contents = image_bytes(4, size=(200, 150))
+    upload_photo(client, headers, contents, "big.jpg", folder["id"])
+    reads = []
+    read_range = storage.read_range
+    monkeypatch.setattr(storage, "read_range", lambda key, start, length: reads.append(length) or read_range(key, start, length))
+
+    response = client.get(f"/folders/{folder['id']}/export", headers=headers)
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.read("Album/big.jpg") == contents
+    assert max(reads) == 100
+    assert sum(reads) == len(contents)
+
+def test_export_lists_missing_objects(client, make_user, db, storage):
+    _user_id, headers = make_user()
+    folder = create_folder(client, headers, "Album")
+    upload_photo(client, headers, image_bytes(1), "kept.jpg", folder["id"])
+    lost = upload_photo(client, headers, image_bytes(2), "lost.jpg", folder["id"])
+    storage.delete(db.get(Photo, lost["id"]).s3_key)
+
+    response = client.get(f"/folders/{folder['id']}/export", headers=headers)
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        assert set(archive.namelist()) == {"Album/", "Album/kept.jpg", "export-errors.txt"}
+        assert "Album/lost.jpg" in archive.read("export-errors.txt").decode()
@@ -0,0 +1,65 @@
+from app.models import Folder, Photo
+from app.services import deletion
+from conftest import add_photos, create_folder
+
+def store_photo_objects(db, storage, user_id) -> set[str]:
+    """Кладе в сховище об'єкти для фото, доданих через add_photos"""
+    keys = {s3_key for (s3_key,) in db.query(Photo.s3_key).filter(Photo.user_id == user_id)}
+    for key in keys:
+        storage.upload(b"photo", key, "image/jpeg")
+    return keys
+
+def test_subtree_is_removed_and_objects_deleted_in_background(client, make_user, db, storage):
+    user_id, headers = make_user()
+    root = create_folder(client, headers, "Root")
+    child = create_folder(client, headers, "Child", root["id"])
+    add_photos(db, user_id, 2, folder_id=root["id"])
+    add_photos(db, user_id, 3, folder_id=child["id"])
+    keys = store_photo_objects(db, storage, user_id)
+
+    response = client.delete(f"/folders/{root['id']}", headers=headers)
+    assert response.status_code == 200
+    job = client.get(f"/folders/deletions/{response.json()['job_id']}", headers=headers).json()
+
+    assert job["status"] == "done"
+    assert job["total_objects"] == job["deleted_objects"] == 5
+    assert not keys & storage.objects.keys()
+    assert db.query(Folder).filter(Folder.user_id == user_id).count() == 0
+    assert db.query(Photo).filter(Photo.user_id == user_id).count() == 0
+
+def test_failed_objects_are_kept_for_retry(client, make_user, db, storage, monkeypatch):
+    monkeypatch.setattr(deletion, "DELETE_RETRY_DELAY", 0)
+    user_id, headers = make_user()
+    folder = create_folder(client, headers, "Folder")
+    add_photos(db, user_id, 3, folder_id=folder["id"])
+    stuck = sorted(store_photo_objects(db, storage, user_id))[0]
+    monkeypatch.setattr(storage, "delete_many", lambda keys: [key for key in keys if key == stuck])
+
+    job_id = client.delete(f"/folders/{folder['id']}", headers=headers).json()["job_id"]
+    job = client.get(f"/folders/deletions/{job_id}", headers=headers).json()
+    assert job["status"] == "failed"
+    assert job["deleted_objects"] == 2
+    assert job["failed_objects"] == 1
+
+    monkeypatch.undo()
+    retried = client.post(f"/folders/deletions/{job_id}/retry", headers=headers)
+    assert retried.status_code == 200
+    job = client.get(f"/folders/deletions/{job_id}", headers=headers).json()
+    assert job["status"] == "done"
+    assert job["deleted_objects"] == 3
+    assert stuck not in storage.objects
+
+def test_finished_job_cannot_be_retried(client, make_user):
+    _user_id, headers = make_user()
+    folder = create_folder(client, headers, "Empty")
+    job_id = client.delete(f"/folders/{folder['id']}", headers=headers).json()["job_id"]
+
+    assert client.get(f"/folders/deletions/{job_id}", headers=headers).json()["status"] == "done"
+    assert client.post(f"/folders/deletions/{job_id}/retry", headers=headers).status_code == 400
+
+def test_other_users_cannot_delete_folder(client, make_user):
+    _owner_id, owner_headers = make_user()
+    _other_id, other_headers = make_user()
+    folder = create_folder(client, owner_headers, "Private")
+
+    assert client.delete(f"/folders/{folder['id']}", headers=other_headers).status_code == 403
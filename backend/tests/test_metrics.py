@@ -0,0 +1,15 @@
+from app.routers import metrics
+
+def test_metrics_are_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics/profile").status_code == 404
+
+def test_metrics_require_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "metrics-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer metrics-secret"})
+    assert response.status_code == 200
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
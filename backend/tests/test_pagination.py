@@ -0,0 +1,49 @@
+from conftest import add_photos, create_folder
+
+def read_all_pages(client, url, headers, **params) -> tuple[list[str], int]:
+    """id усіх елементів, пройдених за X-Next-Cursor, і кількість сторінок"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        response = client.get(url, headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        ids.extend(item["id"] for item in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids, pages
+
+def test_photo_listing_follows_cursor_to_the_end(client, make_user, db):
+    user_id, headers = make_user()
+    photo_ids = add_photos(db, user_id, 5)
+
+    ids, pages = read_all_pages(client, "/photos/", headers, limit=2)
+    assert ids == photo_ids
+    assert pages == 3
+
+def test_photo_listing_pages_within_folder(client, make_user, db):
+    user_id, headers = make_user()
+    folder = create_folder(client, headers, "Album")
+    photo_ids = add_photos(db, user_id, 4, folder_id=folder["id"])
+    add_photos(db, user_id, 2)
+
+    ids, pages = read_all_pages(client, "/photos/", headers, folder_id=folder["id"], limit=2)
+    assert ids == photo_ids
+    assert pages == 2
+
+def test_folder_listing_follows_cursor(client, make_user):
+    _user_id, headers = make_user()
+    parent = create_folder(client, headers, "Parent")
+    child_ids = [create_folder(client, headers, f"Child {index}", parent["id"])["id"] for index in range(3)]
+
+    ids, _pages = read_all_pages(client, "/folders/", headers, parent_id=parent["id"], limit=1)
+    assert ids == child_ids
+
+def test_page_size_is_capped(client, make_user):
+    _user_id, headers = make_user()
+    response = client.get("/photos/", headers=headers, params={"limit": 100000})
+    assert response.status_code == 422
+
+def test_invalid_cursor_is_rejected(client, make_user):
+    _user_id, headers = make_user()
+    response = client.get("/photos/", headers=headers, params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,34 @@
+from app.models import User
+from conftest import create_folder, image_bytes, upload_photo
+
+def share_folder(client, headers, folder_id, email: str, can_delete=False):
+    response = client.post(f"/folders/{folder_id}/share", headers=headers, json={"email": email, "can_delete": can_delete})
+    assert response.status_code == 200, response.text
+
+def test_parent_share_grants_access_to_subfolder_photos(client, make_user, db):
+    _owner_id, owner_headers = make_user()
+    other_id, other_headers = make_user()
+    parent = create_folder(client, owner_headers, "Parent")
+    child = create_folder(client, owner_headers, "Child", parent["id"])
+    photo = upload_photo(client, owner_headers, image_bytes(1), folder_id=child["id"])
+
+    listing = client.get("/photos/", params={"folder_id": child["id"]}, headers=other_headers)
+    assert listing.status_code == 403
+    share_folder(client, owner_headers, parent["id"], db.get(User, other_id).email)
+
+    listing = client.get("/photos/", params={"folder_id": child["id"]}, headers=other_headers)
+    assert listing.status_code == 200
+    assert [item["id"] for item in listing.json()] == [photo["id"]]
+    # Без права видалення поширення лише на перегляд
+    assert client.delete(f"/photos/{photo['id']}", headers=other_headers).status_code == 403
+
+def test_parent_share_with_delete_right_allows_deleting_subfolder_photos(client, make_user, db):
+    _owner_id, owner_headers = make_user()
+    other_id, other_headers = make_user()
+    parent = create_folder(client, owner_headers, "Parent")
+    child = create_folder(client, owner_headers, "Child", parent["id"])
+    photo = upload_photo(client, owner_headers, image_bytes(2), folder_id=child["id"])
+    share_folder(client, owner_headers, parent["id"], db.get(User, other_id).email, can_delete=True)
+
+    assert client.delete(f"/photos/{photo['id']}", headers=other_headers).status_code == 200
+    assert client.get("/photos/", params={"folder_id": child["id"]}, headers=owner_headers).json() == []
@@ -0,0 +1,53 @@
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.models import Photo
+from app.services.storage import LocalStorage
+from conftest import image_bytes, upload_photo
+
+def test_upload_is_stored_and_listed_with_signed_url(client, make_user, db, storage):
+    _user_id, headers = make_user()
+    contents = image_bytes()
+    uploaded = upload_photo(client, headers, contents)
+
+    s3_key = db.get(Photo, uploaded["id"]).s3_key
+    assert storage.objects[s3_key] == (contents, "image/jpeg")
+    listed = client.get("/photos/", headers=headers).json()
+    assert [photo["id"] for photo in listed] == [uploaded["id"]]
+    assert listed[0]["url"].startswith("memory://")
+
+def test_deleted_photo_object_is_removed(client, make_user, db, storage):
+    _user_id, headers = make_user()
+    uploaded = upload_photo(client, headers, image_bytes())
+    s3_key = db.get(Photo, uploaded["id"]).s3_key
+
+    assert client.delete(f"/photos/{uploaded['id']}", headers=headers).status_code == 200
+    assert s3_key not in storage.objects
+
+def signed_params(url: str) -> tuple[str, int, str]:
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    return parts.path.split("/uploads/", 1)[1], int(query["expires"][0]), query["signature"][0]
+
+def test_local_storage_signatures(tmp_path):
+    storage = LocalStorage(str(tmp_path), "http://api.test/uploads", "secret")
+    storage.upload(b"data", "user/photo.jpg", "image/jpeg")
+    assert storage.head("user/photo.jpg") == (4, "image/jpeg")
+
+    key, expires, signature = signed_params(storage.sign_url("user/photo.jpg", 60))
+    assert key == "user/photo.jpg"
+    assert storage.verify_signature(key, expires, signature)
+    assert not storage.verify_signature("user/other.jpg", expires, signature)
+    assert not storage.verify_signature(key, expires + 1, signature)
+    assert not storage.verify_signature(key, int(time.time()) - 1, storage._signature(key, int(time.time()) - 1))
+
+def test_local_storage_rejects_keys_outside_root(tmp_path):
+    storage = LocalStorage(str(tmp_path / "uploads"), "http://api.test/uploads", "secret")
+    with pytest.raises(ValueError):
+        storage.path("../outside.jpg")
+
+def test_local_storage_requires_secret(tmp_path):
+    with pytest.raises(ValueError):
+        LocalStorage(str(tmp_path), "http://api.test/uploads", None)
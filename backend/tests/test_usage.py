@@ -0,0 +1,57 @@
+from sqlalchemy import func
+
+from app.models import Photo, User
+from conftest import create_folder, image_bytes, upload_photo
+
+def photo_totals(db, **filters) -> tuple[int, int]:
+    size, count = db.query(func.coalesce(func.sum(Photo.size), 0), func.count()).filter_by(**filters).one()
+    return size, count
+
+def folder_usage(client, headers, folder_id) -> tuple[int, int]:
+    usage = client.get(f"/usage/folders/{folder_id}", headers=headers).json()
+    return usage["total_bytes"], usage["photo_count"]
+
+def test_counters_follow_uploads_moves_and_deletes(client, make_user, db):
+    user_id, headers = make_user()
+    parent = create_folder(client, headers, "Parent")
+    child = create_folder(client, headers, "Child", parent["id"])
+    upload_photo(client, headers, image_bytes(1), folder_id=parent["id"])
+    nested = upload_photo(client, headers, image_bytes(2), folder_id=child["id"])
+    upload_photo(client, headers, image_bytes(3))
+
+    usage = client.get("/usage", headers=headers).json()
+    assert (usage["used_bytes"], usage["photo_count"]) == photo_totals(db, user_id=user_id)
+    parent_bytes, parent_count = folder_usage(client, headers, parent["id"])
+    child_bytes, child_count = folder_usage(client, headers, child["id"])
+    assert parent_count == 2 and child_count == 1
+    assert (child_bytes, child_count) == photo_totals(db, folder_id=child["id"])
+    assert parent_bytes == photo_totals(db, folder_id=parent["id"])[0] + child_bytes
+
+    moved = client.put(f"/folders/{child['id']}/move", headers=headers, json={"parent_id": None})
+    assert moved.status_code == 200
+    assert folder_usage(client, headers, parent["id"]) == photo_totals(db, folder_id=parent["id"])
+    assert folder_usage(client, headers, child["id"]) == (child_bytes, child_count)
+
+    assert client.delete(f"/photos/{nested['id']}", headers=headers).status_code == 200
+    assert folder_usage(client, headers, child["id"]) == (0, 0)
+    usage = client.get("/usage", headers=headers).json()
+    assert (usage["used_bytes"], usage["photo_count"]) == photo_totals(db, user_id=user_id)
+
+def test_upload_over_quota_is_rejected(client, make_user, db):
+    user_id, headers = make_user()
+    first = image_bytes(1)
+    upload_photo(client, headers, first)
+    db.query(User).filter(User.id == user_id).update({User.quota_bytes: len(first) + 10})
+    db.commit()
+
+    usage = client.get("/usage", headers=headers).json()
+    assert usage["quota_bytes"] == len(first) + 10
+    assert usage["remaining_bytes"] == 10
+
+    response = client.post("/photos/upload", headers=headers, files={"file": ("big.jpg", image_bytes(2), "image/jpeg")})
+    assert response.status_code == 413
+    presign = client.post("/photos/upload/presign", headers=headers, json={
+        "filename": "big.jpg", "content_type": "image/jpeg", "size": 1000
+    })
+    assert presign.status_code == 413
+    assert client.get("/usage", headers=headers).json()["photo_count"] == 1
@@ -13,3 +13,15 @@ api.interceptors.request.use((config) => {
 })
 
 export default api
+
+export interface Page<T> {
+  data: T[]
+  nextCursor: string | null
+}
+
+// Listing endpoints are cursor-paginated: the next page cursor comes back in X-Next-Cursor
+export const getPage = async <T>(url: string, params: Record<string, unknown> = {}, cursor?: string | null): Promise<Page<T>> => {
+  const res = await api.get<T[]>(url, { params: { ...params, cursor: cursor ?? undefined } })
+  const next = res.headers['x-next-cursor']
+  return { data: res.data, nextCursor: typeof next === 'string' && next ? next : null }
+}
@@ -1,7 +1,7 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useNavigate, Link } from 'react-router-dom'
 import { useAuthStore } from '../store/authStore'
-import api from '../api/client'
+import api, { getPage } from '../api/client'
 import logo from '../assets/LogoPhotoAlbum.png' 
 
 interface Folder {
@@ -15,11 +15,22 @@ interface Photo {
   id: string
   filename: string
   url: string
+  thumbnails?: Record<string, string>
   folder_id: string | null
   created_at: string
   size?: number 
 }
 
+// Ширина картки в сітці; прев'ю береться найближче не менше за неї, інакше найбільше з наявних
+const CARD_THUMBNAIL_WIDTH = 320
+
+const thumbnailUrl = (photo: Photo, width = CARD_THUMBNAIL_WIDTH) => {
+  const widths = Object.keys(photo.thumbnails ?? {}).map(Number).sort((a, b) => a - b)
+  if (widths.length === 0) return photo.url
+  const best = widths.find((available) => available >= width) ?? widths[widths.length - 1]
+  return photo.thumbnails![String(best)]
+}
+
 const AlbumPage = () => {
   const navigate = useNavigate()
   const { logout } = useAuthStore()
@@ -39,6 +50,12 @@ const AlbumPage = () => {
   const [showNewFolder, setShowNewFolder] = useState(false)
   const [uploading, setUploading] = useState(false)
   const [loading, setLoading] = useState(false)
+  // Наступні сторінки поточного перегляду; null — усе вже завантажено
+  const [foldersCursor, setFoldersCursor] = useState<string | null>(null)
+  const [photosCursor, setPhotosCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  // Змінюється з кожним новим переглядом: відповідь для старої папки не допишеться в нову
+  const viewRequest = useRef(0)
 
   const [shareModalOpen, setShareModalOpen] = useState(false)
   const [shareData, setShareData] = useState<{ type: 'folder' | 'photo', id: string, name: string } | null>(null)
@@ -47,38 +64,76 @@ const AlbumPage = () => {
   const [shareLoading, setShareLoading] = useState(false)
 
   const fetchData = async (folderId: string | null = null) => {
+    const request = ++viewRequest.current
     setLoading(true)
     try {
       const [foldersRes, photosRes] = await Promise.allSettled([
-        api.get('/folders/', { params: { parent_id: folderId } }),
-        api.get('/photos/', { params: { folder_id: folderId } }),
+        getPage<Folder>('/folders/', { parent_id: folderId }),
+        getPage<Photo>('/photos/', { folder_id: folderId }),
       ])
-      
-      if (foldersRes.status === 'fulfilled') setFolders(foldersRes.value.data)
-      else setFolders([])
+      if (request !== viewRequest.current) return
 
-      if (photosRes.status === 'fulfilled') setPhotos(photosRes.value.data)
-      else setPhotos([])
+      setFolders(foldersRes.status === 'fulfilled' ? foldersRes.value.data : [])
+      setFoldersCursor(foldersRes.status === 'fulfilled' ? foldersRes.value.nextCursor : null)
+      setPhotos(photosRes.status === 'fulfilled' ? photosRes.value.data : [])
+      setPhotosCursor(photosRes.status === 'fulfilled' ? photosRes.value.nextCursor : null)
     } catch {
       console.error('Помилка завантаження даних')
     } finally {
-      setLoading(false)
+      if (request === viewRequest.current) setLoading(false)
     }
   }
 
   const fetchSharedData = async () => {
+    const request = ++viewRequest.current
     setLoading(true)
     try {
       const [photosRes, foldersRes] = await Promise.all([
-        api.get('/photos/shared'),
-        api.get('/folders/shared')
+        getPage<Photo>('/photos/shared'),
+        getPage<Folder>('/folders/shared')
       ])
+      if (request !== viewRequest.current) return
+
       setSharedPhotos(photosRes.data)
+      setPhotosCursor(photosRes.nextCursor)
       setSharedFolders(foldersRes.data)
+      setFoldersCursor(foldersRes.nextCursor)
     } catch {
       console.error('Помилка завантаження спільних даних')
     } finally {
-      setLoading(false)
+      if (request === viewRequest.current) setLoading(false)
+    }
+  }
+
+  // Наступна сторінка папок або фото поточного перегляду за курсором з X-Next-Cursor
+  const loadMore = async (kind: 'folders' | 'photos') => {
+    const cursor = kind === 'folders' ? foldersCursor : photosCursor
+    if (!cursor || loadingMore) return
+    const request = viewRequest.current
+    const sharedRoot = activeTab === 'shared' && currentFolder === null
+    setLoadingMore(true)
+    try {
+      if (kind === 'folders') {
+        const page = sharedRoot
+          ? await getPage<Folder>('/folders/shared', {}, cursor)
+          : await getPage<Folder>('/folders/', { parent_id: currentFolder }, cursor)
+        if (request !== viewRequest.current) return
+        if (sharedRoot) setSharedFolders((prev) => [...prev, ...page.data])
+        else setFolders((prev) => [...prev, ...page.data])
+        setFoldersCursor(page.nextCursor)
+      } else {
+        const page = sharedRoot
+          ? await getPage<Photo>('/photos/shared', {}, cursor)
+          : await getPage<Photo>('/photos/', { folder_id: currentFolder }, cursor)
+        if (request !== viewRequest.current) return
+        if (sharedRoot) setSharedPhotos((prev) => [...prev, ...page.data])
+        else setPhotos((prev) => [...prev, ...page.data])
+        setPhotosCursor(page.nextCursor)
+      }
+    } catch {
+      console.error('Помилка завантаження наступної сторінки')
+    } finally {
+      setLoadingMore(false)
     }
   }
 
@@ -348,6 +403,14 @@ const AlbumPage = () => {
                 ))}
               </div>
 
+              {foldersCursor && (
+                <div className="flex justify-center -mt-5 mb-10">
+                  <button onClick={() => loadMore('folders')} disabled={loadingMore} className="text-sm font-medium text-gray-600 bg-gray-100 hover:bg-gray-200 px-4 py-2 rounded-xl transition-colors disabled:opacity-50">
+                    {loadingMore ? 'Loading...' : 'Load more folders'}
+                  </button>
+                </div>
+              )}
+
               <h3 className="text-xs font-bold text-gray-400 uppercase tracking-wider mb-4">Photos</h3>
               
               {filteredPhotos.length === 0 ? (
@@ -359,7 +422,7 @@ const AlbumPage = () => {
                 <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-5">
                   {filteredPhotos.map((photo) => (
                     <div key={photo.id} className="group rounded-2xl overflow-hidden bg-white border border-gray-200 transition-all hover:-translate-y-1 hover:shadow-[0_4px_12px_rgba(0,0,0,0.05)] relative">
-                      <div className="h-40 bg-gray-100 bg-cover bg-center" style={{ backgroundImage: `url('${photo.url}')` }}></div>
+                      <div className="h-40 bg-gray-100 bg-cover bg-center" style={{ backgroundImage: `url('${thumbnailUrl(photo)}')` }}></div>
                       <div className="p-3">
                         <div className="text-sm font-medium text-gray-900 truncate">{photo.filename}</div>
                         <div className="text-xs text-gray-500 mt-1 flex justify-between">
@@ -377,6 +440,14 @@ const AlbumPage = () => {
                   ))}
                 </div>
               )}
+
+              {photosCursor && (
+                <div className="flex justify-center mt-6">
+                  <button onClick={() => loadMore('photos')} disabled={loadingMore} className="text-sm font-medium text-gray-600 bg-gray-100 hover:bg-gray-200 px-4 py-2 rounded-xl transition-colors disabled:opacity-50">
+                    {loadingMore ? 'Loading...' : 'Load more photos'}
+                  </button>
+                </div>
+              )}
             </>
           )}
         </div>